@@ -1,10 +1,10 @@
 """Create a new multiplayer session and register the creator as the first user."""
 
 import azure.functions as func
-from azure.data.tables import TableClient
-import json
+from shared_code import codec, lobby, members, storage
 import uuid
 import os
+from datetime import datetime
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors_headers = {
@@ -23,22 +23,24 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
 
         session_id = str(uuid.uuid4())
         connection_string = os.getenv("AzureWebJobsStorage")
-        session_table = TableClient.from_connection_string(connection_string, table_name="Sessions")
+        session_table = storage.table("Sessions", connection_string)
 
         entity = {
             "PartitionKey": "session",
             "RowKey": session_id,
             "creator": username,
-            "users": json.dumps([username]),
-            "readyStatus": json.dumps({username: False}),
             "isStarted": False,
-            "currentGameId": None
+            "currentGameId": None,
+            "createdAt": datetime.utcnow().isoformat() + "Z",
+            "lobbyKey": lobby.make_lobby_key(session_id),
         }
 
         session_table.create_entity(entity)
+        members.join(connection_string, session_id, username)
+        lobby.open_lobby(connection_string, entity, 1)
 
         return func.HttpResponse(
-            json.dumps({ "sessionId": session_id }),
+            codec.dumps({ "sessionId": session_id }),
             status_code=201,
             headers={**cors_headers, "Content-Type": "application/json"}
         )
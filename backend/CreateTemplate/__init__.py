@@ -1,11 +1,12 @@
 import azure.functions as func
-from azure.data.tables import TableClient
 import os
 import json
+from shared_code import codec, geometry, storage
 
 """HTTP POST CreateTemplate
 Body: { templateId: str, baseVertices: [ {x,y}, ... ] }
-Normalizes and stores baseVertices as JSON string in Templates table.
+Normalizes and stores baseVertices as JSON string in Templates table, together with
+the precompiled geometry (canonical polygon, bbox, perimeter, samples, LODs).
 Rejects if templateId exists (to avoid overwrite) unless 'overwrite': true provided (future extension).
 """
 
@@ -39,11 +40,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     if not conn:
         return func.HttpResponse(json.dumps({"error":"Missing AzureWebJobsStorage"}), status_code=500, headers={**cors, "Content-Type":"application/json"})
 
-    table = TableClient.from_connection_string(conn, table_name="Templates")
-    try:
-        table.create_table()
-    except Exception:
-        pass
+    table = storage.table("Templates", conn, create=True)
 
     # Check existing
     try:
@@ -74,6 +71,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     if mval is None:
         mval = 1.0
 
+    compiled = geometry.compile_template(base_vertices)
+    geometry_json = geometry.serialize(compiled, codec.dumps) if compiled else None
+    if not geometry_json:
+        return func.HttpResponse(json.dumps({"error":"Degenerate or oversized baseVertices"}), status_code=400, headers={**cors, "Content-Type":"application/json"})
+
     entity = {
         'PartitionKey': 'template',
         'RowKey': template_id,
@@ -81,6 +83,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         'baseVertices': json.dumps(base_vertices),
         'isCustom': True,  # mark newly created templates as custom (deletable)
         'multiplier': mval,
+        'geometry': geometry_json,
     }
     try:
         table.create_entity(entity)
@@ -1,7 +1,7 @@
 """Delete a custom template by templateId (core templates are protected)."""
 
 import azure.functions as func
-from azure.data.tables import TableClient
+from shared_code import storage
 import os, json
 
 CORE_TEMPLATES = {"circle", "square", "star", "triangle"}
@@ -29,7 +29,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     conn = os.getenv('AzureWebJobsStorage')
     if not conn:
         return func.HttpResponse(json.dumps({"error":"Missing AzureWebJobsStorage"}), status_code=500, headers={**cors, "Content-Type":"application/json"})
-    table = TableClient.from_connection_string(conn, table_name="Templates")
+    table = storage.table("Templates", conn)
     try:
         ent = table.get_entity(partition_key='template', row_key=template_id)
     except Exception:
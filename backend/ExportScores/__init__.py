@@ -0,0 +1,73 @@
+"""Admin: export Scores rows (optionally joined with Games) as NDJSON or CSV, one storage page per request.
+
+GET (header x-admin-key) ?format=<ndjson|csv>&games=<0|1>&since=<ISO 8601>&pageSize=<1..5000, default 1000>&continuationToken=<token>
+
+Each response holds one page of records (shared_code.export.record) and nothing else, so
+cost and memory are bounded by pageSize. The next page's token is returned in the
+X-Continuation-Token header (absent = done). CSV responses start with a header row only
+on the first page, so pages concatenate into one file. since keeps games with
+timeCompleted >= since; use the largest timeCompleted exported so far for incremental
+exports. tools/export.py walks all pages into a file.
+"""
+
+import azure.functions as func
+import logging
+import os
+from shared_code import admin, codec, compression, export, paging, ratelimit
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+@ratelimit.shed("low")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "X-Continuation-Token",
+        "Cache-Control": "no-store",
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+    if not admin.is_admin(req):
+        return func.HttpResponse(codec.dumps({"error": "Forbidden"}), status_code=403, headers={**headers, "Content-Type": "application/json"})
+
+    fmt = (req.params.get('format') or 'ndjson').lower()
+    if fmt not in ('ndjson', 'csv'):
+        return func.HttpResponse(codec.dumps({"error": "format must be ndjson or csv"}), status_code=400, headers={**headers, "Content-Type": "application/json"})
+    join_games = req.params.get('games') in ('1', 'true')
+    since = (req.params.get('since') or '').strip() or None
+    try:
+        page_size = int(req.params.get('pageSize') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        page_size = DEFAULT_PAGE_SIZE
+    raw_token = req.params.get('continuationToken')
+    try:
+        token = paging.decode_token(raw_token)
+    except ValueError as e:
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=400, headers={**headers, "Content-Type": "application/json"})
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**headers, "Content-Type": "application/json"})
+
+    try:
+        rows, next_token = export.fetch_page(connection_string, since, page_size, token)
+        recs = export.records(connection_string, rows, join_games)
+        if fmt == 'csv':
+            body = export.csv_text(recs, header=not raw_token)
+            content_type = "text/csv; charset=utf-8"
+        else:
+            body = export.ndjson(recs)
+            content_type = "application/x-ndjson"
+    except Exception as e:
+        logging.exception("ExportScores query failed")
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=500, headers={**headers, "Content-Type": "application/json"})
+
+    out_headers = {**headers, "Content-Type": content_type}
+    if next_token:
+        out_headers["X-Continuation-Token"] = next_token
+    return compression.http_response(body, req, out_headers, status_code=200)
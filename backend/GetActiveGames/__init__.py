@@ -0,0 +1,88 @@
+"""Admin: games in progress right now, from the ActiveGames registry (O(active games)).
+
+GET (header x-admin-key)
+Returns { counts: { activeGames, players, staleGames, fixesPerSec }, games: [ { gameId,
+sessionId, playerCount, timeStarted, lastFixAt, ageSec, idleSec, fixesPerSec, stale } ] },
+newest game first. A game is stale when no fix arrived for ACTIVE_GAMES_STALE_SEC
+(default 120). fixesPerSec sums each worker's rate over its last full refresh window
+(ACTIVE_GAMES_TOUCH_SEC), so it trails the live rate by up to one window.
+"""
+
+import azure.functions as func
+import os
+from datetime import datetime
+from shared_code import active_games, admin, codec
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+STALE_SEC = _env_float("ACTIVE_GAMES_STALE_SEC", 120)
+
+
+def _seconds_since(iso, now):
+    try:
+        return max(0.0, (now - datetime.fromisoformat(str(iso).rstrip("Z"))).total_seconds())
+    except Exception:
+        return None
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-store",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+    if not admin.is_admin(req):
+        return func.HttpResponse(codec.dumps({"error": "Forbidden"}), status_code=403, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        rows = active_games.list_active(connection_string)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": f"Failed to read ActiveGames: {str(e)}"}), status_code=500, headers=headers)
+
+    now = datetime.utcnow()
+    games = []
+    players = stale_count = 0
+    total_rate = 0.0
+    for r in rows:
+        age = _seconds_since(r.get("timeStarted"), now)
+        idle = _seconds_since(r.get("lastFixAt"), now) if r.get("lastFixAt") else age
+        stale = idle is None or idle >= STALE_SEC
+        rate = 0.0 if stale else active_games.fixes_per_sec(r)
+        players += int(r.get("playerCount") or 0)
+        stale_count += 1 if stale else 0
+        total_rate += rate
+        games.append({
+            "gameId": r["RowKey"],
+            "sessionId": r.get("sessionId"),
+            "playerCount": r.get("playerCount"),
+            "timeStarted": r.get("timeStarted"),
+            "lastFixAt": r.get("lastFixAt"),
+            "ageSec": round(age, 1) if age is not None else None,
+            "idleSec": round(idle, 1) if idle is not None else None,
+            "fixesPerSec": round(rate, 2),
+            "stale": stale,
+        })
+    games.sort(key=lambda g: g["timeStarted"] or "", reverse=True)
+    body = {
+        "counts": {
+            "activeGames": len(games),
+            "players": players,
+            "staleGames": stale_count,
+            "fixesPerSec": round(total_rate, 2),
+        },
+        "games": games,
+    }
+    return func.HttpResponse(codec.dumps(body), status_code=200, headers=headers)
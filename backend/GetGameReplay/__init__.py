@@ -0,0 +1,168 @@
+"""Replay the ordered location fixes of a game as NDJSON, one storage page at a time.
+
+GET ?gameId=...&fromTs=<ms>&toTs=<ms>&fps=<frames/sec>&pageSize=<n>&continuationToken=<token>
+
+Reads the Fixes table (PartitionKey=gameId, RowKey=<ts>-<username>-<seq>) so rows come
+back in time order. Each response holds at most one storage page; only that page is
+materialized. Lines are {"type":"fix",...} followed by a final
+{"type":"page","continuationToken":...,"count":n}. The same token is returned in the
+X-Continuation-Token header; pass it back to fetch the next page (null/absent = done).
+With fps set, at most one fix per brush per 1/fps-second frame is emitted.
+
+Once a game is no longer in progress its fixes are read from the single GameArchives row
+(written by StartGame endGame), merged with any late Fixes rows that arrived after the
+archive; tokens then carry an offset into that merged stream.
+"""
+
+import azure.functions as func
+from shared_code import archive, codec, paging, storage
+import heapq
+import itertools
+import logging
+import os
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+def parse_int(value):
+    try:
+        return int(float(value)) if value not in (None, "") else None
+    except Exception:
+        return None
+
+
+def game_in_progress(connection_string, game_id):
+    """True unless the Games row says the game has finished (missing rows count as live)."""
+    try:
+        game = storage.table("Games", connection_string).get_entity("game", game_id, select=["status"])
+    except Exception:
+        return True
+    return game.get("status") in (None, "in progress")
+
+
+def archived_page(connection_string, game_id, query, params, from_ts, to_ts, page_size, offset):
+    """One page of the GameArchives trail merged with late Fixes rows (offset-based token).
+
+    Returns (fixes, next_token), or None when the game has no archive row.
+    """
+    entity = archive.load_archive(connection_string, game_id)
+    if entity is None:
+        return None
+    trails = archive.unpack_trails(entity)
+    # Late fixes (posted after endGame archived the game) are few; merge them by time
+    late = [
+        (int(e["timestamp"]), e.get("username"), e.get("latitude"), e.get("longitude"), e.get("totalDistance"))
+        for e in storage.table("Fixes", connection_string).query_entities(
+            query, parameters=params, select=["username", "latitude", "longitude", "timestamp", "totalDistance"])
+        if e.get("timestamp") is not None
+    ]
+    merged = heapq.merge(late, *[[(ts, u, lat, lng, None) for ts, lat, lng in pts] for u, pts in trails.items()],
+                         key=lambda f: (f[0], f[1] or ""))
+    window = (f for f in merged if (from_ts is None or f[0] >= from_ts) and (to_ts is None or f[0] <= to_ts))
+    fixes = [
+        {"username": u, "latitude": lat, "longitude": lng, "timestamp": ts, "totalDistance": dist}
+        for ts, u, lat, lng, dist in itertools.islice(window, offset, offset + page_size + 1)
+    ]
+    if len(fixes) > page_size:
+        return fixes[:page_size], paging.encode_token({"archiveOffset": offset + page_size})
+    return fixes, None
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "X-Continuation-Token",
+        "Cache-Control": "no-store",
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    game_id = req.params.get("gameId")
+    if not game_id:
+        return func.HttpResponse(codec.dumps({"error": "Missing gameId"}), status_code=400, headers={**headers, "Content-Type": "application/json"})
+
+    from_ts = parse_int(req.params.get("fromTs"))
+    to_ts = parse_int(req.params.get("toTs"))
+    fps = None
+    try:
+        fps = float(req.params.get("fps")) if req.params.get("fps") else None
+        if fps is not None and fps <= 0:
+            fps = None
+    except Exception:
+        fps = None
+    page_size = parse_int(req.params.get("pageSize")) or DEFAULT_PAGE_SIZE
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        page_size = DEFAULT_PAGE_SIZE
+    try:
+        token = paging.decode_token(req.params.get("continuationToken"))
+    except Exception:
+        return func.HttpResponse(codec.dumps({"error": "Invalid continuationToken"}), status_code=400, headers={**headers, "Content-Type": "application/json"})
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**headers, "Content-Type": "application/json"})
+
+    # RowKeys start with a 13-digit millisecond timestamp, so the time window is a RowKey range
+    query = "PartitionKey eq @gid"
+    params = {"gid": game_id}
+    if from_ts is not None:
+        query += " and RowKey ge @lo"
+        params["lo"] = f"{max(from_ts, 0):013d}"
+    if to_ts is not None:
+        query += " and RowKey lt @hi"
+        params["hi"] = f"{max(to_ts + 1, 0):013d}"
+
+    try:
+        page = None
+        if isinstance(token, dict) and "archiveOffset" in token:
+            page = archived_page(connection_string, game_id, query, params, from_ts, to_ts, page_size, int(token["archiveOffset"])) or ([], None)
+        elif token is None and not game_in_progress(connection_string, game_id):
+            # Finished games are moved out of Fixes into a single GameArchives row
+            page = archived_page(connection_string, game_id, query, params, from_ts, to_ts, page_size, 0)
+        if page is not None:
+            fixes, next_token = page
+        else:
+            table = storage.table("Fixes", connection_string)
+            pages = table.query_entities(
+                query,
+                parameters=params,
+                select=["username", "latitude", "longitude", "timestamp", "totalDistance"],
+                results_per_page=page_size,
+            ).by_page(continuation_token=token)
+            fixes = list(next(pages, []))
+            # An empty page can still carry a token (partition/server boundary); keep paging
+            next_token = paging.encode_token(pages.continuation_token)
+
+        frame_ms = 1000.0 / fps if fps else None
+        last_frame = {}
+        lines = []
+        count = 0
+        for e in fixes:
+            ts = e.get("timestamp")
+            user = e.get("username")
+            if frame_ms is not None and ts is not None:
+                frame = int(ts // frame_ms)
+                if last_frame.get(user) == frame:
+                    continue
+                last_frame[user] = frame
+            lines.append(codec.dumps({
+                "type": "fix",
+                "username": user,
+                "latitude": e.get("latitude"),
+                "longitude": e.get("longitude"),
+                "timestamp": ts,
+                "totalDistance": e.get("totalDistance"),
+            }))
+            count += 1
+    except Exception as e:
+        logging.exception("GetGameReplay query failed")
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=500, headers={**headers, "Content-Type": "application/json"})
+
+    lines.append(codec.dumps({"type": "page", "continuationToken": next_token, "count": count}))
+    out_headers = {**headers, "Content-Type": "application/x-ndjson"}
+    if next_token:
+        out_headers["X-Continuation-Token"] = next_token
+    return func.HttpResponse("\n".join(lines) + "\n", status_code=200, headers=out_headers)
@@ -0,0 +1,106 @@
+"""One poll for the in-game screen: session status, roles and brush positions.
+
+GET ?sessionId=...&version=<last version>&since=<last asOf>
+
+Replaces the separate getLocations + JoinSession polls with one response:
+{ sessionId, version, sessionChanged, isStarted, currentGameId, roles?, painter?,
+  positions: [{ username, latitude, longitude, timestamp, totalDistance, seq }], asOf, delta,
+  pollAfterMs }
+
+- version is the Sessions row ETag. When the caller's version matches, roles/painter
+  are omitted (sessionChanged=false).
+- since (the previous response's asOf) limits positions to Distances rows updated
+  after it (delta=true); without it every brush's latest row is returned.
+- pollAfterMs (also the X-Poll-After-Ms header) is the suggested delay before the next
+  poll; it grows while neither the session version nor the positions' asOf change.
+- Storage: one Sessions point read, plus one Distances partition query while a game
+  is running.
+"""
+
+import azure.functions as func
+import os
+from shared_code import codec, compression, polling, ratelimit, storage
+
+
+@ratelimit.shed("high")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "Retry-After, X-Poll-After-Ms",
+        "Cache-Control": "no-store",
+        "Vary": "Accept",
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    session_id = req.params.get("sessionId")
+    if not session_id:
+        return func.HttpResponse(codec.dumps({"error": "Missing sessionId"}), status_code=400, headers={**headers, "Content-Type": "application/json"})
+
+    limited = ratelimit.check_poll("GetGameState", req, session_id, headers)
+    if limited:
+        return limited
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**headers, "Content-Type": "application/json"})
+
+    try:
+        session = storage.table("Sessions", connection_string).get_entity(partition_key="session", row_key=session_id)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": f"Session not found: {str(e)}"}), status_code=404, headers={**headers, "Content-Type": "application/json"})
+
+    version = session.metadata.get("etag") if hasattr(session, "metadata") else None
+    session_changed = req.params.get("version") != version
+    game_id = session.get("currentGameId")
+    is_started = bool(session.get("isStarted", False))
+    state = {
+        "sessionId": session_id,
+        "version": version,
+        "sessionChanged": session_changed,
+        "isStarted": is_started,
+        "currentGameId": game_id,
+    }
+    if session_changed:
+        state["roles"] = codec.loads_or(session.get("roles"), {})
+        state["painter"] = session.get("painter", "")
+
+    since = req.params.get("since")
+    positions = []
+    as_of = since
+    if is_started and game_id:
+        query = "PartitionKey eq @gid"
+        params = {"gid": game_id}
+        if since:
+            query += " and lastUpdated gt @since"
+            params["since"] = since
+        try:
+            rows = storage.table("Distances", connection_string).query_entities(
+                query,
+                parameters=params,
+                select=["RowKey", "location", "totalDistance", "seq", "lastUpdated"],
+            )
+            for r in rows:
+                loc = codec.loads_or(r.get("location"), {})
+                positions.append({
+                    "username": r["RowKey"],
+                    "latitude": loc.get("latitude"),
+                    "longitude": loc.get("longitude"),
+                    "timestamp": loc.get("timestamp"),
+                    "totalDistance": float(r.get("totalDistance") or 0.0),
+                    "seq": r.get("seq"),
+                })
+                updated = r.get("lastUpdated")
+                if updated and (as_of is None or updated > as_of):
+                    as_of = updated
+        except Exception:
+            positions = []  # Distances not created yet / transient: keep the poll alive
+    state["positions"] = positions
+    state["asOf"] = as_of
+    state["delta"] = bool(since)
+    out_headers, state["pollAfterMs"] = polling.hint("GetGameState", session_id, f"{version}|{as_of}", headers)
+
+    body, mimetype = codec.encode(state, req)
+    return compression.http_response(body, req, {**out_headers, "Content-Type": mimetype}, status_code=200)
@@ -1,8 +1,13 @@
-"""List high scores with optional template filter and pagination."""
+"""List high scores with optional template filter and pagination.
+
+GET ?templateId=<id>&page=<n>&pageSize=<1..50>[&window=day|week|month[&bucket=<id>]]
+Without window the ranking covers every Scores row. With window it is read from the
+current (or the given) Leaderboards bucket: one partition of at most LEADERBOARD_TOP_K
+games, so its cost does not grow with history. Windowed responses add window and bucket.
+"""
 
 import azure.functions as func
-from azure.data.tables import TableClient
-import json
+from shared_code import codec, compression, leaderboards, ratelimit, response_cache, storage
 import os
 from datetime import datetime
 
@@ -16,11 +21,13 @@ def parse_iso(ts: str):
         return None
 
 
+@ratelimit.shed("low")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
         "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "X-Cache",
         "Content-Type": "application/json"
     }
 
@@ -35,15 +42,35 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             page = 1
         if page_size < 1 or page_size > 50:
             page_size = 10
+        window = (req.params.get('window') or '').strip().lower() or None
+        bucket = (req.params.get('bucket') or '').strip() or None
+        if window and window not in leaderboards.WINDOWS:
+            return func.HttpResponse(codec.dumps({"error": "window must be day, week or month"}), status_code=400, headers=headers)
+        if window:
+            bucket = bucket or leaderboards.bucket_for(window, datetime.utcnow())
+            try:
+                leaderboards.bucket_end(window, bucket)
+            except ValueError:
+                return func.HttpResponse(codec.dumps({"error": "Invalid bucket for window"}), status_code=400, headers=headers)
 
         connection_string = os.getenv("AzureWebJobsStorage")
-        scores_table = TableClient.from_connection_string(connection_string, table_name="Scores")
+        # Pages only change when a Scores row is written (scores version bump)
+        cache_key = ("GetHighScores", template_id or "", page, page_size, window or "", bucket or "")
+        version = response_cache.current_version("scores", connection_string)
+        body = response_cache.get(cache_key, version)
+        if body is not None:
+            return compression.http_response(body, req, {**headers, "X-Cache": "HIT"}, status_code=200)
+
+        scores_table = storage.table("Scores", connection_string)
 
-        rows = list(scores_table.query_entities("PartitionKey eq 'score'"))
+        if window:
+            _, rows = leaderboards.top(connection_string, window, template_id, bucket)
+        else:
+            rows = list(scores_table.query_entities("PartitionKey eq 'score'"))
         # Optional templates lookup for friendly names
         templates_table = None
         try:
-            templates_table = TableClient.from_connection_string(connection_string, table_name="Templates")
+            templates_table = storage.table("Templates", connection_string)
         except Exception:
             templates_table = None
         items = []
@@ -59,7 +86,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 players = []
                 if isinstance(players_raw, str):
                     try:
-                        players = json.loads(players_raw)
+                        players = codec.loads(players_raw)
                     except Exception:
                         players = []
                 elif isinstance(players_raw, list):
@@ -88,6 +115,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     'templateName': tpl_name,
                     'finalScore': r.get('finalScore'),
                     'totalAccuracy': r.get('totalAccuracy'),
+                    'hausdorffMeters': r.get('hausdorffMeters'),
+                    'frechetMeters': r.get('frechetMeters'),
+                    'turningDistance': r.get('turningDistance'),
                     'players': players,
                     'hasDrawing': bool(r.get('drawing') or r.get('hasDrawing')),
                 })
@@ -110,10 +140,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         end = start + page_size
         page_items = items[start:end]
 
-        return func.HttpResponse(
-            json.dumps({ 'games': page_items, 'page': page, 'pageSize': page_size, 'total': total }),
-            status_code=200,
-            headers=headers
-        )
+        result = { 'games': page_items, 'page': page, 'pageSize': page_size, 'total': total }
+        if window:
+            result.update(window=window, bucket=bucket)
+        body = codec.dumps(result)
+        response_cache.put(cache_key, version, body)
+        return compression.http_response(body, req, {**headers, "X-Cache": "MISS"}, status_code=200)
     except Exception as e:
-        return func.HttpResponse(json.dumps({ 'games': [], 'page': 1, 'pageSize': 10, 'total': 0 }), status_code=200, headers=headers)
+        return func.HttpResponse(codec.dumps({ 'games': [], 'page': 1, 'pageSize': 10, 'total': 0 }), status_code=200, headers=headers)
@@ -1,8 +1,7 @@
 """List games for a given username, including role and accuracy, paginated."""
 
 import azure.functions as func
-from azure.data.tables import TableClient
-import json
+from shared_code import codec, compression, ratelimit, response_cache, storage
 import os
 from datetime import datetime
 
@@ -16,11 +15,13 @@ def parse_iso(ts: str):
         return None
 
 
+@ratelimit.shed("low")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
         "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "X-Cache",
         "Content-Type": "application/json"
     }
 
@@ -37,10 +38,17 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             page_size = 10
 
         if not username:
-            return func.HttpResponse(json.dumps({ "games": [], "page": page, "pageSize": page_size, "total": 0 }), status_code=200, headers=headers)
+            return func.HttpResponse(codec.dumps({ "games": [], "page": page, "pageSize": page_size, "total": 0 }), status_code=200, headers=headers)
 
         connection_string = os.getenv("AzureWebJobsStorage")
-        scores_table = TableClient.from_connection_string(connection_string, table_name="Scores")
+        # Pages only change when a Scores row is written (scores version bump)
+        cache_key = ("GetPlayerGames", username, page, page_size)
+        version = response_cache.current_version("scores", connection_string)
+        body = response_cache.get(cache_key, version)
+        if body is not None:
+            return compression.http_response(body, req, {**headers, "X-Cache": "HIT"}, status_code=200)
+
+        scores_table = storage.table("Scores", connection_string)
 
         # Fetch all score rows (PartitionKey == 'score'), then filter by username in players JSON
         rows = list(scores_table.query_entities("PartitionKey eq 'score'"))
@@ -51,7 +59,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 players = []
                 if isinstance(players_raw, str):
                     try:
-                        players = json.loads(players_raw)
+                        players = codec.loads(players_raw)
                     except Exception:
                         players = []
                 elif isinstance(players_raw, list):
@@ -79,6 +87,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     'templateName': r.get('templateName') or r.get('templateId'),
                     'finalScore': r.get('finalScore'),
                     'totalAccuracy': r.get('totalAccuracy'),
+                    'hausdorffMeters': r.get('hausdorffMeters'),
+                    'frechetMeters': r.get('frechetMeters'),
+                    'turningDistance': r.get('turningDistance'),
                     'role': found.get('role'),
                     'accuracy': found.get('accuracy'),
                     'hasDrawing': bool(r.get('drawing') or r.get('hasDrawing')),
@@ -98,10 +109,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         end = start + page_size
         page_items = items[start:end]
 
-        return func.HttpResponse(
-            json.dumps({ 'games': page_items, 'page': page, 'pageSize': page_size, 'total': total }),
-            status_code=200,
-            headers=headers
-        )
+        body = codec.dumps({ 'games': page_items, 'page': page, 'pageSize': page_size, 'total': total })
+        response_cache.put(cache_key, version, body)
+        return compression.http_response(body, req, {**headers, "X-Cache": "MISS"}, status_code=200)
     except Exception as e:
-        return func.HttpResponse(json.dumps({ "games": [], "page": 1, "pageSize": 10, "total": 0 }), status_code=200, headers=headers)
+        return func.HttpResponse(codec.dumps({ "games": [], "page": 1, "pageSize": 10, "total": 0 }), status_code=200, headers=headers)
@@ -0,0 +1,37 @@
+"""Career statistics of one player from the PlayerStats table (a single point read).
+
+GET ?username=<name>
+Returns { username, games, painterGames, brushGames, averageScore, bestScore, worstScore,
+averageAccuracy, bestAccuracy, worstAccuracy, totalDistanceMeters, longestDistanceMeters,
+totalPlaySeconds, firstGameAt, lastGameAt }; a player with no counted games gets games=0.
+"""
+
+import azure.functions as func
+import os
+from shared_code import codec, player_stats, storage
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-cache",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    username = (req.params.get('username') or '').strip()
+    if not username:
+        return func.HttpResponse(codec.dumps({"error": "Missing username"}), status_code=400, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        row = storage.table(player_stats.TABLE, connection_string).get_entity(player_stats.PARTITION, username)
+    except Exception:
+        row = {"RowKey": username}
+    return func.HttpResponse(codec.dumps(player_stats.profile(row)), status_code=200, headers=headers)
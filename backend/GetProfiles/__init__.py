@@ -0,0 +1,52 @@
+"""Admin: list or fetch request profiles captured by shared_code.profiling.
+
+GET (header x-admin-key)
+  ?id=<profileId>                        -> one capture: { profileId, endpoint, method, query,
+                                            statusCode, trigger, durationMs, peakKb, allocationScope,
+                                            createdAt, functions: [...], allocations: [...] }
+  [?endpoint=<handler>][&limit=<1..50>]  -> { profiles: [summary, ...] } newest first
+With PROFILE_SINK=local only captures held by the worker answering the call are visible.
+functions cover only the profiled request's thread. allocations and peakKb come from
+process-wide tracemalloc: with allocationScope "handler", sites are limited to tracebacks
+through the handler's module, but concurrent requests of the same handler still count.
+"""
+
+import azure.functions as func
+import os
+from shared_code import admin, codec, profiling
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-store",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+    if not admin.is_admin(req):
+        return func.HttpResponse(codec.dumps({"error": "Forbidden"}), status_code=403, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string and profiling.SINK != "local":
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    profile_id = (req.params.get('id') or '').strip()
+    if profile_id:
+        capture = profiling.get_profile(connection_string, profile_id)
+        if capture is None:
+            return func.HttpResponse(codec.dumps({"error": "Profile not found"}), status_code=404, headers=headers)
+        return func.HttpResponse(codec.dumps(capture), status_code=200, headers=headers)
+
+    try:
+        limit = int(req.params.get('limit') or 20)
+    except ValueError:
+        limit = 20
+    limit = max(1, min(50, limit))
+    try:
+        profiles = profiling.list_profiles(connection_string, limit=limit, endpoint=(req.params.get('endpoint') or '').strip() or None)
+    except Exception:
+        profiles = []  # nothing captured yet
+    return func.HttpResponse(codec.dumps({"profiles": profiles}), status_code=200, headers=headers)
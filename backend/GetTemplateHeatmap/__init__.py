@@ -0,0 +1,68 @@
+"""Density heatmap of stored trails for one template, in the template's unit frame.
+
+GET ?templateId=<id>&raw=<0|1>&rebuild=<0|1>
+Returns { templateId, bins, extent, games, points, max, normalized, updatedAt, complete,
+grid } where grid is bins×bins (rows north to south, columns west to east) covering
+[-extent, extent]² in units of the template radius; values are 0..1 relative to max
+unless raw=1 (counts).
+The cached raster (shared_code.heatmap) is refreshed incrementally when older than
+HEATMAP_REFRESH_SEC, folding in at most HEATMAP_MAX_ROWS games per request. rebuild=1
+(x-admin-key required) starts from an empty grid.
+"""
+
+import azure.functions as func
+import os
+from datetime import datetime, timezone
+from shared_code import admin, codec, compression, heatmap
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+REFRESH_SEC = _env_float("HEATMAP_REFRESH_SEC", 300)
+MAX_ROWS = int(_env_float("HEATMAP_MAX_ROWS", 2000))
+
+
+def _age_sec(iso):
+    try:
+        ts = datetime.fromisoformat(str(iso).rstrip("Z")).replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - ts).total_seconds()
+    except Exception:
+        return None
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-cache",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    template_id = (req.params.get('templateId') or '').strip()
+    if not template_id:
+        return func.HttpResponse(codec.dumps({"error": "Missing templateId"}), status_code=400, headers=headers)
+    raw = req.params.get('raw') in ('1', 'true')
+    rebuild = req.params.get('rebuild') in ('1', 'true')
+    if rebuild and not admin.is_admin(req):
+        return func.HttpResponse(codec.dumps({"error": "Forbidden"}), status_code=403, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        entity = None if rebuild else heatmap.load(connection_string, template_id)
+        age = _age_sec(entity.get("updatedAt")) if entity else None
+        if entity is None or not entity.get("complete", True) or age is None or age >= REFRESH_SEC:
+            entity = heatmap.update(connection_string, template_id, rebuild=rebuild, max_rows=MAX_ROWS)
+        body = {"templateId": template_id, **heatmap.to_json(entity, normalize=not raw)}
+        return compression.http_response(codec.dumps(body), req, headers, status_code=200, etag=True)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=500, headers=headers)
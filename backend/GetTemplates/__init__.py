@@ -1,15 +1,24 @@
-"""Return the templates catalog with base vertices and multipliers for clients."""
+"""Return the templates catalog with base vertices and multipliers for clients.
+
+Optional LOD query: ?zoom=<map zoom>&radiusMeters=<m>&lat=<deg> or ?lod=<index>. When
+given, baseVertices is the precompiled simplification appropriate for that scale and
+each item also carries lod, bbox and perimeter. Without it the full vertices are served.
+?vertices=0 omits baseVertices (and the LOD fields) for lists that show GetThumbnail
+previews instead of drawing the outline themselves.
+"""
 
 import azure.functions as func
-from azure.data.tables import TableClient
 import os
-import json
+from shared_code import codec, compression, geometry, storage
+
+SUMMARY_FIELDS = ["RowKey", "displayName", "pointCount", "innerRatio", "hasCustomVertices", "isCustom", "multiplier"]
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, OPTIONS",
         "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "ETag",
         "Cache-Control": "no-store"
     }
 
@@ -19,16 +28,33 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         connection_string = os.getenv("AzureWebJobsStorage")
         if not connection_string:
-            return func.HttpResponse(json.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
 
-        table = TableClient.from_connection_string(connection_string, table_name="Templates")
+        table = storage.table("Templates", connection_string)
 
         # We assume each row: PartitionKey='template', RowKey=templateId, optional fields
+        with_vertices = req.params.get("vertices") not in ("0", "false")
         try:
-            entities = list(table.query_entities("PartitionKey eq 'template'"))
+            if with_vertices:
+                entities = list(table.query_entities("PartitionKey eq 'template'"))
+            else:
+                entities = list(table.query_entities("PartitionKey eq 'template'", select=SUMMARY_FIELDS))
         except Exception:
             entities = []  # If table empty or filter fails return empty list gracefully
 
+        lod_param = req.params.get("lod")
+        zoom = req.params.get("zoom")
+        radius = req.params.get("radiusMeters")
+        lat = req.params.get("lat")
+        try:
+            lod_param = int(lod_param) if lod_param not in (None, "") else None
+            zoom = float(zoom) if zoom not in (None, "") else None
+            radius = float(radius) if radius not in (None, "") else None
+            lat = float(lat) if lat not in (None, "") else None
+        except ValueError:
+            return func.HttpResponse(codec.dumps({"error": "Invalid lod/zoom/radiusMeters/lat"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+        want_lod = lod_param is not None or zoom is not None or radius is not None
+
         items = []
         default_mult = {
             'star': 1.6,
@@ -47,15 +73,28 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 "displayName": e.get("displayName", template_id.capitalize()),
             }
             # Pass through stored normalized base vertices (array of {x,y}) if present
-            if e.get("baseVertices"):
+            if with_vertices and e.get("baseVertices"):
                 try:
                     # Support either stored JSON string or native array
                     if isinstance(e.get("baseVertices"), str):
-                        item["baseVertices"] = json.loads(e.get("baseVertices"))
+                        item["baseVertices"] = codec.loads(e.get("baseVertices"))
                     else:
                         item["baseVertices"] = e.get("baseVertices")
                 except Exception:
                     pass
+            if with_vertices and want_lod:
+                geo = geometry.geometry_from_entity(e, codec.loads)
+                if geo:
+                    if lod_param is not None:
+                        lods = geo["lods"]
+                        idx = max(0, min(lod_param, len(lods) - 1))
+                        lod = lods[idx]
+                    else:
+                        idx, lod = geometry.select_lod(geo, radius, zoom, lat)
+                    item["baseVertices"] = lod["vertices"]
+                    item["lod"] = idx
+                    item["bbox"] = geo.get("bbox")
+                    item["perimeter"] = geo.get("perimeter")
             if e.get("pointCount") is not None:
                 item["pointCount"] = e.get("pointCount")
             if e.get("innerRatio") is not None:
@@ -76,6 +115,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 item["multiplier"] = float(default_mult.get(template_id, 1.0))
             items.append(item)
 
-        return func.HttpResponse(json.dumps({"templates": items}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
+        # Catalog changes rarely: ETag + memoized compressed bytes, clients revalidate (no-cache)
+        return compression.http_response(codec.dumps({"templates": items}), req, {**cors_headers, "Cache-Control": "no-cache", "Content-Type": "application/json"}, status_code=200, etag=True)
     except Exception as e:
-        return func.HttpResponse(json.dumps({"error": str(e), "templates": []}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+        return func.HttpResponse(codec.dumps({"error": str(e), "templates": []}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
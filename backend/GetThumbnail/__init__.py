@@ -0,0 +1,85 @@
+"""Small SVG preview of a template or of a saved game drawing.
+
+GET ?templateId=<id>[&size=<px>]  -> template outline
+GET ?gameId=<id>[&size=<px>]      -> template outline + brush trails of the Scores row
+size: 16..512, default 96. Responds image/svg+xml (a few hundred bytes) with an ETag
+derived from the source geometry, so If-None-Match revalidation returns 304 without
+rendering. Both kinds are served no-cache and revalidated on every use: templates can be
+edited, and a game's drawing is rewritten when the painter's endGame follows the admin's.
+"""
+
+import azure.functions as func
+import os
+from shared_code import codec, compression, geometry, storage, thumbnails
+
+SCORE_FIELDS = ["RowKey", "templateId", "templateCenter", "templateRadiusMeters", "templateVertices", "drawing"]
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "ETag",
+    }
+    json_headers = {**headers, "Cache-Control": "no-store", "Content-Type": "application/json"}
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=json_headers)
+
+    template_id = (req.params.get('templateId') or '').strip()
+    game_id = (req.params.get('gameId') or '').strip()
+    if bool(template_id) == bool(game_id):
+        return func.HttpResponse(codec.dumps({"error": "Pass exactly one of templateId or gameId"}), status_code=400, headers=json_headers)
+    try:
+        size = int(req.params.get('size') or thumbnails.DEFAULT_SIZE)
+    except ValueError:
+        return func.HttpResponse(codec.dumps({"error": "Invalid size"}), status_code=400, headers=json_headers)
+    size = max(thumbnails.MIN_SIZE, min(thumbnails.MAX_SIZE, size))
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=json_headers)
+    templates = storage.table("Templates", connection_string)
+
+    if template_id:
+        try:
+            tdef = templates.get_entity("template", template_id, select=["geometry", "baseVertices"])
+        except Exception:
+            return func.HttpResponse(codec.dumps({"error": "Template not found"}), status_code=404, headers=json_headers)
+        key = thumbnails.source_key("template", template_id, size, tdef.get("geometry") or "", tdef.get("baseVertices") or "")
+
+        def render():
+            geo = geometry.geometry_from_entity(tdef, codec.loads)
+            return thumbnails.template_svg(geo, size) if geo else None
+    else:
+        try:
+            row = storage.table("Scores", connection_string).get_entity("score", game_id, select=SCORE_FIELDS)
+        except Exception:
+            return func.HttpResponse(codec.dumps({"error": "Game not found"}), status_code=404, headers=json_headers)
+        if not row.get("drawing"):
+            return func.HttpResponse(codec.dumps({"error": "Game has no stored drawing"}), status_code=404, headers=json_headers)
+        base_raw = ""
+        if row.get("templateId") and row.get("templateId") != "polygon":
+            try:
+                base_raw = templates.get_entity("template", row["templateId"], select=["baseVertices"]).get("baseVertices") or ""
+            except Exception:
+                base_raw = ""  # deleted template: built-in fallback outline
+        key = thumbnails.source_key(
+            "game", game_id, size, row.get("templateId") or "", row.get("templateCenter") or "",
+            row.get("templateRadiusMeters"), row.get("templateVertices") or "", base_raw, row["drawing"],
+        )
+
+        def render():
+            return thumbnails.drawing_svg(row, size, base_vertices=codec.loads_or(base_raw, None))
+
+    tag = '"' + key + '"'
+    out_headers = {**headers, "Cache-Control": "no-cache", "Content-Type": "image/svg+xml", "ETag": tag}
+    if req.headers.get("If-None-Match") == tag:
+        return func.HttpResponse(b"", status_code=304, headers=out_headers)
+    try:
+        svg = thumbnails.cached(key, render)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": f"Render failed: {str(e)}"}), status_code=500, headers=json_headers)
+    if svg is None:
+        return func.HttpResponse(codec.dumps({"error": "Template has no geometry"}), status_code=404, headers=json_headers)
+    return compression.http_response(svg, req, out_headers, status_code=200)
@@ -0,0 +1,215 @@
+"""Hourly cleanup of stale sessions and finished-game telemetry.
+
+- Sessions idle longer than JANITOR_SESSION_IDLE_HOURS (default 24) are deleted together
+  with their OpenSessions, SessionGeo and SessionMembers rows. A session is idle when
+  neither its Sessions row nor any of its SessionMembers rows (joins, ready toggles)
+  has a newer Table Timestamp than the cutoff.
+- Games still "in progress" after JANITOR_GAME_ABANDON_HOURS (default 6) are marked
+  status="abandoned" with timeCompleted stamped and removed from ActiveGames.
+- Live telemetry (Distances/Fixes) of games completed/abandoned more than
+  JANITOR_TELEMETRY_RETENTION_HOURS ago (default 1) is moved into GameArchives and
+  deleted, and the game is flagged telemetryPurged. Each run reads up to
+  JANITOR_TELEMETRY_PAGES (default 5) pages of finished games, resuming from the
+  continuation token saved in JanitorState. A pass covers timeCompleted in
+  [watermark, passHi): the first pass has no watermark, so the whole history (including
+  games finished before the Janitor existed) is swept once; each completed pass moves
+  the watermark to its passHi, so later passes only read newly finished games.
+- Leaderboards buckets past their retention (see shared_code.leaderboards) are deleted.
+
+All writes are batched transactions (<= 100 operations, one partition each). The run
+summary is logged as JSON.
+"""
+
+import azure.functions as func
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from shared_code import active_games, archive, codec, geo_index, leaderboards, lobby, members, paging, storage
+
+BATCH_SIZE = 100
+STATE_TABLE = "JanitorState"
+STATE_PARTITION = "janitor"
+TELEMETRY_CURSOR = "telemetry"
+TELEMETRY_PAGE_SIZE = 1000
+
+
+def _env_hours(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z"
+
+
+def submit_batched(table, operations):
+    """Submit (op, entity[, kwargs]) tuples in <= BATCH_SIZE chunks per PartitionKey. Returns ops applied."""
+    by_partition = {}
+    for op in operations:
+        by_partition.setdefault(op[1]["PartitionKey"], []).append(op)
+    done = 0
+    for ops in by_partition.values():
+        for i in range(0, len(ops), BATCH_SIZE):
+            chunk = ops[i:i + BATCH_SIZE]
+            try:
+                table.submit_transaction(chunk)
+                done += len(chunk)
+            except Exception:
+                logging.exception("Janitor batch failed (%d ops)", len(chunk))
+    return done
+
+
+def _members_active(conn, session_id, cutoff):
+    try:
+        return members.active_since(conn, session_id, cutoff)
+    except Exception:
+        logging.exception("Janitor member activity check failed for %s", session_id)
+        return True  # keep the session rather than purge on a failed read
+
+
+def purge_idle_sessions(conn, now, idle_hours):
+    sessions = storage.table("Sessions", conn)
+    cutoff = now - timedelta(hours=idle_hours)
+    stale = list(sessions.query_entities(
+        "PartitionKey eq 'session' and Timestamp lt @cutoff",
+        parameters={"cutoff": cutoff},
+        select=["PartitionKey", "RowKey", "lobbyKey", "geoHash"],
+    ))
+    # Joins and ready toggles only write SessionMembers rows, so the Sessions Timestamp
+    # alone undercounts activity; keep sessions whose members were touched recently.
+    stale = [s for s in stale if not _members_active(conn, s["RowKey"], cutoff)]
+    deleted = submit_batched(sessions, [("delete", {"PartitionKey": s["PartitionKey"], "RowKey": s["RowKey"]}) for s in stale])
+    index_ops = [("delete", {"PartitionKey": lobby.PARTITION, "RowKey": lobby.lobby_key_for(s)}) for s in stale]
+    try:
+        submit_batched(storage.table(lobby.TABLE, conn), index_ops)
+    except Exception:
+        logging.exception("Janitor OpenSessions cleanup failed")
+    for s in stale:
+        members.remove_all(conn, s["RowKey"])
+        geo_index.remove(conn, s)
+    return deleted
+
+
+def mark_abandoned_games(conn, now, abandon_hours):
+    games = storage.table("Games", conn)
+    cutoff = _iso(now - timedelta(hours=abandon_hours))
+    orphaned = list(games.query_entities(
+        "PartitionKey eq 'game' and status eq 'in progress' and timeStarted lt @cutoff",
+        parameters={"cutoff": cutoff},
+        select=["PartitionKey", "RowKey"],
+    ))
+    stamp = _iso(now)
+    ops = [("update", {"PartitionKey": g["PartitionKey"], "RowKey": g["RowKey"], "status": "abandoned", "timeCompleted": stamp}, {"mode": "merge"}) for g in orphaned]
+    count = submit_batched(games, ops)
+    for g in orphaned:
+        active_games.unregister(conn, g["RowKey"])
+    return count
+
+
+def _load_state(conn, name):
+    """(continuation token, watermark, pass upper bound) of a resumable scan."""
+    try:
+        row = storage.table(STATE_TABLE, conn, create=True).get_entity(STATE_PARTITION, name)
+    except Exception:
+        return None, None, None
+    try:
+        token = paging.decode_token(row.get("continuationToken"))
+    except ValueError:
+        token = None
+    return token, row.get("watermark") or None, row.get("passHi") or None
+
+
+def _save_state(conn, name, token, watermark, pass_hi):
+    storage.table(STATE_TABLE, conn, create=True).upsert_entity({
+        "PartitionKey": STATE_PARTITION,
+        "RowKey": name,
+        "continuationToken": paging.encode_token(token) or "",
+        "watermark": watermark or "",
+        "passHi": pass_hi or "",
+        "updatedAt": _iso(datetime.utcnow()),
+    })
+
+
+def purge_finished_telemetry(conn, now, retention_hours, max_pages):
+    """Archive/delete telemetry of finished games, max_pages pages per run. Returns (scanned, purged, rows)."""
+    games = storage.table("Games", conn)
+    token, watermark, pass_hi = _load_state(conn, TELEMETRY_CURSOR)
+    if token is None or pass_hi is None:
+        # New pass: games finished since the previous pass's bound and before the retention cutoff
+        token, pass_hi = None, _iso(now - timedelta(hours=retention_hours))
+    # telemetryPurged cannot be filtered server-side (a missing property never matches),
+    # so a pass walks every finished game in [watermark, passHi); the bound stays fixed
+    # for the whole pass so the saved continuation token keeps matching the query
+    query = "PartitionKey eq 'game' and (status eq 'completed' or status eq 'abandoned') and timeCompleted lt @hi"
+    params = {"hi": pass_hi}
+    if watermark:
+        query += " and timeCompleted ge @lo"
+        params["lo"] = watermark
+    pages = games.query_entities(
+        query,
+        parameters=params,
+        select=["PartitionKey", "RowKey", "telemetryPurged", "sessionId", "timeStarted", "timeCompleted", "roles"],
+        results_per_page=TELEMETRY_PAGE_SIZE,
+    ).by_page(continuation_token=token)
+    scanned = rows_deleted = games_purged = 0
+    for _ in range(max_pages):
+        page = next(pages, None)
+        if page is None:
+            break
+        for g in page:
+            scanned += 1
+            if g.get("telemetryPurged"):
+                continue
+            game_id = g["RowKey"]
+            # Games that ended without a clean endGame (or abandoned) still hold live rows: archive them
+            summary = archive.archive_game(conn, game_id, g)
+            if summary:
+                rows_deleted += summary["distanceRowsDeleted"] + summary["fixRowsDeleted"]
+            try:
+                games.update_entity({"PartitionKey": "game", "RowKey": game_id, "telemetryPurged": True}, mode="merge")
+                games_purged += 1
+            except Exception:
+                logging.exception("Janitor could not flag game %s", game_id)
+        if not pages.continuation_token:
+            break
+    if pages.continuation_token:
+        _save_state(conn, TELEMETRY_CURSOR, pages.continuation_token, watermark, pass_hi)
+    else:
+        # Pass complete: the next one only looks at games finished after this pass's bound
+        _save_state(conn, TELEMETRY_CURSOR, None, pass_hi, None)
+    return scanned, games_purged, rows_deleted
+
+
+def main(timer: func.TimerRequest) -> None:
+    conn = os.getenv("AzureWebJobsStorage")
+    if not conn:
+        logging.error("Janitor: missing AzureWebJobsStorage")
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    summary = {"ranAt": _iso(now), "pastDue": bool(getattr(timer, "past_due", False))}
+    try:
+        summary["sessionsDeleted"] = purge_idle_sessions(conn, now.replace(tzinfo=timezone.utc), _env_hours("JANITOR_SESSION_IDLE_HOURS", 24))
+    except Exception:
+        logging.exception("Janitor: session purge failed")
+    try:
+        summary["gamesAbandoned"] = mark_abandoned_games(conn, now, _env_hours("JANITOR_GAME_ABANDON_HOURS", 6))
+    except Exception:
+        logging.exception("Janitor: abandoned-game sweep failed")
+    try:
+        scanned, games_purged, rows_deleted = purge_finished_telemetry(
+            conn, now,
+            _env_hours("JANITOR_TELEMETRY_RETENTION_HOURS", 1),
+            max(1, int(_env_hours("JANITOR_TELEMETRY_PAGES", 5))),
+        )
+        summary["telemetryGamesScanned"] = scanned
+        summary["telemetryGamesPurged"] = games_purged
+        summary["telemetryRowsDeleted"] = rows_deleted
+    except Exception:
+        logging.exception("Janitor: telemetry purge failed")
+    try:
+        summary["leaderboardBucketsExpired"], summary["leaderboardRowsDeleted"] = leaderboards.expire(conn, now)
+    except Exception:
+        logging.exception("Janitor: leaderboard expiry failed")
+    logging.info("Janitor run: %s", codec.dumps(summary))
@@ -5,59 +5,72 @@ POST -> join/leave/setReady/setTemplate/setDefaultCenter
 """
 
 import azure.functions as func
-from azure.data.tables import TableClient
-import json
 import os
-import math
+from shared_code import codec, compression, geo_index, geometry, lobby, members, polling, ratelimit, storage
 
+
+def _index_location(connection_string, session, center):
+    """Place the session in the SessionGeo index at center ({latitude, longitude} or {lat, lng})."""
+    try:
+        lat = float(center.get('lat', center.get('latitude')))
+        lng = float(center.get('lng', center.get('longitude')))
+    except (TypeError, ValueError):
+        return
+    users, _ = members.load(connection_string, session)
+    geo_index.place(connection_string, session, lat, lng, user_count=len(users))
+
+
+@ratelimit.shed("high")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
         "Access-Control-Allow-Headers": "*",
-        "Cache-Control": "no-store"
+        "Cache-Control": "no-store",
+        "Vary": "Accept",
+        "Access-Control-Expose-Headers": "Retry-After, X-Poll-After-Ms"
     }
 
     if req.method == "OPTIONS":
         return func.HttpResponse("", status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
 
+    # Per user when known (POST always, GET if the header is sent); anonymous lobby polls
+    # share a lobby-sized bucket per (sessionId, caller address)
+    poll_session = (req.params.get("sessionId") or (req.route_params.get("sessionId") if hasattr(req, "route_params") else None)) if req.method == "GET" else None
+    limited = ratelimit.check_poll("JoinSession", req, poll_session, cors_headers)
+    if limited:
+        return limited
+
     try:
         connection_string = os.getenv("AzureWebJobsStorage")
-        session_table = TableClient.from_connection_string(connection_string, table_name="Sessions")
+        session_table = storage.table("Sessions", connection_string)
 
         # === GET: Return session info ===
         if req.method == "GET":
             # --- PATCH: Try both params and route_params for sessionId ---
             session_id = req.params.get("sessionId") or (req.route_params.get("sessionId") if hasattr(req, "route_params") else None)
             if not session_id:
-                return func.HttpResponse(json.dumps({"error": "Missing sessionId"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"error": "Missing sessionId"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
             try:
                 session = session_table.get_entity(partition_key="session", row_key=session_id)
             except Exception as e:            
-                return func.HttpResponse(json.dumps({"error": f"Session not found: {str(e)}"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
-
-            try:
-                users = json.loads(session.get("users", "[]") or "[]")
-            except Exception as e:
-                return func.HttpResponse(json.dumps({"error": "Corrupt users field"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"error": f"Session not found: {str(e)}"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
 
-            try:
-                ready_status = json.loads(session.get("readyStatus", "{}") or "{}")
-            except Exception as e:
-                return func.HttpResponse(json.dumps({"error": "Corrupt readyStatus field"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            # Members and ready flags: one SessionMembers partition query
+            users, ready_status = members.load(connection_string, session)
 
             # Add template info if present
             template = None
             if session.get("templateId") and session.get("templateCenter") and session.get("templateRadiusMeters"):
                 try:
-                    center = json.loads(session["templateCenter"])
+                    center = codec.loads(session["templateCenter"])
                 except Exception:
                     center = session["templateCenter"]
                 vertices = None
                 if session.get("templateVertices"):
                     try:
-                        vertices = json.loads(session["templateVertices"])
+                        vertices = codec.loads(session["templateVertices"])
                     except Exception:
                         vertices = session["templateVertices"]
                 template = {
@@ -67,14 +80,15 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     "zoomLevel": session.get("templateZoom"),
                     "vertices": vertices
                 }
-                # If we can, attach multiplier from Templates table
+                # Single Templates read serves both the multiplier and the catalog definition
+                tdef = None
                 try:
-                    templates_table = TableClient.from_connection_string(connection_string, table_name="Templates")
-                    tdef2 = templates_table.get_entity(partition_key="template", row_key=template["templateId"])
-                    if tdef2.get("multiplier") is not None:
-                        template["multiplier"] = float(tdef2.get("multiplier"))
+                    templates_table = storage.table("Templates", connection_string)
+                    tdef = templates_table.get_entity(partition_key="template", row_key=template["templateId"])
+                    if tdef.get("multiplier") is not None:
+                        template["multiplier"] = float(tdef.get("multiplier"))
                 except Exception:
-                    pass
+                    tdef = None
                 # Fallback: if polygon center missing but have vertices, compute centroid
                 if template["templateId"] == 'polygon' and (not template.get("center") or 'lat' not in template['center']) and vertices:
                     try:
@@ -87,62 +101,54 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                             }
                     except Exception:
                         pass
-                # Attach catalog definition (baseVertices) for non-polygon shapes so clients need not refetch or hardcode
-                if template["templateId"] != 'polygon':
+                # Attach catalog definition (baseVertices) for non-polygon shapes so clients need not refetch or hardcode.
+                # Served from the precompiled geometry at the LOD suited to the session's radius/zoom.
+                if template["templateId"] != 'polygon' and tdef is not None:
                     try:
-                        templates_table = TableClient.from_connection_string(connection_string, table_name="Templates")
-                        tdef = templates_table.get_entity(partition_key="template", row_key=template["templateId"])
-                        base_vertices_raw = tdef.get("baseVertices")
                         base_vertices = None
-                        if base_vertices_raw:
-                            try:
-                                if isinstance(base_vertices_raw, str):
-                                    base_vertices = json.loads(base_vertices_raw)
-                                else:
-                                    base_vertices = base_vertices_raw
-                            except Exception:
-                                base_vertices = None
+                        geo = geometry.geometry_from_entity(tdef, codec.loads)
+                        if geo:
+                            center_lat = center.get('lat', center.get('latitude')) if isinstance(center, dict) else None
+                            lod_index, lod = geometry.select_lod(geo, template["radiusMeters"], template.get("zoomLevel"), center_lat)
+                            if lod:
+                                base_vertices = lod["vertices"]
+                                template["lod"] = lod_index
+                        if not base_vertices:
+                            base_vertices = codec.loads_or(tdef.get("baseVertices"), None)
                         if base_vertices:
                             template["catalogDefinition"] = { "baseVertices": base_vertices }
-                        # Also include difficulty multiplier if present
-                        try:
-                            if tdef.get("multiplier") is not None:
-                                template["multiplier"] = float(tdef.get("multiplier"))
-                        except Exception:
-                            pass
                     except Exception:
                         pass
             # Include defaultCenter for non-admin initial map centering
             default_center = None
             if session.get("defaultCenter"):
                 try:
-                    default_center = json.loads(session["defaultCenter"])
+                    default_center = codec.loads(session["defaultCenter"])
                 except Exception:
                     default_center = session["defaultCenter"]
-            return func.HttpResponse(
-                json.dumps({
-                    "users": users,
-                    "readyStatus": ready_status,
-                    "creator": session.get("creator", ""),
-                    "isStarted": session.get("isStarted", False),
-                    "isTemplateSet": session.get("isTemplateSet", False),
-                    "currentGameId": session.get("currentGameId"),
-                    "roles": json.loads(session.get("roles", "{}")) if session.get("roles") else {},
-                    "painter": session.get("painter", ""),
-                    "template": template,
-                    "defaultCenter": default_center
-                }),
-                status_code=200,
-                headers={**cors_headers, "Content-Type": "application/json"}
-            )
+            body, mimetype = codec.encode({
+                "users": users,
+                "readyStatus": ready_status,
+                "creator": session.get("creator", ""),
+                "isStarted": session.get("isStarted", False),
+                "isTemplateSet": session.get("isTemplateSet", False),
+                "currentGameId": session.get("currentGameId"),
+                "roles": codec.loads(session.get("roles", "{}")) if session.get("roles") else {},
+                "painter": session.get("painter", ""),
+                "template": template,
+                "defaultCenter": default_center
+            }, req)
+            # Waiting room backs off while nothing changes; a started game is picked up at once
+            out_headers, _ = polling.hint("JoinSession", session_id, polling.fingerprint(body), cors_headers, urgent=bool(session.get("isStarted", False)))
+            return compression.http_response(body, req, {**out_headers, "Content-Type": mimetype}, status_code=200)
 
         # === POST: Join / Ready / Leave ===
         elif req.method == "POST":
             username = req.headers.get("x-username")
             if not username:
-                return func.HttpResponse(json.dumps({"error": "Missing x-username header"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"error": "Missing x-username header"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
-            data = req.get_json()
+            data = codec.read_body(req)
             session_id = data.get("sessionId")
             creator_username = data.get("creator")
             set_ready = data.get("setReady", False)
@@ -158,50 +164,49 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 try:
                     session = session_table.get_entity(partition_key="session", row_key=session_id)
                 except:
-                    return func.HttpResponse(json.dumps({"error": "Session not found"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "Session not found"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
             elif creator_username:
                 sessions = list(session_table.query_entities(
                     f"PartitionKey eq 'session' and creator eq '{creator_username}'"
                 ))
                 if not sessions:
-                    return func.HttpResponse(json.dumps({"error": "No session found for that creator"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "No session found for that creator"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
                 session = sessions[0]
                 session_id = session["RowKey"]
             else:
-                return func.HttpResponse(json.dumps({"error": "Missing sessionId or creator"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"error": "Missing sessionId or creator"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
             if session.get("isStarted", False):
-                return func.HttpResponse(json.dumps({"error": "Session already started"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
-
-            users = json.loads(session.get("users", "[]"))
-            ready_status = json.loads(session.get("readyStatus", "{}"))
+                return func.HttpResponse(codec.dumps({"error": "Session already started"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
 
             # === Handle setDefaultCenter (admin only) ===
             if set_default_center:
                 if username != session.get("creator"):
-                    return func.HttpResponse(json.dumps({"error": "Only admin can set default center"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "Only admin can set default center"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
                 center = data.get("center")
                 if not center or not isinstance(center, dict) or "latitude" not in center or "longitude" not in center:
-                    return func.HttpResponse(json.dumps({"error": "Missing or invalid center {latitude, longitude}"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
-                session["defaultCenter"] = json.dumps(center)
+                    return func.HttpResponse(codec.dumps({"error": "Missing or invalid center {latitude, longitude}"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                session["defaultCenter"] = codec.dumps(center)
+                if not session.get("templateCenter"):
+                    _index_location(connection_string, session, center)
                 session_table.update_entity(session, mode="merge")
-                return func.HttpResponse(json.dumps({"message": "Default center set"}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"message": "Default center set"}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
 
             # === Handle setTemplate (admin only) ===
             if set_template:
                 # Only admin can set template
                 if username != session.get("creator"):
-                    return func.HttpResponse(json.dumps({"error": "Only admin can set template"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "Only admin can set template"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
                 template_id = data.get("templateId")
                 center = data.get("center")
                 radius = data.get("radiusMeters")
                 zoom = data.get("zoomLevel")
                 incoming_vertices = data.get("vertices")  # only for polygon from client
                 if not (template_id and center and radius):
-                    return func.HttpResponse(json.dumps({"error": "Missing templateId, center, or radiusMeters"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "Missing templateId, center, or radiusMeters"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
                 # Persist basics
                 session["templateId"] = template_id
-                session["templateCenter"] = json.dumps(center) if isinstance(center, dict) else center
+                session["templateCenter"] = codec.dumps(center) if isinstance(center, dict) else center
                 session["templateRadiusMeters"] = radius
                 if zoom is not None:
                     session["templateZoom"] = zoom
@@ -214,38 +219,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                         if incoming_vertices and isinstance(incoming_vertices, list) and len(incoming_vertices) >= 3:
                             computed_vertices = incoming_vertices
                     else:
-                        # Lookup template definition for baseVertices
-                        templates_table = TableClient.from_connection_string(connection_string, table_name="Templates")
+                        # Lookup template definition; scale its full-resolution LOD 0 for this radius.
+                        # templateVertices is what games are scored against, so display LODs never apply here.
+                        templates_table = storage.table("Templates", connection_string)
                         try:
                             tdef = templates_table.get_entity(partition_key="template", row_key=template_id)
-                            base_raw = tdef.get("baseVertices")
                             base_vertices = None
-                            if base_raw:
-                                if isinstance(base_raw, str):
-                                    try:
-                                        base_vertices = json.loads(base_raw)
-                                    except Exception:
-                                        base_vertices = None
-                                elif isinstance(base_raw, list):
-                                    base_vertices = base_raw
+                            geo = geometry.geometry_from_entity(tdef, codec.loads)
+                            if geo and geo.get("lods"):
+                                base_vertices = geo["lods"][0]["vertices"]
+                            if not base_vertices:
+                                base_vertices = codec.loads_or(tdef.get("baseVertices"), None)
                             if base_vertices:
                                 # Scale normalized base (x,y) by lat/lng deltas derived from radius
                                 lat = center.get('lat') or center.get('latitude')
                                 lng = center.get('lng') or center.get('longitude')
                                 if lat is not None and lng is not None:
-                                    d_lat = radius / 111320.0
-                                    try:
-                                        d_lng = radius / (111320.0 * math.cos(math.radians(lat)))
-                                    except Exception:
-                                        d_lng = radius / 111320.0
-                                    scaled = []
-                                    for p in base_vertices:
-                                        x = p.get('x', 0)
-                                        y = p.get('y', 0)
-                                        scaled.append({
-                                            'lat': lat + y * d_lat,
-                                            'lng': lng + x * d_lng
-                                        })
+                                    scaled = geometry.scale_to_latlng(base_vertices, lat, lng, radius)
                                     if len(scaled) >= 3:
                                         computed_vertices = scaled
                         except Exception:
@@ -254,77 +244,85 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     computed_vertices = None
 
                 if computed_vertices:
-                    session["templateVertices"] = json.dumps(computed_vertices)
+                    session["templateVertices"] = codec.dumps(computed_vertices)
                 else:
                     session["templateVertices"] = None
 
                 # Mark template as set (locked for polling)
                 session["isTemplateSet"] = True
+                if isinstance(center, dict):
+                    _index_location(connection_string, session, center)
                 session_table.update_entity(session, mode="merge")
-                return func.HttpResponse(json.dumps({"message": "Template set", "isTemplateSet": True}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"message": "Template set", "isTemplateSet": True}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
 
             # === Handle explicit templateSet toggle (admin only) ===
             if template_set_flag is not None:
                 if username != session.get("creator"):
-                    return func.HttpResponse(json.dumps({"error": "Only admin can toggle template set"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "Only admin can toggle template set"}), status_code=403, headers={**cors_headers, "Content-Type": "application/json"})
                 session["isTemplateSet"] = bool(template_set_flag)
                 session_table.update_entity(session, mode="merge")
-                return func.HttpResponse(json.dumps({"message": "Template set flag updated", "isTemplateSet": bool(template_set_flag)}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
+                return func.HttpResponse(codec.dumps({"message": "Template set flag updated", "isTemplateSet": bool(template_set_flag)}), status_code=200, headers={**cors_headers, "Content-Type": "application/json"})
+
+            # Membership changes only touch the caller's own SessionMembers row
+            members.migrate(connection_string, session)
 
             # === Handle leave request ===
             if leave:
+                users, _ = members.load(connection_string, session)
                 if username not in users:
-                    return func.HttpResponse(json.dumps({"error": "User not in session"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+                    return func.HttpResponse(codec.dumps({"error": "User not in session"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
+                members.leave(connection_string, session_id, username)
                 users.remove(username)
-                ready_status.pop(username, None)
 
                 # If the user leaving is the creator/admin, delete the session for everyone
                 if username == session.get("creator"):
                     session_table.delete_entity(partition_key="session", row_key=session_id)
+                    members.remove_all(connection_string, session_id)
+                    lobby.close_lobby(connection_string, session)
+                    geo_index.remove(connection_string, session)
                     return func.HttpResponse(
-                        json.dumps({ "message": "Session deleted by admin" }),
+                        codec.dumps({ "message": "Session deleted by admin" }),
                         status_code=200,
                         headers={**cors_headers, "Content-Type": "application/json" }
                     )
                 elif len(users) == 0:
                     session_table.delete_entity(partition_key="session", row_key=session_id)
+                    members.remove_all(connection_string, session_id)
+                    lobby.close_lobby(connection_string, session)
+                    geo_index.remove(connection_string, session)
                     return func.HttpResponse(
-                        json.dumps({ "message": "Session deleted" }),
+                        codec.dumps({ "message": "Session deleted" }),
                         status_code=200,
                         headers={**cors_headers, "Content-Type": "application/json" }
                     )
                 else:
-                    session["users"] = json.dumps(users)
-                    session["readyStatus"] = json.dumps(ready_status)
-                    session_table.update_entity(session, mode="merge")
+                    lobby.update_count(connection_string, session, len(users))
                     return func.HttpResponse(
-                        json.dumps({ "message": "Left session", "sessionId": session_id }),
+                        codec.dumps({ "message": "Left session", "sessionId": session_id }),
                         status_code=200,
                         headers={**cors_headers, "Content-Type": "application/json" }
                     )
 
             # === Handle join ===
-            if username not in users:
-                users.append(username)
-                ready_status[username] = False
+            joined = members.join(connection_string, session_id, username, ready=bool(data.get("setReady", False)))
 
             # === Handle ready ===
-            if "setReady" in data:
-                ready_status[username] = bool(data["setReady"])
+            if "setReady" in data and not joined:
+                members.set_ready(connection_string, session_id, username, data["setReady"])
 
-            session["users"] = json.dumps(users)
-            session["readyStatus"] = json.dumps(ready_status)
-            session_table.update_entity(session, mode="merge")
+            if joined:
+                users, _ = members.load(connection_string, session)
+                lobby.update_count(connection_string, session, len(users))
 
             return func.HttpResponse(
-                json.dumps({ "message": "Success", "sessionId": session_id }),
+                codec.dumps({ "message": "Success", "sessionId": session_id }),
                 status_code=200,
                 headers={**cors_headers, "Content-Type": "application/json" }
             )
 
         else:
-            return func.HttpResponse(json.dumps({"error": "Method not allowed"}), status_code=405, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": "Method not allowed"}), status_code=405, headers={**cors_headers, "Content-Type": "application/json"})
 
     except Exception as e:
         return func.HttpResponse(f"Error: {str(e)}", status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
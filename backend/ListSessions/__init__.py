@@ -0,0 +1,61 @@
+"""List open, not-started lobbies (newest first) from the OpenSessions index.
+
+GET ?pageSize=<1..50, default 20>&continuationToken=<token>
+Returns { sessions: [{ sessionId, creator, userCount, createdAt }], continuationToken }.
+Reads exactly one index page, so cost is proportional to pageSize rather than to the
+number of sessions ever created.
+"""
+
+import azure.functions as func
+import os
+from shared_code import codec, lobby, paging, storage
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-store",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    try:
+        page_size = int(req.params.get('pageSize', '20') or '20')
+    except ValueError:
+        page_size = 20
+    if page_size < 1 or page_size > 50:
+        page_size = 20
+    try:
+        token = paging.decode_token(req.params.get('continuationToken'))
+    except ValueError as e:
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=400, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        table = storage.table(lobby.TABLE, connection_string)
+        rows, next_token = paging.first_page(
+            table.query_entities(
+                "PartitionKey eq @pk",
+                parameters={"pk": lobby.PARTITION},
+                select=["sessionId", "creator", "userCount", "createdAt"],
+                results_per_page=page_size,
+            ),
+            token,
+        )
+    except Exception:
+        # Index not created yet (no sessions) or transient failure: empty lobby list
+        rows, next_token = [], None
+
+    sessions = [{
+        "sessionId": r.get("sessionId"),
+        "creator": r.get("creator"),
+        "userCount": r.get("userCount", 0),
+        "createdAt": r.get("createdAt"),
+    } for r in rows]
+    return func.HttpResponse(codec.dumps({"sessions": sessions, "continuationToken": next_token}), status_code=200, headers=headers)
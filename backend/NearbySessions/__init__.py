@@ -0,0 +1,48 @@
+"""Open, not-started lobbies near a location, nearest first (SessionGeo index).
+
+GET ?lat=<deg>&lng=<deg>[&radiusMeters=<m, default 2000, max 50000>][&limit=<1..50, default 20>]
+Returns { sessions: [{ sessionId, creator, createdAt, templateId, userCount, latitude,
+longitude, distanceMeters }], precision, cells }. Only the geohash cells covering the
+search circle are queried (at most a dozen partitions), then refined with haversine.
+Sessions appear once their default center or template center has been set.
+"""
+
+import azure.functions as func
+import os
+from shared_code import codec, geo_index
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-store",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+
+    try:
+        lat = float(req.params.get('lat'))
+        lng = float(req.params.get('lng'))
+        radius = float(req.params.get('radiusMeters') or 2000)
+        limit = int(req.params.get('limit') or 20)
+    except (TypeError, ValueError):
+        return func.HttpResponse(codec.dumps({"error": "lat and lng are required; radiusMeters and limit must be numbers"}), status_code=400, headers=headers)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+        return func.HttpResponse(codec.dumps({"error": "lat/lng out of range or radiusMeters <= 0"}), status_code=400, headers=headers)
+    if limit < 1 or limit > 50:
+        limit = 20
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        sessions, info = geo_index.nearby(connection_string, lat, lng, radius, limit=limit)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": f"Nearby query failed: {str(e)}"}), status_code=500, headers=headers)
+    for s in sessions:
+        s.pop("open", None)
+    return func.HttpResponse(codec.dumps({"sessions": sessions, **info}), status_code=200, headers=headers)
@@ -0,0 +1,61 @@
+"""Admin: re-score a template's stored games after its multiplier changed.
+
+POST (header x-admin-key) body:
+  { templateId, multiplier?: float (default Templates.multiplier), full?: bool,
+    reset?: bool, maxRows?: int (default 2000), timeBudgetSec?: float (default 60) }
+Runs one bounded slice of shared_code.rescore in-process and returns its summary
+({ scanned, updated, lastRowKey, rowsPerSec, done, ... }). Call again until done=true;
+each call resumes from the RescoreJobs checkpoint. Use tools/rescore.py for large
+back-catalogues (process pool, no time limit).
+"""
+
+import azure.functions as func
+import os
+from shared_code import admin, codec, rescore
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "POST, OPTIONS",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "no-store",
+        "Content-Type": "application/json"
+    }
+    if req.method == 'OPTIONS':
+        return func.HttpResponse("", status_code=200, headers=headers)
+    if not admin.is_admin(req):
+        return func.HttpResponse(codec.dumps({"error": "Forbidden"}), status_code=403, headers=headers)
+
+    try:
+        data = codec.read_body(req) or {}
+    except Exception:
+        return func.HttpResponse(codec.dumps({"error": "Invalid JSON"}), status_code=400, headers=headers)
+    template_id = str(data.get('templateId') or '').strip()
+    if not template_id:
+        return func.HttpResponse(codec.dumps({"error": "Missing templateId"}), status_code=400, headers=headers)
+    try:
+        multiplier = data.get('multiplier')
+        multiplier = float(multiplier) if multiplier is not None else None
+        if multiplier is not None and multiplier <= 0:
+            raise ValueError
+        max_rows = int(data.get('maxRows') or 2000)
+        time_budget = float(data.get('timeBudgetSec') or 60)
+    except (TypeError, ValueError):
+        return func.HttpResponse(codec.dumps({"error": "Invalid multiplier, maxRows or timeBudgetSec"}), status_code=400, headers=headers)
+
+    connection_string = os.getenv("AzureWebJobsStorage")
+    if not connection_string:
+        return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers=headers)
+
+    try:
+        if data.get('reset'):
+            rescore.reset_checkpoint(connection_string, template_id)
+        summary = rescore.run(
+            connection_string, template_id,
+            multiplier=multiplier, full=bool(data.get('full')),
+            resume=not data.get('reset'), max_rows=max_rows, time_budget_sec=time_budget,
+        )
+        return func.HttpResponse(codec.dumps(summary), status_code=200, headers=headers)
+    except Exception as e:
+        return func.HttpResponse(codec.dumps({"error": str(e)}), status_code=500, headers=headers)
@@ -8,10 +8,10 @@ Creates/updates Game and Session table entities, and persists a Scores row on en
 """
 
 import azure.functions as func
-from azure.data.tables import TableClient
-import json
+from shared_code import active_games, archive, codec, leaderboards, lobby, members, player_stats, response_cache, storage
 import uuid
 import os
+import logging
 from datetime import datetime
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
@@ -29,22 +29,22 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         session_id = data.get("sessionId")
         end_game = data.get("endGame", False)
         if not session_id:
-            return func.HttpResponse(json.dumps({"error": "Missing sessionId"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": "Missing sessionId"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
         connection_string = os.getenv("AzureWebJobsStorage")
         if not connection_string:
-            return func.HttpResponse(json.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": "Missing AzureWebJobsStorage"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
 
         try:
-            session_table = TableClient.from_connection_string(connection_string, table_name="Sessions")
-            games_table = TableClient.from_connection_string(connection_string, table_name="Games")
+            session_table = storage.table("Sessions", connection_string)
+            games_table = storage.table("Games", connection_string)
         except Exception as e:
-            return func.HttpResponse(json.dumps({"error": f"Table connection failed: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": f"Table connection failed: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
 
         try:
             session = session_table.get_entity(partition_key="session", row_key=session_id)
         except Exception as e:
-            return func.HttpResponse(json.dumps({"error": f"Session not found: {str(e)}"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": f"Session not found: {str(e)}"}), status_code=404, headers={**cors_headers, "Content-Type": "application/json"})
 
         if end_game:
             # Allow client to provide gameId explicitly (painter upload after admin ends)
@@ -59,7 +59,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                         results = None
                     if results is not None:
                         try:
-                            game["results"] = json.dumps(results)
+                            game["results"] = codec.dumps(results)
                             team = results.get("team") if isinstance(results, dict) else None
                             if team and isinstance(team, dict):
                                 if "adjustedPct" in team: game["teamAccuracy"] = float(team.get("adjustedPct"))
@@ -72,14 +72,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     game["status"] = "completed"
                     game["timeCompleted"] = end_iso
                     games_table.update_entity(game, mode="merge")
+                    active_games.unregister(connection_string, game_id)
 
                     # Persist a Scores row for hi-scores/personal history
+                    score_entity = None
                     try:
-                        scores_table = TableClient.from_connection_string(connection_string, table_name="Scores")
-                        try:
-                            scores_table.create_table()
-                        except Exception:
-                            pass
+                        scores_table = storage.table("Scores", connection_string, create=True)
 
                         # Compute duration
                         duration_sec = None
@@ -133,7 +131,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                         try:
                             roles_map = {}
                             try:
-                                roles_map = json.loads(game.get("roles", "{}") or "{}")
+                                roles_map = codec.loads(game.get("roles", "{}") or "{}")
                             except Exception:
                                 roles_map = {}
                             per_user = (results or {}).get("perUser") if isinstance(results, dict) else None
@@ -153,7 +151,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                                     "role": role,
                                     **({"accuracy": brush_acc.get(uname)} if role == "Brush" else {"accuracy": None})
                                 })
-                            score_entity["players"] = json.dumps(players_list)
+                            score_entity["players"] = codec.dumps(players_list)
                         except Exception as e:
                             pass
 
@@ -199,32 +197,73 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                                     if total_pts > 4000:
                                         break
                                 if compact:
-                                    score_entity["drawing"] = json.dumps({"trails": compact})
+                                    score_entity["drawing"] = codec.dumps({"trails": compact})
                                     score_entity["hasDrawing"] = True
                         except Exception as e:
                             pass
 
                         # Optional: attach friendly template name
+                        base_vertices = None
                         try:
                             tpl_id = session.get("templateId")
                             if tpl_id:
-                                templates_table = TableClient.from_connection_string(connection_string, table_name="Templates")
+                                templates_table = storage.table("Templates", connection_string)
                                 try:
                                     tdef = templates_table.get_entity(partition_key="template", row_key=tpl_id)
                                     if tdef.get("displayName"):
                                         score_entity["templateName"] = tdef.get("displayName")
+                                    base_vertices = codec.loads_or(tdef.get("baseVertices"), None)
                                 except Exception:
                                     # If polygon isn't stored in Templates table, ignore
                                     pass
                         except Exception:
                             pass
 
+                        # Shape-similarity metrics of the stored drawing vs the template boundary
+                        try:
+                            if score_entity.get("drawing"):
+                                from shared_code import scoring, shape_metrics  # numpy: only paid when a game ends
+                                center = codec.loads_or(session.get("templateCenter"), None)
+                                boundary = scoring.template_boundary(
+                                    session.get("templateId"), center, session.get("templateRadiusMeters"),
+                                    base_vertices=base_vertices,
+                                    vertices=codec.loads_or(session.get("templateVertices"), None),
+                                )
+                                metrics = shape_metrics.compute(
+                                    codec.loads(score_entity["drawing"]).get("trails"), boundary, center, session.get("templateId")
+                                )
+                                if metrics:
+                                    score_entity.update(metrics)
+                        except Exception:
+                            logging.exception("Shape metrics failed for game %s", game_id)
+
                         try:
                             scores_table.upsert_entity(score_entity)
+                            # Day/week/month top-K buckets for windowed high scores (before the cache bump)
+                            try:
+                                leaderboards.record(connection_string, score_entity)
+                            except Exception:
+                                logging.exception("Failed to update leaderboards for game %s", game_id)
+                            response_cache.bump("scores", connection_string)
                         except Exception as e:
                             pass
                     except Exception as e:
                         pass
+
+                    # Move live telemetry (Distances + Fixes) into one compact GameArchives row
+                    try:
+                        summary = archive.archive_game(connection_string, game_id, game)
+                        if summary:
+                            logging.info("Archived game telemetry: %s", codec.dumps(summary))
+                    except Exception:
+                        logging.exception("Failed to archive game %s", game_id)
+
+                    # Career totals (PlayerStats) once the game has a score and its distances are archived
+                    try:
+                        if score_entity and score_entity.get("finalScore") is not None:
+                            player_stats.record_game(connection_string, score_entity)
+                    except Exception:
+                        logging.exception("Failed to update player stats for game %s", game_id)
                 except Exception as e:
                     # If updating the game fails, still reset the session state below
                     pass
@@ -235,19 +274,23 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             session["roles"] = None
             session["painter"] = None
             session_table.update_entity(session, mode="merge")
+            # Back in the waiting room: joinable again
+            lobby.open_lobby(connection_string, session, len(members.load(connection_string, session)[0]))
             return func.HttpResponse(
-                json.dumps({"message": "Game ended", "gameId": game_id}),
+                codec.dumps({"message": "Game ended", "gameId": game_id}),
                 status_code=200,
                 headers={**cors_headers, "Content-Type": "application/json"}
             )
 
         if session.get("isStarted", False):
-            return func.HttpResponse(json.dumps({"error": "Session already started"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": "Session already started"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
         try:
-            users = json.loads(session.get("users", "[]"))
+            users, _ = members.load(connection_string, session)
         except Exception as e:
-            return func.HttpResponse(json.dumps({"error": f"Corrupt users field: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": f"Failed to load session members: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+        if not users:
+            return func.HttpResponse(codec.dumps({"error": "No users in session"}), status_code=400, headers={**cors_headers, "Content-Type": "application/json"})
 
         import random
         # Optional explicit painter selection
@@ -264,8 +307,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             "PartitionKey": "game",
             "RowKey": game_id,
             "sessionId": session_id,
-            "players": json.dumps(users),
-            "roles": json.dumps(roles),
+            "players": codec.dumps(users),
+            "roles": codec.dumps(roles),
             "timeStarted": datetime.utcnow().isoformat() + "Z",
             "shape": "N/A",
             "status": "in progress"
@@ -273,19 +316,21 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         try:
             games_table.create_entity(game_entity)
         except Exception as e:
-            return func.HttpResponse(json.dumps({"error": f"Failed to create game entity: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": f"Failed to create game entity: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
 
         try:
             session["isStarted"] = True
             session["currentGameId"] = game_id
-            session["roles"] = json.dumps(roles)
+            session["roles"] = codec.dumps(roles)
             session["painter"] = painter
             session_table.update_entity(session, mode="merge")
+            lobby.close_lobby(connection_string, session)
         except Exception as e:
-            return func.HttpResponse(json.dumps({"error": f"Failed to update session entity: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+            return func.HttpResponse(codec.dumps({"error": f"Failed to update session entity: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+        active_games.register(connection_string, game_id, session_id, len(users), game_entity["timeStarted"])
 
         return func.HttpResponse(
-            json.dumps({
+            codec.dumps({
                 "message": "Game started",
                 "gameId": game_id,
                 "users": users,
@@ -297,5 +342,5 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     except Exception as e:
-        return func.HttpResponse(json.dumps({"error": f"Unhandled error: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
+        return func.HttpResponse(codec.dumps({"error": f"Unhandled error: {str(e)}"}), status_code=500, headers={**cors_headers, "Content-Type": "application/json"})
     return func.HttpResponse("StartGame function is running", status_code=200)
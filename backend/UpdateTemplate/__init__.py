@@ -1,8 +1,11 @@
 import azure.functions as func
-from azure.data.tables import TableClient
 import os, json
+from shared_code import codec, geometry, storage
 
-"""Update editable properties for a template: multiplier and displayName."""
+"""Update editable properties for a template: multiplier and displayName.
+
+Rows written before geometry precompilation get their `geometry` backfilled here.
+"""
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors = {
@@ -39,7 +42,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     conn = os.getenv('AzureWebJobsStorage')
     if not conn:
         return func.HttpResponse(json.dumps({"error":"Missing AzureWebJobsStorage"}), status_code=500, headers={**cors, "Content-Type":"application/json"})
-    table = TableClient.from_connection_string(conn, table_name="Templates")
+    table = storage.table("Templates", conn)
     try:
         ent = table.get_entity(partition_key='template', row_key=template_id)
     except Exception:
@@ -52,6 +55,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     if display_name is not None:
         ent['displayName'] = display_name
         changed = True
+    if changed and geometry.geometry_from_entity({'geometry': ent.get('geometry')}, codec.loads) is None:
+        compiled = geometry.compile_template(codec.loads_or(ent.get('baseVertices'), None))
+        geometry_json = geometry.serialize(compiled, codec.dumps) if compiled else None
+        if geometry_json:
+            ent['geometry'] = geometry_json
     if not changed:
         return func.HttpResponse(json.dumps({"message":"No changes"}), status_code=200, headers={**cors, "Content-Type":"application/json"})
     try:
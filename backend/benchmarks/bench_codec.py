@@ -0,0 +1,94 @@
+"""Micro-benchmark for shared_code.codec: encode/decode time and payload size.
+
+Run from backend/:  python -m benchmarks.bench_codec [--repeat N]
+
+Compares stdlib json, orjson and MessagePack (whichever are installed) on payloads
+shaped like the hot endpoints: a sendLocation body, a getLocations response, a
+JoinSession snapshot and a Scores `drawing` blob.
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _fix(rng, lat=32.0853, lng=34.7818):
+    return {
+        "latitude": lat + rng.uniform(-0.001, 0.001),
+        "longitude": lng + rng.uniform(-0.001, 0.001),
+        "timestamp": 1760000000000 + rng.randint(0, 3_600_000),
+    }
+
+
+def payloads():
+    rng = random.Random(42)
+    users = [f"player{i}" for i in range(8)]
+    vertices = [{"lat": 32.08 + rng.random() / 1000, "lng": 34.78 + rng.random() / 1000} for _ in range(10)]
+    return {
+        "sendLocation body": {"username": "player1", "gameId": "4f1c2b9e-0000-4000-8000-000000000000", "location": _fix(rng)},
+        "getLocations (8 brushes)": [
+            {"username": u, **_fix(rng), "totalDistance": rng.uniform(0, 2000), "suppressedCount": rng.randint(0, 50)}
+            for u in users
+        ],
+        "JoinSession snapshot": {
+            "users": users,
+            "readyStatus": {u: bool(i % 2) for i, u in enumerate(users)},
+            "creator": users[0],
+            "isStarted": True,
+            "isTemplateSet": True,
+            "currentGameId": "4f1c2b9e-0000-4000-8000-000000000000",
+            "roles": {u: ("Painter" if i == 0 else "Brush") for i, u in enumerate(users)},
+            "painter": users[0],
+            "template": {
+                "templateId": "star",
+                "center": {"lat": 32.0853, "lng": 34.7818},
+                "radiusMeters": 80,
+                "zoomLevel": 17,
+                "vertices": vertices,
+                "catalogDefinition": {"baseVertices": [{"x": rng.uniform(-1, 1), "y": rng.uniform(-1, 1)} for _ in range(10)]},
+                "multiplier": 1.6,
+            },
+            "defaultCenter": {"latitude": 32.0853, "longitude": 34.7818},
+        },
+        "Scores drawing (7x500 pts)": {
+            "trails": {u: [{"latitude": f["latitude"], "longitude": f["longitude"]} for f in (_fix(rng) for _ in range(500))] for u in users[1:]}
+        },
+    }
+
+
+def codecs():
+    out = [("json", lambda o: json.dumps(o).encode(), json.loads)]
+    if orjson is not None:
+        out.append(("orjson", orjson.dumps, orjson.loads))
+    if msgpack is not None:
+        out.append(("msgpack", lambda o: msgpack.packb(o, use_bin_type=True), lambda b: msgpack.unpackb(b, raw=False)))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'payload':28} {'codec':8} {'bytes':>8} {'enc us':>9} {'dec us':>9}")
+    for name, obj in payloads().items():
+        for cname, enc, dec in codecs():
+            data = enc(obj)
+            t_enc = min(timeit.repeat(lambda: enc(obj), number=args.repeat, repeat=3)) / args.repeat
+            t_dec = min(timeit.repeat(lambda: dec(data), number=args.repeat, repeat=3)) / args.repeat
+            print(f"{name:28} {cname:8} {len(data):8d} {t_enc * 1e6:9.2f} {t_dec * 1e6:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
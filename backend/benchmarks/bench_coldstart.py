@@ -0,0 +1,102 @@
+"""Cold-start and first-call latency measurements for the Function App.
+
+Run from backend/ with the deployment requirements installed.
+
+Import mode (default): each measurement runs in a fresh interpreter, like a cold worker.
+  - "per-handler": import one handler package on its own (what the first hit of each
+    script paid in the one-function-per-folder layout)
+  - "app": import function_app (v2 indexing) and then the hot handlers through it
+  python -m benchmarks.bench_coldstart --runs 5
+To compare with an older tree (e.g. the per-folder layout before function_app.py), run
+the script from that tree's backend/: python /path/to/bench_coldstart.py --runs 5
+
+HTTP mode: first vs. second call latency against a running host (func start or Azure);
+restart/scale the host before running to observe a cold start.
+  python -m benchmarks.bench_coldstart --base-url http://localhost:7071 --session <id> --game <id>
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HANDLERS = ("StartGame", "sendLocation", "getLocations", "JoinSession", "GetTemplates", "GetHighScores")
+
+_PER_HANDLER = (
+    "import time; t=time.perf_counter(); import {name}; "
+    "print((time.perf_counter()-t)*1000)"
+)
+_APP = (
+    "import time; t=time.perf_counter(); import function_app as a; t1=time.perf_counter(); "
+    "[a.handler(n) for n in {names!r}]; "
+    "print((t1-t)*1000, (time.perf_counter()-t1)*1000)"
+)
+
+
+def _run(code):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return [float(x) for x in out.stdout.split()]
+
+
+def bench_imports(runs):
+    print(f"{'target':28} {'median ms':>10} {'min ms':>8}")
+    total = []
+    for name in HANDLERS:
+        samples = [_run(_PER_HANDLER.format(name=name))[0] for _ in range(runs)]
+        total.append(statistics.median(samples))
+        print(f"{'per-handler ' + name:28} {statistics.median(samples):10.1f} {min(samples):8.1f}")
+    print(f"{'per-handler (sum)':28} {sum(total):10.1f}")
+    try:
+        app_samples = [_run(_APP.format(names=HANDLERS)) for _ in range(runs)]
+    except subprocess.CalledProcessError:
+        print(f"{'app':28} {'n/a (no function_app.py)':>10}")
+        return
+    index_ms = [s[0] for s in app_samples]
+    handlers_ms = [s[1] for s in app_samples]
+    print(f"{'app: index function_app':28} {statistics.median(index_ms):10.1f} {min(index_ms):8.1f}")
+    print(f"{'app: + all hot handlers':28} {statistics.median(handlers_ms):10.1f} {min(handlers_ms):8.1f}")
+
+
+def _timed_get(url):
+    t = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=60) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - t) * 1000
+
+
+def bench_http(base_url, session_id, game_id):
+    base = base_url.rstrip("/") + "/api/"
+    targets = [
+        ("GetTemplates", "GetTemplates"),
+        ("JoinSession", f"JoinSession?sessionId={session_id or 'none'}"),
+        ("getLocations", f"getLocations?gameId={game_id or 'none'}"),
+        ("GetHighScores", "GetHighScores?page=1&pageSize=10"),
+    ]
+    print(f"{'endpoint':16} {'status':>6} {'first ms':>9} {'second ms':>10}")
+    for name, path in targets:
+        status, first = _timed_get(base + path)
+        _, second = _timed_get(base + path)
+        print(f"{name:16} {status:6d} {first:9.1f} {second:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--base-url")
+    parser.add_argument("--session")
+    parser.add_argument("--game")
+    args = parser.parse_args()
+    if args.base_url:
+        bench_http(args.base_url, args.session, args.game)
+    else:
+        bench_imports(args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Single Function App entry point (Python v2 programming model).
+
+All HTTP and timer functions are registered here; each handler still lives in its own
+package (sendLocation/, JoinSession/, ...) as main(req). Handler modules are imported
+lazily on their first call, and all of them share one process-wide set of Table
+clients (shared_code.storage), so a warm worker reuses connections across endpoints.
+
+warm() pre-imports the gameplay handlers and opens the hot tables. It runs from the
+platform warm-up trigger (Premium plans) and from GET /api/WarmUp, which the client
+can hit while the lobby fills so StartGame/sendLocation/getLocations start hot.
+
+Every handler call goes through shared_code.profiling.run, which profiles the request
+only when an admin asks for it (x-profile header) or PROFILE_SAMPLE_RATE samples it.
+"""
+
+import functools
+import importlib
+import logging
+import sys
+import time
+
+import azure.functions as func
+
+from shared_code import profiling
+
+app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
+
+# First-call import latency per handler module (ms), exposed by WarmUp for cold-start tracking
+import_ms = {}
+
+HOT_HANDLERS = ("StartGame", "sendLocation", "getLocations", "JoinSession", "GetGameState")
+HOT_TABLES = ("Sessions", "Games", "Distances", "Fixes", "Templates")
+
+
+def handler(module_name):
+    """main() of a handler package (imported on first use), wrapped for opt-in profiling."""
+    module = sys.modules.get(module_name)
+    if module is None:
+        t0 = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_ms[module_name] = round((time.perf_counter() - t0) * 1000, 2)
+    return functools.partial(profiling.run, module_name, module.main)
+
+
+def warm():
+    from shared_code import storage
+    t0 = time.perf_counter()
+    for name in HOT_HANDLERS:
+        handler(name)
+    storage.warm(HOT_TABLES)
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
+@app.warm_up_trigger("warmup")
+def warmup(warmup) -> None:
+    logging.info("Warm-up completed in %s ms", warm())
+
+
+@app.route(route="WarmUp", methods=["GET"])
+def warm_up_http(req: func.HttpRequest) -> func.HttpResponse:
+    from shared_code import codec, response_cache
+    elapsed = warm()
+    return func.HttpResponse(
+        codec.dumps({"warmMs": elapsed, "importMs": import_ms, "responseCache": response_cache.snapshot()}),
+        status_code=200,
+        headers={"Access-Control-Allow-Origin": "*", "Cache-Control": "no-store", "Content-Type": "application/json"},
+    )
+
+
+# === Sessions and games ===
+
+@app.route(route="CreateSession", methods=["POST", "OPTIONS"])
+def create_session(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("CreateSession")(req)
+
+
+@app.route(route="JoinSession", methods=["GET", "POST", "OPTIONS"])
+def join_session(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("JoinSession")(req)
+
+
+@app.route(route="ListSessions", methods=["GET", "OPTIONS"])
+def list_sessions(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("ListSessions")(req)
+
+
+@app.route(route="NearbySessions", methods=["GET", "OPTIONS"])
+def nearby_sessions(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("NearbySessions")(req)
+
+
+@app.route(route="StartGame", methods=["POST", "OPTIONS"])
+def start_game(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("StartGame")(req)
+
+
+@app.route(route="sendLocation", methods=["POST"])
+def send_location(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("sendLocation")(req)
+
+
+@app.route(route="getLocations", methods=["GET", "POST"])
+def get_locations(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("getLocations")(req)
+
+
+@app.route(route="GetGameState", methods=["GET", "OPTIONS"])
+def get_game_state(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetGameState")(req)
+
+
+@app.route(route="GetGameReplay", methods=["GET", "OPTIONS"])
+def get_game_replay(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetGameReplay")(req)
+
+
+@app.route(route="GetActiveGames", methods=["GET", "OPTIONS"])
+def get_active_games(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetActiveGames")(req)
+
+
+# === Scores ===
+
+@app.route(route="GetHighScores", methods=["GET", "OPTIONS"])
+def get_high_scores(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetHighScores")(req)
+
+
+@app.route(route="GetPlayerGames", methods=["GET", "OPTIONS"])
+def get_player_games(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetPlayerGames")(req)
+
+
+@app.route(route="GetPlayerStats", methods=["GET", "OPTIONS"])
+def get_player_stats(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetPlayerStats")(req)
+
+
+@app.route(route="ExportScores", methods=["GET", "OPTIONS"])
+def export_scores(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("ExportScores")(req)
+
+
+# === Templates ===
+
+@app.route(route="GetTemplates", methods=["GET", "OPTIONS"])
+def get_templates(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetTemplates")(req)
+
+
+@app.route(route="GetTemplateHeatmap", methods=["GET", "OPTIONS"])
+def get_template_heatmap(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetTemplateHeatmap")(req)
+
+
+@app.route(route="GetThumbnail", methods=["GET", "OPTIONS"])
+def get_thumbnail(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetThumbnail")(req)
+
+
+@app.route(route="CreateTemplate", methods=["POST", "OPTIONS"])
+def create_template(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("CreateTemplate")(req)
+
+
+@app.route(route="UpdateTemplate", methods=["POST", "OPTIONS"])
+def update_template(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("UpdateTemplate")(req)
+
+
+@app.route(route="DeleteTemplate", methods=["DELETE", "OPTIONS"])
+def delete_template(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("DeleteTemplate")(req)
+
+
+@app.route(route="RescoreTemplate", methods=["POST", "OPTIONS"])
+def rescore_template(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("RescoreTemplate")(req)
+
+
+# === Users ===
+
+@app.route(route="login", methods=["POST"])
+def login(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("login")(req)
+
+
+@app.route(route="signUp", methods=["POST"])
+def sign_up(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("signUp")(req)
+
+
+# The v1 function.json declared a SignalR connectionInfo binding that the handler never
+# used (it always answers 404), so the v2 route registers none
+@app.route(route="negotiate", methods=["GET", "POST", "OPTIONS"])
+def negotiate(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("negotiate")(req)
+
+
+# === Maintenance ===
+
+@app.timer_trigger(schedule="0 15 * * * *", arg_name="timer", run_on_startup=False)
+def janitor(timer: func.TimerRequest) -> None:
+    handler("Janitor")(timer)
+
+
+@app.route(route="GetProfiles", methods=["GET", "OPTIONS"])
+def get_profiles(req: func.HttpRequest) -> func.HttpResponse:
+    return handler("GetProfiles")(req)
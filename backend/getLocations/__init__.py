@@ -1,11 +1,15 @@
-"""Return latest per-user game locations from Distances table for a given gameId."""
+"""Return latest per-user game locations from Distances table for a given gameId.
+
+X-Poll-After-Ms suggests the next poll delay: short while brushes move, backing off
+while every position stays the same (see shared_code.polling).
+"""
 
 import azure.functions as func
 import os
-from azure.data.tables import TableServiceClient
-import json
+from shared_code import codec, polling, ratelimit, storage
 
 
+@ratelimit.shed("high")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors_headers = {
         "Access-Control-Allow-Origin": "*",
@@ -13,6 +17,8 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         "Access-Control-Allow-Headers": "*",
         "Content-Type": "application/json",
         "Cache-Control": "no-store",
+        "Vary": "Accept",
+        "Access-Control-Expose-Headers": "Retry-After, X-Poll-After-Ms",
     }
     if req.method == 'OPTIONS':
         return func.HttpResponse("", status_code=200, headers=cors_headers)
@@ -20,27 +26,30 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     game_id = req.params.get("gameId")
     if not game_id:
         try:
-            req_body = req.get_json()
+            req_body = codec.read_body(req)
         except ValueError:
             req_body = {}
         game_id = req_body.get("gameId")
     if not game_id:
-        return func.HttpResponse(json.dumps({"error": "Missing gameId"}), status_code=400, headers=cors_headers)
+        return func.HttpResponse(codec.dumps({"error": "Missing gameId"}), status_code=400, headers=cors_headers)
+
+    # Keyed by game: all painters polling the same game share one budget
+    limited = ratelimit.check("getLocations", game_id, cors_headers)
+    if limited:
+        return limited
 
     connection_string = os.environ.get("AzureWebJobsStorage")
     if not connection_string:
-        return func.HttpResponse(json.dumps({"error": "Storage connection string not found"}), status_code=500, headers=cors_headers)
-
-    table_service = TableServiceClient.from_connection_string(conn_str=connection_string)
+        return func.HttpResponse(codec.dumps({"error": "Storage connection string not found"}), status_code=500, headers=cors_headers)
 
     # Only Distances table
     try:
-        dist_table = table_service.get_table_client("Distances")
+        dist_table = storage.table("Distances", connection_string)
         entities = dist_table.query_entities(f"PartitionKey eq '{game_id}'")
         locations = []
         for entity in entities:
             try:
-                loc = json.loads(entity.get("location", "{}"))
+                loc = codec.loads(entity.get("location", "{}"))
             except Exception:
                 loc = {}
             lat = loc.get("latitude")
@@ -59,8 +68,12 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                 "longitude": lon,
                 "timestamp": loc.get("timestamp"),
                 "totalDistance": float(entity.get("totalDistance", 0.0)),
+                "suppressedCount": int(entity.get("suppressedCount") or 0),
             })
-        return func.HttpResponse(json.dumps(locations), headers=cors_headers)
+        body, mimetype = codec.encode(locations, req)
+        out_headers, _ = polling.hint("getLocations", game_id, polling.fingerprint(body), cors_headers)
+        return func.HttpResponse(body, headers={**out_headers, "Content-Type": mimetype})
     except Exception as e:
         # Return empty list on failure to avoid breaking UI
-        return func.HttpResponse(json.dumps([]), headers=cors_headers)
+        body, mimetype = codec.encode([], req)
+        return func.HttpResponse(body, headers={**cors_headers, "Content-Type": mimetype})
@@ -5,7 +5,7 @@ Returns 200 on success, 401 on wrong password, 404 if user not found.
 """
 
 import azure.functions as func
-from azure.data.tables import TableClient
+from shared_code import storage
 import json
 import hashlib
 import os
@@ -28,16 +28,16 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         if not username or not password:
             return func.HttpResponse("Missing username or password", status_code=400, headers=cors_headers)
         connection_string = os.getenv('AzureWebJobsStorage')
-        with TableClient.from_connection_string(connection_string, table_name="Users") as table:
-            try:
-                entity = table.get_entity(partition_key="user", row_key=username)
-                hashed_input = hashlib.sha256(password.encode()).hexdigest()
-                if entity["Password"] == hashed_input:
-                    return func.HttpResponse("Login successful", status_code=200, headers=cors_headers)
-                else:
-                    return func.HttpResponse("Incorrect password", status_code=401, headers=cors_headers)
-            except:
-                return func.HttpResponse("User not found", status_code=404, headers=cors_headers)
+        table = storage.table("Users", connection_string)
+        try:
+            entity = table.get_entity(partition_key="user", row_key=username)
+            hashed_input = hashlib.sha256(password.encode()).hexdigest()
+            if entity["Password"] == hashed_input:
+                return func.HttpResponse("Login successful", status_code=200, headers=cors_headers)
+            else:
+                return func.HttpResponse("Incorrect password", status_code=401, headers=cors_headers)
+        except:
+            return func.HttpResponse("User not found", status_code=404, headers=cors_headers)
     except Exception as e:
         # Unexpected failure path
         logging.exception("login failed")
@@ -1,17 +1,63 @@
 """Upsert a player's latest location for a game and accumulate total distance.
 
 POST body: { username, gameId, location: { latitude, longitude, timestamp } }
-Stores entity in Distances table partitioned by gameId.
+Stores entity in Distances table partitioned by gameId, and appends every stored
+fix to the Fixes table (PartitionKey=gameId, RowKey=<ts>-<username>-<seq>) so
+games can be replayed in order.
+
+Jitter suppression: a fix that lies within LOCATION_COALESCE_METERS of the last
+stored fix and arrives within LOCATION_COALESCE_WINDOW_MS of it is not persisted.
+The request is answered with a lightweight "Coalesced" response and counted; the
+pending count is folded into the row's suppressedCount on the next real write.
 """
 
 import azure.functions as func
 import logging
 import os
-from azure.data.tables import TableServiceClient
-import json
 import math
+from shared_code import active_games, codec, ratelimit, storage
 from datetime import datetime
 
+# Coalescing thresholds (overridable via app settings)
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+COALESCE_METERS = _env_float("LOCATION_COALESCE_METERS", 1.0)
+COALESCE_WINDOW_MS = _env_float("LOCATION_COALESCE_WINDOW_MS", 5000)
+_LAST_STORED_MAX = 5000
+
+# Per-worker memory of the last persisted fix per (gameId, username) so jitter can be
+# rejected without a storage read. Values: { latitude, longitude, timestamp, suppressed }
+_last_stored = {}
+
+def _remember(key, lat, lon, ts, suppressed=0):
+    if key not in _last_stored and len(_last_stored) >= _LAST_STORED_MAX:
+        # Drop the oldest inserted entry (dicts preserve insertion order)
+        try:
+            _last_stored.pop(next(iter(_last_stored)))
+        except Exception:
+            _last_stored.clear()
+    _last_stored[key] = {"latitude": lat, "longitude": lon, "timestamp": ts, "suppressed": suppressed}
+
+def _should_coalesce(last, lat, lon, ts):
+    """True if (lat, lon, ts) is within the distance and time window of the last stored fix."""
+    if COALESCE_METERS <= 0 or not last:
+        return False
+    try:
+        age = float(ts) - float(last["timestamp"])
+    except Exception:
+        return False
+    if age < 0 or age >= COALESCE_WINDOW_MS:
+        return False
+    return haversine(float(last["latitude"]), float(last["longitude"]), lat, lon) < COALESCE_METERS
+
+def fix_row_key(ts_ms, username, seq):
+    """Zero-padded so lexical RowKey order equals time order within a game partition."""
+    return f"{int(ts_ms):013d}-{username}-{int(seq):08d}"
+
 def haversine(lat1, lon1, lat2, lon2):
     R = 6371000.0
     phi1 = math.radians(lat1)
@@ -22,18 +68,20 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
     return R * c
 
+@ratelimit.shed("high")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     cors = {
         "Access-Control-Allow-Origin": "*",
         "Access-Control-Allow-Methods": "POST, OPTIONS",
         "Access-Control-Allow-Headers": "*",
+        "Access-Control-Expose-Headers": "X-Coalesced, X-Suppressed-Count, Retry-After",
         "Cache-Control": "no-store"
     }
     if req.method == 'OPTIONS':
         return func.HttpResponse("", status_code=200, headers=cors)
     try:
         try:
-            data = req.get_json()
+            data = codec.read_body(req)
         except ValueError:
             return func.HttpResponse("Invalid JSON", status_code=400, headers=cors)
         username = data.get("username")
@@ -41,6 +89,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         location = data.get("location") or {}
         if not (username and game_id and isinstance(location, dict)):
             return func.HttpResponse("Missing required fields", status_code=400, headers=cors)
+        limited = ratelimit.check("sendLocation", f"{game_id}:{username}", cors)
+        if limited:
+            return limited
 
         lat = location.get("latitude")
         lon = location.get("longitude")
@@ -56,16 +107,22 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         location["latitude"] = lat
         location["longitude"] = lon
 
+        # Fast path: reject jitter against this worker's memory of the last stored fix
+        key = (game_id, username)
+        last = _last_stored.get(key)
+        if _should_coalesce(last, lat, lon, location["timestamp"]):
+            last["suppressed"] += 1
+            return func.HttpResponse(
+                "Coalesced",
+                status_code=200,
+                headers={**cors, "X-Coalesced": "1", "X-Suppressed-Count": str(last["suppressed"])},
+            )
+        pending_suppressed = last["suppressed"] if last else 0
+
         connection_string = os.environ.get("AzureWebJobsStorage")
         if not connection_string:
             return func.HttpResponse("Storage connection string not found", status_code=500, headers=cors)
-        table_service = TableServiceClient.from_connection_string(conn_str=connection_string)
-
-        try:
-            table_service.create_table("Distances")
-        except Exception:
-            pass
-        dist_table = table_service.get_table_client("Distances")
+        dist_table = storage.table("Distances", connection_string, create=True)
 
         prev = None
         try:
@@ -73,10 +130,24 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         except Exception:
             prev = None
 
+        # Slow path (cold worker / other instance handled the last write): check stored fix
+        if prev is not None and last is None:
+            try:
+                stored_loc = codec.loads(prev.get("location", "{}"))
+                if _should_coalesce(stored_loc, lat, lon, location["timestamp"]):
+                    _remember(key, float(stored_loc["latitude"]), float(stored_loc["longitude"]), stored_loc["timestamp"], 1)
+                    return func.HttpResponse(
+                        "Coalesced",
+                        status_code=200,
+                        headers={**cors, "X-Coalesced": "1", "X-Suppressed-Count": "1"},
+                    )
+            except Exception:
+                pass
+
         total_distance = 0.0
         if prev is not None:
             try:
-                prev_loc = json.loads(prev.get("location", "{}"))
+                prev_loc = codec.loads(prev.get("location", "{}"))
                 total_distance = float(prev.get("totalDistance", 0.0))
                 if all(k in prev_loc for k in ("latitude", "longitude")):
                     p_lat = float(prev_loc["latitude"])
@@ -94,7 +165,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         dist_entity = {
             "PartitionKey": game_id,
             "RowKey": username,
-            "location": json.dumps(location),
+            "location": codec.dumps(location),
             "totalDistance": total_distance,
         }
         # sequence + lastUpdated for ordering/debug
@@ -104,6 +175,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             prev_seq = -1
         dist_entity["seq"] = prev_seq + 1
         dist_entity["lastUpdated"] = datetime.utcnow().isoformat() + "Z"
+        try:
+            prev_suppressed = int(prev.get("suppressedCount") or 0) if prev else 0
+        except Exception:
+            prev_suppressed = 0
+        dist_entity["suppressedCount"] = prev_suppressed + pending_suppressed
 
         try:
             dist_table.upsert_entity(dist_entity)
@@ -111,7 +187,27 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             logging.exception("Failed to upsert Distances entity")
             return func.HttpResponse("Persist failed", status_code=500, headers=cors)
 
-        return func.HttpResponse("OK", status_code=200, headers=cors)
+        # Append-only history for replay; a failure here must not fail the live update
+        try:
+            ts_ms = int(float(location["timestamp"]))
+            storage.table("Fixes", connection_string, create=True).upsert_entity({
+                "PartitionKey": game_id,
+                "RowKey": fix_row_key(ts_ms, username, dist_entity["seq"]),
+                "username": username,
+                "latitude": lat,
+                "longitude": lon,
+                "timestamp": ts_ms,
+                "totalDistance": total_distance,
+            })
+        except Exception:
+            logging.exception("Failed to append Fixes entity")
+
+        # Live-game registry (lastFixAt, fix rate) counts stored fixes only, not coalesced
+        # jitter; throttled, so almost always memory-only
+        active_games.touch(connection_string, game_id, location["timestamp"])
+
+        _remember(key, lat, lon, location["timestamp"])
+        return func.HttpResponse("OK", status_code=200, headers={**cors, "X-Suppressed-Count": str(dist_entity["suppressedCount"])})
     except Exception as e:
         logging.exception("Error in sendLocation")
         return func.HttpResponse(f"Error: {str(e)}", status_code=500, headers=cors)
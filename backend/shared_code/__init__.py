@@ -0,0 +1 @@
+"""Helpers shared by the HTTP functions (import as `from shared_code import ...`)."""
@@ -0,0 +1,156 @@
+"""ActiveGames registry: one row per game in progress, for the operations dashboard.
+
+- PartitionKey: "active"
+- RowKey: gameId
+- sessionId, playerCount, timeStarted
+- lastFixAt: ISO 8601 string, lastFixTs: ms (client timestamp of the newest fix)
+- rate_<worker> / rateAt_<worker>: fixes/sec one worker received over its last full
+  window, and when (epoch seconds) it wrote that
+
+StartGame registers a game on start and removes it on end (Janitor removes abandoned
+ones), so reading the registry costs O(active games) instead of a scan of Games.
+sendLocation calls touch() for every stored fix; the row is refreshed at most every
+ACTIVE_GAMES_TOUCH_SEC (default 10) per game per worker, and only merged into an
+existing row, so late fixes after the end never resurrect a game.
+
+Fixes of one game are spread over every worker that serves its players, so each worker
+keeps its own rate columns and fixes_per_sec() sums the ones refreshed recently. A
+worker's first sight of a game only stamps lastFixAt and starts its window; the first
+rate is written after a full window of counted fixes.
+
+A merge cannot remove properties, so rate writes read the row and replace it (ETag
+guarded) without the columns of workers that stopped writing more than 3 windows ago;
+recycled workers would otherwise pile up columns toward the 252-property limit. If the
+replace loses a race, the rate is merged instead and pruning waits for the next window.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from shared_code import storage
+
+TABLE = "ActiveGames"
+PARTITION = "active"
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+TOUCH_SEC = _env_float("ACTIVE_GAMES_TOUCH_SEC", 10)
+_TOUCH_MAX = 5000
+
+_lock = threading.Lock()
+_touch = {}  # gameId -> [window_start_monotonic, fixes_since_window_start]
+WORKER = hashlib.sha1(f"{os.environ.get('WEBSITE_INSTANCE_ID', '')}:{os.getpid()}".encode()).hexdigest()[:8]
+
+
+def register(conn, game_id, session_id, player_count, time_started):
+    try:
+        storage.table(TABLE, conn, create=True).upsert_entity({
+            "PartitionKey": PARTITION,
+            "RowKey": game_id,
+            "sessionId": session_id,
+            "playerCount": int(player_count),
+            "timeStarted": time_started,
+        })
+    except Exception:
+        logging.exception("ActiveGames register failed for %s", game_id)
+
+
+def unregister(conn, game_id):
+    with _lock:
+        _touch.pop(game_id, None)
+    try:
+        storage.table(TABLE, conn, create=True).delete_entity(partition_key=PARTITION, row_key=game_id)
+    except Exception:
+        logging.exception("ActiveGames unregister failed for %s", game_id)
+
+
+def touch(conn, game_id, fix_ts_ms):
+    """Record one received fix; writes lastFixAt and this worker's rate at a throttled rate."""
+    now = time.monotonic()
+    with _lock:
+        state = _touch.get(game_id)
+        first = state is None
+        if first:
+            if len(_touch) >= _TOUCH_MAX:
+                _touch.clear()
+            state = _touch[game_id] = [now, 0]
+        else:
+            state[1] += 1
+            if now - state[0] < TOUCH_SEC:
+                return
+            rate = state[1] / (now - state[0])
+            state[0], state[1] = now, 0
+    entity = {
+        "PartitionKey": PARTITION,
+        "RowKey": game_id,
+        "lastFixAt": datetime.utcnow().isoformat() + "Z",
+        "lastFixTs": int(fix_ts_ms),
+    }
+    table = storage.table(TABLE, conn)
+    if not first:
+        entity[f"rate_{WORKER}"] = round(rate, 3)
+        entity[f"rateAt_{WORKER}"] = round(time.time(), 1)
+        if _replace_pruned(table, entity):
+            return
+    try:
+        table.update_entity(entity, mode="merge")
+    except Exception:
+        pass  # not registered (ended, or started before the registry existed)
+
+
+def _live_rate_column(key, row, now):
+    if not key.startswith(("rate_", "rateAt_")):
+        return True
+    at = row.get("rateAt_" + key.split("_", 1)[1])
+    try:
+        return now - float(at) <= 3 * TOUCH_SEC
+    except (TypeError, ValueError):
+        return False
+
+
+def _replace_pruned(table, entity):
+    """Write entity over the current row minus stale rate columns. False if the merge path should run."""
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceNotFoundError
+
+    try:
+        current = table.get_entity(PARTITION, entity["RowKey"])
+    except ResourceNotFoundError:
+        return True  # not registered: nothing to write
+    except Exception:
+        return False
+    now = time.time()
+    new = {k: v for k, v in current.items() if _live_rate_column(k, current, now)}
+    new.update(entity)
+    try:
+        table.update_entity(new, mode="replace", etag=current.metadata["etag"], match_condition=MatchConditions.IfNotModified)
+        return True
+    except Exception:
+        return False  # another worker wrote first (or the game just ended)
+
+
+def fixes_per_sec(row, now=None):
+    """Sum of the per-worker rates refreshed within the last 3 touch windows."""
+    now = time.time() if now is None else now
+    total = 0.0
+    for key, value in row.items():
+        if key.startswith("rate_"):
+            at = row.get("rateAt_" + key[5:])
+            if at is not None and now - float(at) <= 3 * TOUCH_SEC:
+                total += float(value or 0)
+    return total
+
+
+def list_active(conn):
+    return list(storage.table(TABLE, conn, create=True).query_entities(
+        "PartitionKey eq @pk", parameters={"pk": PARTITION}
+    ))
@@ -0,0 +1,16 @@
+"""Admin gate for maintenance endpoints.
+
+Callers send the shared secret from the ADMIN_KEY app setting in the x-admin-key
+header. With ADMIN_KEY unset every admin endpoint is closed.
+"""
+
+import hmac
+import os
+
+
+def is_admin(req):
+    expected = os.getenv("ADMIN_KEY") or ""
+    provided = req.headers.get("x-admin-key") or ""
+    if not expected or not provided:
+        return False
+    return hmac.compare_digest(expected.encode(), provided.encode())
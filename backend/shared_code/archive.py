@@ -0,0 +1,190 @@
+"""Compact per-game telemetry archive written when a game ends.
+
+archive_game() reads the game's Distances partition (final per-user totals) and its
+Fixes partition (full ordered trails) once, writes a single GameArchives row, then
+batch-deletes the live rows so the hot tables only hold running games.
+
+GameArchives row (PartitionKey "archive", RowKey gameId):
+- users: JSON { username: { totalDistance, fixes, suppressedCount, firstTs, lastTs } }
+- timeStarted / timeCompleted / startTs / endTs / durationMs
+- encoding: "delta-e6-zlib-v1"; trails0..trailsN: binary chunks of
+  zlib(JSON { username: [dt, dlat, dlng, dt, dlat, dlng, ...] }) where the first triple
+  is absolute (ms, lat*1e6, lng*1e6) and the rest are deltas.
+- truncated: true if trails were decimated to fit the 1 MB entity limit.
+"""
+
+import logging
+import zlib
+
+
+from shared_code import codec, storage
+
+TABLE = "GameArchives"
+PARTITION = "archive"
+ENCODING = "delta-e6-zlib-v1"
+CHUNK_BYTES = 60000      # binary property limit is 64 KiB
+MAX_CHUNKS = 14          # keep the entity well below 1 MB
+BATCH_SIZE = 100
+
+
+def encode_trail(fixes):
+    """[(ts_ms, lat, lng)] sorted by ts -> flat delta-encoded int list."""
+    out = []
+    pt = plat = plng = 0
+    for ts, lat, lng in fixes:
+        t, a, b = int(ts), int(round(lat * 1e6)), int(round(lng * 1e6))
+        out.extend((t - pt, a - plat, b - plng))
+        pt, plat, plng = t, a, b
+    return out
+
+
+def decode_trail(flat):
+    """Inverse of encode_trail: yields (ts_ms, lat, lng)."""
+    t = a = b = 0
+    for i in range(0, len(flat) - 2, 3):
+        t += flat[i]
+        a += flat[i + 1]
+        b += flat[i + 2]
+        yield t, a / 1e6, b / 1e6
+
+
+def pack_trails(trails):
+    """Encode {user: [(ts, lat, lng)]} into binary chunks, decimating if needed. Returns (chunks, truncated)."""
+    step = 1
+    while True:
+        encoded = {u: encode_trail(pts[::step] if step > 1 else pts) for u, pts in trails.items()}
+        blob = zlib.compress(codec.dumps(encoded).encode(), 9)
+        chunks = [blob[i:i + CHUNK_BYTES] for i in range(0, len(blob), CHUNK_BYTES)]
+        if len(chunks) <= MAX_CHUNKS:
+            return chunks, step > 1
+        step *= 2
+
+
+def unpack_trails(entity):
+    """GameArchives row -> {user: [(ts, lat, lng)]}."""
+    chunks = []
+    i = 0
+    while entity.get(f"trails{i}") is not None:
+        chunk = entity.get(f"trails{i}")
+        chunks.append(bytes(chunk.value if hasattr(chunk, "value") else chunk))
+        i += 1
+    if not chunks:
+        return {}
+    encoded = codec.loads(zlib.decompress(b"".join(chunks)))
+    return {u: list(decode_trail(flat)) for u, flat in encoded.items()}
+
+
+def _delete_partition(table, rows):
+    ops = [("delete", {"PartitionKey": r["PartitionKey"], "RowKey": r["RowKey"]}) for r in rows]
+    deleted = 0
+    for i in range(0, len(ops), BATCH_SIZE):
+        chunk = ops[i:i + BATCH_SIZE]
+        try:
+            table.submit_transaction(chunk)
+            deleted += len(chunk)
+        except Exception:
+            logging.exception("Archive cleanup batch failed (%s)", table.table_name)
+    return deleted
+
+
+def archive_game(connection_string, game_id, game=None):
+    """Archive and clear live telemetry for game_id. Returns a summary dict, or None if nothing was live."""
+    distances = storage.table("Distances", connection_string)
+    fixes_table = storage.table("Fixes", connection_string)
+    try:
+        dist_rows = list(distances.query_entities("PartitionKey eq @gid", parameters={"gid": game_id}))
+    except Exception:
+        dist_rows = []
+    try:
+        fix_rows = list(fixes_table.query_entities(
+            "PartitionKey eq @gid",
+            parameters={"gid": game_id},
+            select=["PartitionKey", "RowKey", "username", "latitude", "longitude", "timestamp"],
+        ))
+    except Exception:
+        fix_rows = []
+    if not dist_rows and not fix_rows:
+        return None  # already archived (e.g. second endGame call) or never played
+
+    trails = {}
+    for r in fix_rows:  # RowKey order == time order
+        try:
+            trails.setdefault(r["username"], []).append((int(r["timestamp"]), float(r["latitude"]), float(r["longitude"])))
+        except Exception:
+            continue
+
+    users = {}
+    for r in dist_rows:
+        pts = trails.get(r["RowKey"]) or []
+        users[r["RowKey"]] = {
+            "totalDistance": float(r.get("totalDistance") or 0.0),
+            "fixes": len(pts),
+            "suppressedCount": int(r.get("suppressedCount") or 0),
+            "firstTs": pts[0][0] if pts else None,
+            "lastTs": pts[-1][0] if pts else None,
+        }
+    for u, pts in trails.items():
+        users.setdefault(u, {"totalDistance": 0.0, "fixes": len(pts), "suppressedCount": 0, "firstTs": pts[0][0], "lastTs": pts[-1][0]})
+
+    # Late fixes after a first archive (brushes still posting, second endGame call): merge
+    existing = load_archive(connection_string, game_id)
+    if existing is not None:
+        try:
+            for u, pts in unpack_trails(existing).items():
+                trails[u] = sorted(pts + trails.get(u, []))
+            for u, info in codec.loads_or(existing.get("users"), {}).items():
+                cur = users.get(u)
+                if cur is None:
+                    users[u] = info
+                else:
+                    cur["totalDistance"] = max(cur["totalDistance"], float(info.get("totalDistance") or 0.0))
+                    cur["suppressedCount"] += int(info.get("suppressedCount") or 0)
+            for u, info in users.items():
+                pts = trails.get(u) or []
+                info["fixes"] = len(pts)
+                info["firstTs"] = pts[0][0] if pts else None
+                info["lastTs"] = pts[-1][0] if pts else None
+        except Exception:
+            logging.exception("Could not merge existing archive for %s", game_id)
+    all_ts = [pts[0][0] for pts in trails.values() if pts] + [pts[-1][0] for pts in trails.values() if pts]
+
+    chunks, truncated = pack_trails(trails)
+    entity = {
+        "PartitionKey": PARTITION,
+        "RowKey": str(game_id),
+        "users": codec.dumps(users),
+        "encoding": ENCODING,
+        "chunkCount": len(chunks),
+        "truncated": truncated,
+        "fixCount": sum(len(pts) for pts in trails.values()),
+    }
+    if all_ts:
+        entity["startTs"] = min(all_ts)
+        entity["endTs"] = max(all_ts)
+        entity["durationMs"] = max(all_ts) - min(all_ts)
+    if game:
+        for key in ("sessionId", "timeStarted", "timeCompleted", "roles"):
+            if game.get(key) is not None:
+                entity[key] = game.get(key)
+    for i, chunk in enumerate(chunks):
+        entity[f"trails{i}"] = chunk
+
+    storage.table(TABLE, connection_string, create=True).upsert_entity(entity)
+
+    # Only clear live rows once the archive is durable
+    summary = {
+        "gameId": game_id,
+        "fixes": len(fix_rows),
+        "distanceRowsDeleted": _delete_partition(distances, dist_rows),
+        "fixRowsDeleted": _delete_partition(fixes_table, fix_rows),
+        "truncated": truncated,
+    }
+    return summary
+
+
+def load_archive(connection_string, game_id):
+    """Return the GameArchives row for game_id, or None."""
+    try:
+        return storage.table(TABLE, connection_string).get_entity(PARTITION, str(game_id))
+    except Exception:
+        return None
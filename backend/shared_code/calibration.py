@@ -0,0 +1,237 @@
+"""Difficulty calibration of template multipliers from recorded games.
+
+Points are linear in the multiplier (points ∝ adjustedPct × multiplier × factors that do
+not depend on the template), so templates award equal expected points when
+multiplier × typical accuracy is the same for all of them. load() streams the Scores
+rows once with a narrow projection into flat numpy arrays; propose() then works on
+whole arrays:
+
+- per-template accuracy percentiles (one lexsort, then np.percentile per group)
+- optional skill control: accuracy is modelled as template difficulty × team skill (the
+  mean of the players' skills); both are fitted by alternating multiplicative updates
+  over np.bincount sums, so a template played mostly by strong players does not look
+  easier than it is
+- proposed multiplier = target / typical accuracy, where target keeps the games-weighted
+  average of multiplier × accuracy (the average points per game) unchanged
+
+Templates with fewer than min_games games keep their current multiplier. apply() merges
+the proposals into the Templates rows (previous value kept in multiplierPrevious);
+existing Scores rows are not touched (tools/rescore.py re-scores them).
+"""
+
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+
+from shared_code import codec, scoring, storage
+
+FIELDS = ["templateId", "totalAccuracy", "players", "timeCompleted"]
+STATISTICS = ("median", "mean")
+PERCENTILES = (10, 25, 50, 75, 90)
+MIN_GAMES = 30
+MULTIPLIER_BOUNDS = (0.5, 3.0)
+SKILL_ITERATIONS = 20
+MIN_ACCURACY = 1.0  # percent; games below are treated as not really played
+
+
+class Games:
+    """Flat arrays of one calibration scan."""
+
+    def __init__(self, templates, template_idx, accuracy, pair_game, pair_user, users):
+        self.templates = templates            # [templateId]
+        self.template_idx = template_idx      # game -> template index
+        self.accuracy = accuracy              # game -> totalAccuracy (percent)
+        self.pair_game = pair_game            # (game, player) pairs: game index
+        self.pair_user = pair_user            # (game, player) pairs: user index
+        self.users = users                    # [username]
+
+    def __len__(self):
+        return len(self.accuracy)
+
+
+def load(conn, since=None, with_players=True, page_size=1000, progress=None):
+    """Stream Scores into Games arrays (rows without a usable totalAccuracy are skipped)."""
+    filt = "PartitionKey eq 'score'"
+    params = {}
+    if since:
+        filt += " and timeCompleted ge @since"
+        params["since"] = since
+    select = FIELDS if with_players else ["templateId", "totalAccuracy"]
+    rows = storage.table("Scores", conn).query_entities(filt, parameters=params, select=select, results_per_page=page_size)
+
+    template_ids, user_ids = {}, {}
+    t_idx, acc, pair_g, pair_u = [], [], [], []
+    for row in rows:
+        a = row.get("totalAccuracy")
+        tid = row.get("templateId")
+        if a is None or not tid:
+            continue
+        try:
+            a = float(a)
+        except (TypeError, ValueError):
+            continue
+        if a < MIN_ACCURACY:
+            continue
+        g = len(acc)
+        t_idx.append(template_ids.setdefault(tid, len(template_ids)))
+        acc.append(a)
+        if with_players:
+            for p in codec.loads_or(row.get("players"), None) or []:
+                user = p.get("username") if isinstance(p, dict) else None
+                if user:
+                    pair_g.append(g)
+                    pair_u.append(user_ids.setdefault(user, len(user_ids)))
+        if progress and len(acc) % 10000 == 0:
+            progress(len(acc))
+    return Games(
+        list(template_ids), np.asarray(t_idx, dtype=np.int32), np.asarray(acc, dtype=np.float64),
+        np.asarray(pair_g, dtype=np.int32), np.asarray(pair_u, dtype=np.int32), list(user_ids),
+    )
+
+
+def _group_stat(values, groups, n_groups, statistic):
+    """statistic of values per group -> array (nan for empty groups)."""
+    out = np.full(n_groups, np.nan)
+    if not len(values):
+        return out
+    if statistic == "mean":
+        counts = np.bincount(groups, minlength=n_groups)
+        sums = np.bincount(groups, weights=values, minlength=n_groups)
+        np.divide(sums, counts, out=out, where=counts > 0)
+        return out
+    order = np.argsort(groups, kind="stable")
+    g_sorted, v_sorted = groups[order], values[order]
+    starts = np.flatnonzero(np.r_[True, g_sorted[1:] != g_sorted[:-1]])
+    for start, end in zip(starts, np.r_[starts[1:], len(g_sorted)]):
+        out[g_sorted[start]] = np.median(v_sorted[start:end])
+    return out
+
+
+def _percentiles(values, groups, n_groups):
+    order = np.lexsort((values, groups))
+    g_sorted, v_sorted = groups[order], values[order]
+    bounds = np.searchsorted(g_sorted, np.arange(n_groups + 1))
+    out = []
+    for t in range(n_groups):
+        chunk = v_sorted[bounds[t]:bounds[t + 1]]
+        if len(chunk):
+            qs = np.percentile(chunk, PERCENTILES)
+            out.append({**{f"p{p}": round(float(q), 2) for p, q in zip(PERCENTILES, qs)}, "mean": round(float(chunk.mean()), 2)})
+        else:
+            out.append(None)
+    return out
+
+
+def skill_adjusted(games, statistic="median", iterations=SKILL_ITERATIONS):
+    """Per-template difficulty (typical accuracy at average skill) and per-game team skill."""
+    n_t = len(games.templates)
+    acc = games.accuracy
+    difficulty = _group_stat(acc, games.template_idx, n_t, statistic)
+    team_skill = np.ones(len(acc))
+    if not len(games.pair_game):
+        return difficulty, team_skill
+    n_u = len(games.users)
+    per_game_players = np.bincount(games.pair_game, minlength=len(acc))
+    has_players = per_game_players > 0
+    user_counts = np.maximum(np.bincount(games.pair_user, minlength=n_u), 1)
+    user_skill = np.ones(n_u)
+    for _ in range(iterations):
+        team_sum = np.bincount(games.pair_game, weights=user_skill[games.pair_user], minlength=len(acc))
+        team_skill = np.where(has_players, team_sum / np.maximum(per_game_players, 1), 1.0)
+        # multiplicative update: scale each user by how far their games beat the current fit
+        ratio = acc / (difficulty[games.template_idx] * team_skill)
+        user_skill *= np.bincount(games.pair_user, weights=ratio[games.pair_game], minlength=n_u) / user_counts
+        user_skill /= user_skill.mean()
+        difficulty = _group_stat(acc / team_skill, games.template_idx, n_t, statistic)
+    return difficulty, team_skill
+
+
+def current_multipliers(conn):
+    """{templateId: multiplier} from the Templates rows (shape defaults when unset)."""
+    out = {}
+    for t in storage.table("Templates", conn).query_entities("PartitionKey eq 'template'", select=["RowKey", "multiplier"]):
+        out[t["RowKey"]] = scoring.difficulty_for(t["RowKey"], t.get("multiplier"))
+    return out
+
+
+def propose(games, current, statistic="median", skill=False, min_games=MIN_GAMES, bounds=MULTIPLIER_BOUNDS):
+    """Calibration report: per-template stats and proposed multipliers."""
+    if statistic not in STATISTICS:
+        raise ValueError(f"statistic must be one of {STATISTICS}")
+    n_t = len(games.templates)
+    counts = np.bincount(games.template_idx, minlength=n_t)
+    if skill:
+        typical, _ = skill_adjusted(games, statistic)
+    else:
+        typical = _group_stat(games.accuracy, games.template_idx, n_t, statistic)
+    mult = np.array([scoring.difficulty_for(t, current.get(t)) for t in games.templates])
+    eligible = (counts >= min_games) & (typical > 0)
+
+    proposed = mult.copy()
+    target = None
+    if eligible.any():
+        # Keep the games-weighted average of multiplier × accuracy (≈ average points) unchanged
+        target = float(np.average(mult[eligible] * typical[eligible], weights=counts[eligible]))
+        proposed[eligible] = np.clip(target / typical[eligible], *bounds)
+    proposed = np.round(proposed, 2)
+
+    dist = _percentiles(games.accuracy, games.template_idx, n_t)
+    items = []
+    for t, tid in enumerate(games.templates):
+        items.append({
+            "templateId": tid,
+            "games": int(counts[t]),
+            "accuracy": dist[t],
+            "typicalAccuracy": round(float(typical[t]), 2) if not np.isnan(typical[t]) else None,
+            "currentMultiplier": round(float(mult[t]), 3),
+            "proposedMultiplier": float(proposed[t]),
+            "change": round(float(proposed[t] - mult[t]), 3),
+            "insufficientData": not bool(eligible[t]),
+        })
+    items.sort(key=lambda i: -i["games"])
+    return {
+        "statistic": statistic,
+        "skillAdjusted": bool(skill),
+        "minGames": min_games,
+        "games": len(games),
+        "players": len(games.users),
+        "targetPointsIndex": round(target, 3) if target is not None else None,
+        "templates": items,
+    }
+
+
+def apply(conn, report, min_change=0.01):
+    """Merge proposed multipliers into Templates. Returns the templateIds updated."""
+    table = storage.table("Templates", conn)
+    stamp = datetime.utcnow().isoformat() + "Z"
+    updated = []
+    for item in report["templates"]:
+        if item["insufficientData"] or abs(item["change"]) < min_change:
+            continue
+        try:
+            table.update_entity({
+                "PartitionKey": "template",
+                "RowKey": item["templateId"],
+                "multiplier": item["proposedMultiplier"],
+                "multiplierPrevious": item["currentMultiplier"],
+                "multiplierCalibratedAt": stamp,
+            }, mode="merge")
+        except Exception:
+            logging.exception("Could not update multiplier of %s (no Templates row?)", item["templateId"])
+            continue
+        updated.append(item["templateId"])
+    return updated
+
+
+def run(conn, since=None, statistic="median", skill=False, min_games=MIN_GAMES, progress=None):
+    """Scan + propose. Returns the report with timing."""
+    t0 = time.perf_counter()
+    games = load(conn, since=since, with_players=skill, progress=progress)
+    t1 = time.perf_counter()
+    report = propose(games, current_multipliers(conn), statistic=statistic, skill=skill, min_games=min_games)
+    report["since"] = since
+    report["scanSec"] = round(t1 - t0, 2)
+    report["computeSec"] = round(time.perf_counter() - t1, 3)
+    return report
@@ -0,0 +1,93 @@
+"""JSON / MessagePack encoding shared by the functions.
+
+Uses orjson when installed and falls back to the stdlib json module. MessagePack is
+offered through content negotiation (Accept / Content-Type: application/msgpack) when
+the msgpack package is installed; otherwise everything stays JSON.
+
+- dumps/loads: str in, str out. Used for request/response bodies and for the
+  JSON-in-a-string table properties (users, readyStatus, roles, players, ...).
+- read_body(req): decode a request body according to its Content-Type.
+- encode(obj, req): (body, mimetype) honoring the request's Accept header.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+JSON_MIME = "application/json"
+MSGPACK_MIME = "application/msgpack"
+_MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def dumps(obj) -> str:
+    """Serialize to a compact JSON string."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. non-str dict keys; stdlib is more permissive
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def loads(data):
+    """Parse JSON from str/bytes. Raises ValueError on malformed input."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(str(e))
+    return json.loads(data)
+
+
+def loads_or(data, default):
+    """Parse a JSON table property, returning default when empty or malformed."""
+    if data is None or data == "":
+        return default
+    if not isinstance(data, (str, bytes, bytearray)):
+        return data
+    try:
+        return loads(data)
+    except Exception:
+        return default
+
+
+def _is_msgpack(mime) -> bool:
+    mime = (mime or "").lower()
+    return any(alias in mime for alias in _MSGPACK_ALIASES)
+
+
+def wants_msgpack(req) -> bool:
+    return msgpack is not None and _is_msgpack(req.headers.get("Accept"))
+
+
+def read_body(req):
+    """Decode the request body as MessagePack or JSON based on Content-Type.
+
+    Raises ValueError if the body cannot be decoded (mirrors HttpRequest.get_json).
+    """
+    body = req.get_body()
+    if _is_msgpack(req.headers.get("Content-Type")):
+        if msgpack is None:
+            raise ValueError("MessagePack not supported")
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(str(e))
+    if not body:
+        raise ValueError("Empty body")
+    return loads(body)
+
+
+def encode(obj, req=None):
+    """Return (body, mimetype) for obj, using MessagePack if the client accepts it."""
+    if req is not None and wants_msgpack(req):
+        return msgpack.packb(obj, use_bin_type=True), MSGPACK_MIME
+    return dumps(obj), JSON_MIME
@@ -0,0 +1,103 @@
+"""Response compression honoring Accept-Encoding (gzip, plus brotli when installed).
+
+Bodies smaller than RESPONSE_COMPRESS_MIN_BYTES (default 1024) are sent raw: for tiny
+payloads the header overhead and CPU outweigh the savings.
+
+With etag=True the response carries a content-hash ETag, answers If-None-Match with
+304, and the compressed bytes are memoized per (ETag, encoding) so static-ish bodies
+like the template catalog are compressed once per worker, not once per request.
+"""
+
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+
+import azure.functions as func
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoder
+    brotli = None
+
+try:
+    MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+except Exception:
+    MIN_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+_CACHE_MAX_ENTRIES = 64
+
+_compressed_cache = OrderedDict()  # (etag, encoding) -> bytes
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header value (q-values respected)."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return data
+
+
+def etag_for(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest() + '"'
+
+
+def _cached_compress(etag, data, encoding):
+    key = (etag, encoding)
+    hit = _compressed_cache.get(key)
+    if hit is not None:
+        _compressed_cache.move_to_end(key)
+        return hit
+    out = compress(data, encoding)
+    _compressed_cache[key] = out
+    if len(_compressed_cache) > _CACHE_MAX_ENTRIES:
+        _compressed_cache.popitem(last=False)
+    return out
+
+
+def http_response(body, req, headers, status_code=200, etag=False):
+    """Build an HttpResponse, compressing body if the client accepts it and it is large enough."""
+    data = body.encode() if isinstance(body, str) else (body or b"")
+    out_headers = dict(headers)
+    vary = out_headers.get("Vary")
+    out_headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+    tag = None
+    if etag:
+        tag = etag_for(data)
+        out_headers["ETag"] = tag
+        if status_code == 200 and req.headers.get("If-None-Match") == tag:
+            return func.HttpResponse(b"", status_code=304, headers=out_headers)
+
+    encoding = choose_encoding(req.headers.get("Accept-Encoding")) if len(data) >= MIN_BYTES else None
+    if encoding:
+        data = _cached_compress(tag, data, encoding) if tag else compress(data, encoding)
+        out_headers["Content-Encoding"] = encoding
+    return func.HttpResponse(data, status_code=status_code, headers=out_headers)
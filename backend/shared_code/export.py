@@ -0,0 +1,123 @@
+"""Bulk export of Scores rows (optionally joined with Games) as NDJSON or CSV.
+
+Rows are read one storage page at a time with a `select` projection, so memory is
+bounded by the page size however many games exist. `since` (ISO 8601) keeps only games
+with timeCompleted >= since for incremental exports; each record carries its
+timeCompleted, so the largest value seen is the next export's `since`.
+
+Used by the ExportScores endpoint (one page per request) and tools/export.py (every
+page, streamed to a file).
+"""
+
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_code import codec, paging, storage
+
+SCORE_FIELDS = [
+    "RowKey", "sessionId", "timeCompleted", "timePlayedSec", "templateId", "templateName",
+    "templateRadiusMeters", "finalScore", "totalAccuracy", "scoreMultiplier",
+    "hausdorffMeters", "frechetMeters", "turningDistance", "players", "hasDrawing",
+]
+GAME_FIELDS = ["RowKey", "timeStarted", "status", "roles"]
+JOIN_WORKERS = 8  # concurrent Games point reads per page
+
+CSV_COLUMNS = [
+    "gameId", "sessionId", "timeStarted", "timeCompleted", "timePlayedSec", "status",
+    "templateId", "templateName", "templateRadiusMeters", "finalScore", "totalAccuracy",
+    "scoreMultiplier", "hausdorffMeters", "frechetMeters", "turningDistance",
+    "playerCount", "players", "hasDrawing",
+]
+
+
+def scores_query(conn, since=None, page_size=1000):
+    filt = "PartitionKey eq 'score'"
+    params = {}
+    if since:
+        filt += " and timeCompleted ge @since"
+        params["since"] = since
+    return storage.table("Scores", conn).query_entities(
+        filt, parameters=params, select=SCORE_FIELDS, results_per_page=page_size
+    )
+
+
+def fetch_page(conn, since=None, page_size=1000, token=None):
+    """One storage page of Scores rows. Returns (rows, next_token_encoded)."""
+    return paging.first_page(scores_query(conn, since, page_size), token)
+
+
+def iter_pages(conn, since=None, page_size=1000):
+    """Every page of Scores rows, lazily."""
+    pages = scores_query(conn, since, page_size).by_page()
+    for page in pages:
+        yield list(page)
+
+
+def games_for(conn, game_ids):
+    """{gameId: Games row} for the given ids, one get_entity point read per id.
+
+    An OR of RowKey comparisons cannot use the index and scans the whole "game"
+    partition, so each id is read directly (JOIN_WORKERS at a time) instead.
+    """
+    table = storage.table("Games", conn)
+    ids = list(dict.fromkeys(g for g in game_ids if g))
+
+    def fetch(gid):
+        try:
+            return table.get_entity("game", gid, select=GAME_FIELDS)
+        except Exception:
+            return None  # no Games row (deleted or never created)
+
+    if not ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(JOIN_WORKERS, len(ids))) as pool:
+        return {g["RowKey"]: g for g in pool.map(fetch, ids) if g}
+
+
+def record(row, game=None):
+    """Scores row (+ Games row) -> flat export record."""
+    players = codec.loads_or(row.get("players"), None) or []
+    rec = {
+        "gameId": row.get("RowKey"),
+        "sessionId": row.get("sessionId"),
+        "timeCompleted": row.get("timeCompleted"),
+        "timePlayedSec": row.get("timePlayedSec"),
+        "templateId": row.get("templateId"),
+        "templateName": row.get("templateName"),
+        "templateRadiusMeters": row.get("templateRadiusMeters"),
+        "finalScore": row.get("finalScore"),
+        "totalAccuracy": row.get("totalAccuracy"),
+        "scoreMultiplier": row.get("scoreMultiplier"),
+        "hausdorffMeters": row.get("hausdorffMeters"),
+        "frechetMeters": row.get("frechetMeters"),
+        "turningDistance": row.get("turningDistance"),
+        "playerCount": len(players),
+        "players": players,
+        "hasDrawing": bool(row.get("hasDrawing")),
+    }
+    if game is not None:
+        rec["timeStarted"] = game.get("timeStarted")
+        rec["status"] = game.get("status")
+        rec["roles"] = codec.loads_or(game.get("roles"), None)
+    return rec
+
+
+def records(conn, rows, join_games=False):
+    games = games_for(conn, [r.get("RowKey") for r in rows]) if join_games else {}
+    for row in rows:
+        yield record(row, games.get(row.get("RowKey"), {}) if join_games else None)
+
+
+def ndjson(recs):
+    return "".join(codec.dumps(r) + "\n" for r in recs)
+
+
+def csv_text(recs, header=False):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_COLUMNS, extrasaction="ignore", lineterminator="\n")
+    if header:
+        writer.writeheader()
+    for r in recs:
+        writer.writerow({**r, "players": codec.dumps(r.get("players") or [])})
+    return buf.getvalue()
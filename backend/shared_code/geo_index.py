@@ -0,0 +1,196 @@
+"""SessionGeo index: sessions by geohash cell, for "open games near me" queries.
+
+- PartitionKey: "<precision>:<geohash prefix>" for each of INDEX_PRECISIONS (one row per
+  precision, so a query can pick the cell size that fits its radius)
+- RowKey: sessionId
+- latitude, longitude, geohash (GEOHASH_PRECISION chars), creator, createdAt, templateId
+- open: bool (not started), userCount
+
+JoinSession places the session when its defaultCenter or template center is set; the
+session remembers its geohash (Sessions.geoHash) so a move deletes the old cells. The
+lobby helpers keep open/userCount in step with OpenSessions; deleting a session (leave,
+Janitor) removes its rows.
+
+nearby() covers the search circle's bounding box with at most MAX_CELLS cells of the
+finest precision that allows it, runs one partition query per cell and refines with
+haversine, so latency depends on the sessions around the caller rather than on the
+total number of sessions.
+"""
+
+import logging
+import math
+
+from shared_code import storage
+
+TABLE = "SessionGeo"
+GEOHASH_PRECISION = 9
+INDEX_PRECISIONS = (3, 4, 5)  # ~156 km, ~39x20 km, ~4.9 km cells
+MAX_CELLS = 12
+MAX_RADIUS_METERS = 50000.0
+EARTH_RADIUS = 6371000.0
+METERS_PER_DEG = 111320.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    out = []
+    bit = ch = 0
+    even = True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            out.append(_BASE32[ch])
+            bit = ch = 0
+    return "".join(out)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def covering_cells(lat, lng, radius_meters):
+    """(precision, [geohash prefixes]) covering the circle's bounding box with <= MAX_CELLS cells."""
+    d_lat = radius_meters / METERS_PER_DEG
+    d_lng = radius_meters / (METERS_PER_DEG * max(math.cos(math.radians(lat)), 1e-6))
+    lat_lo, lat_hi = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    d_lng = min(d_lng, 180.0)
+    for precision in sorted(INDEX_PRECISIONS, reverse=True):
+        h, w = cell_size(precision)
+        rows = range(int((lat_lo + 90) // h), int(min(lat_hi + 90, 180 - 1e-9) // h) + 1)
+        cols = range(int((lng - d_lng + 180) // w), int((lng + d_lng + 180) // w) + 1)
+        if len(rows) * len(cols) > MAX_CELLS and precision != min(INDEX_PRECISIONS):
+            continue
+        n_cols = int(round(360.0 / w))
+        cells = []
+        for r in rows:
+            c_lat = -90 + (r + 0.5) * h
+            for c in cols:
+                c_lng = -180 + ((c % n_cols) + 0.5) * w
+                cell = encode(c_lat, c_lng, precision)
+                if cell not in cells:
+                    cells.append(cell)
+        return precision, cells
+    return None, []
+
+
+def _pk(precision, geohash):
+    return f"{precision}:{geohash[:precision]}"
+
+
+def _table(conn):
+    return storage.table(TABLE, conn, create=True)
+
+
+def place(conn, session, lat, lng, user_count=None):
+    """Index the session at (lat, lng); sets session["geoHash"] (caller persists the session)."""
+    new_hash = encode(lat, lng)
+    old_hash = session.get("geoHash")
+    sid = session["RowKey"]
+    try:
+        table = _table(conn)
+        if old_hash and old_hash != new_hash:
+            for p in INDEX_PRECISIONS:
+                if old_hash[:p] != new_hash[:p]:
+                    try:
+                        table.delete_entity(partition_key=_pk(p, old_hash), row_key=sid)
+                    except Exception:
+                        pass
+        row = {
+            "RowKey": sid,
+            "latitude": float(lat),
+            "longitude": float(lng),
+            "geohash": new_hash,
+            "creator": session.get("creator", ""),
+            "createdAt": session.get("createdAt"),
+            "templateId": session.get("templateId"),
+            "open": not session.get("isStarted", False),
+        }
+        if user_count is not None:
+            row["userCount"] = int(user_count)
+        for p in INDEX_PRECISIONS:
+            table.upsert_entity({**row, "PartitionKey": _pk(p, new_hash)})
+    except Exception:
+        logging.exception("SessionGeo upsert failed for %s", sid)
+    session["geoHash"] = new_hash
+    return new_hash
+
+
+def sync(conn, session, **fields):
+    """Merge fields (open, userCount) into an indexed session's rows; no-op if not indexed."""
+    geohash = session.get("geoHash")
+    if not geohash:
+        return
+    try:
+        table = _table(conn)
+        for p in INDEX_PRECISIONS:
+            table.update_entity({"PartitionKey": _pk(p, geohash), "RowKey": session["RowKey"], **fields}, mode="merge")
+    except Exception:
+        logging.exception("SessionGeo update failed for %s", session.get("RowKey"))
+
+
+def remove(conn, session):
+    geohash = session.get("geoHash")
+    if not geohash:
+        return
+    table = _table(conn)
+    for p in INDEX_PRECISIONS:
+        try:
+            table.delete_entity(partition_key=_pk(p, geohash), row_key=session["RowKey"])
+        except Exception:
+            pass
+
+
+def nearby(conn, lat, lng, radius_meters, limit=20, open_only=True):
+    """Sessions within radius_meters of (lat, lng), nearest first, with distanceMeters."""
+    radius_meters = min(float(radius_meters), MAX_RADIUS_METERS)
+    precision, cells = covering_cells(lat, lng, radius_meters)
+    table = _table(conn)
+    filt = "PartitionKey eq @pk" + (" and open eq true" if open_only else "")
+    found = {}
+    for cell in cells:
+        for r in table.query_entities(filt, parameters={"pk": f"{precision}:{cell}"}):
+            d = haversine(lat, lng, float(r["latitude"]), float(r["longitude"]))
+            if d <= radius_meters:
+                found[r["RowKey"]] = {
+                    "sessionId": r["RowKey"],
+                    "creator": r.get("creator"),
+                    "createdAt": r.get("createdAt"),
+                    "templateId": r.get("templateId"),
+                    "userCount": r.get("userCount"),
+                    "open": bool(r.get("open")),
+                    "latitude": r["latitude"],
+                    "longitude": r["longitude"],
+                    "distanceMeters": round(d, 1),
+                }
+    results = sorted(found.values(), key=lambda s: s["distanceMeters"])
+    return results[:limit], {"precision": precision, "cells": len(cells)}
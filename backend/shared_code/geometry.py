@@ -0,0 +1,278 @@
+"""Template geometry precompilation and level-of-detail (LOD) selection.
+
+Templates are stored as normalized base vertices [{x, y}] around the origin; clients
+scale them by radiusMeters around a lat/lng center. compile_template() turns the raw
+submitted vertices into a canonical, reusable form once (at create/update time):
+
+- duplicate and collinear vertices removed, counter-clockwise winding, starting at
+  the top-most (then left-most) vertex
+- scaled so the largest |x| or |y| is 1 (origin preserved, so placement is unchanged)
+- bounding box and closed perimeter (unit coordinates)
+- densified boundary samples at standard unit steps (DENSIFY_STEPS)
+- Douglas-Peucker simplifications at increasing tolerances (LOD_TOLERANCES)
+
+The result is a plain dict stored as a JSON string in the Templates row `geometry`.
+"""
+
+import math
+
+GEOMETRY_VERSION = 1
+DENSIFY_STEPS = (0.02, 0.05, 0.1)
+LOD_TOLERANCES = (0.0, 0.005, 0.02, 0.05)  # LOD 0 is the canonical polygon
+COLLINEAR_EPS = 1e-9
+METERS_PER_DEG = 111320.0
+# Without a zoom level, the allowed simplification error in meters
+LOD_METERS_BUDGET = 0.5
+DEFAULT_RADIUS_METERS = 100.0
+
+
+def _r(v):
+    return round(v, 5)
+
+
+def parse_vertices(raw):
+    """[{x, y}] -> [(x, y)] floats, skipping malformed entries."""
+    pts = []
+    for p in raw or []:
+        try:
+            pts.append((float(p.get("x", 0)), float(p.get("y", 0))))
+        except Exception:
+            continue
+    return pts
+
+
+def signed_area(pts):
+    a = 0.0
+    n = len(pts)
+    for i in range(n):
+        x1, y1 = pts[i]
+        x2, y2 = pts[(i + 1) % n]
+        a += x1 * y2 - x2 * y1
+    return a / 2.0
+
+
+def clean_polygon(pts):
+    """Drop consecutive duplicates (including a repeated closing vertex) and collinear vertices."""
+    out = []
+    for p in pts:
+        if not out or p != out[-1]:
+            out.append(p)
+    if len(out) > 1 and out[0] == out[-1]:
+        out.pop()
+    changed = True
+    while changed and len(out) > 3:
+        changed = False
+        n = len(out)
+        for i in range(n):
+            ax, ay = out[i - 1]
+            bx, by = out[i]
+            cx, cy = out[(i + 1) % n]
+            cross = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+            if abs(cross) <= COLLINEAR_EPS:
+                out.pop(i)
+                changed = True
+                break
+    return out
+
+
+def canonicalize(pts):
+    """CCW winding, rotated to start at the top-most then left-most vertex."""
+    if signed_area(pts) < 0:
+        pts = list(reversed(pts))
+    start = min(range(len(pts)), key=lambda i: (-pts[i][1], pts[i][0]))
+    return pts[start:] + pts[:start]
+
+
+def perimeter(pts, closed=True):
+    n = len(pts)
+    last = n if closed else n - 1
+    return sum(math.hypot(pts[(i + 1) % n][0] - pts[i][0], pts[(i + 1) % n][1] - pts[i][1]) for i in range(last))
+
+
+def densify(pts, step):
+    """Evenly subdivide each closed-polygon edge so no gap exceeds step (mirrors ScoreCalculator.densifyPath)."""
+    out = []
+    n = len(pts)
+    for i in range(n):
+        ax, ay = pts[i]
+        bx, by = pts[(i + 1) % n]
+        out.append((ax, ay))
+        seg = math.hypot(bx - ax, by - ay)
+        if seg > step:
+            k = int(seg // step)
+            for s in range(1, k):
+                t = s / k
+                out.append((ax + (bx - ax) * t, ay + (by - ay) * t))
+    return out
+
+
+def _point_segment_distance(p, a, b):
+    vx, vy = b[0] - a[0], b[1] - a[1]
+    wx, wy = p[0] - a[0], p[1] - a[1]
+    c2 = vx * vx + vy * vy
+    if c2 == 0:
+        return math.hypot(wx, wy)
+    t = max(0.0, min(1.0, (vx * wx + vy * wy) / c2))
+    return math.hypot(p[0] - (a[0] + t * vx), p[1] - (a[1] + t * vy))
+
+
+def _douglas_peucker(pts, tol):
+    """Open-polyline Douglas-Peucker (iterative); keeps both endpoints."""
+    keep = [False] * len(pts)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        i, j = stack.pop()
+        best, idx = -1.0, None
+        for k in range(i + 1, j):
+            d = _point_segment_distance(pts[k], pts[i], pts[j])
+            if d > best:
+                best, idx = d, k
+        if idx is not None and best > tol:
+            keep[idx] = True
+            stack.append((i, idx))
+            stack.append((idx, j))
+    return [p for p, k in zip(pts, keep) if k]
+
+
+def simplify_polyline(pts, tol):
+    """Open-polyline simplification (both endpoints kept)."""
+    if tol <= 0 or len(pts) <= 2:
+        return list(pts)
+    return _douglas_peucker(pts, tol)
+
+
+def simplify_polygon(pts, tol):
+    """Closed-polygon simplification: split at the vertex farthest from the start."""
+    if tol <= 0 or len(pts) <= 3:
+        return list(pts)
+    far = max(range(len(pts)), key=lambda i: math.hypot(pts[i][0] - pts[0][0], pts[i][1] - pts[0][1]))
+    if far == 0:
+        return list(pts)
+    first = _douglas_peucker(pts[: far + 1], tol)
+    second = _douglas_peucker(pts[far:] + [pts[0]], tol)
+    out = first[:-1] + second[:-1]
+    return out if len(out) >= 3 else list(pts)
+
+
+def compile_template(raw_vertices):
+    """Compile raw [{x, y}] base vertices. Returns None if fewer than 3 usable vertices remain."""
+    pts = clean_polygon(parse_vertices(raw_vertices))
+    if len(pts) < 3 or signed_area(pts) == 0:
+        return None
+    pts = canonicalize(pts)
+    scale = max(max(abs(x), abs(y)) for x, y in pts)
+    if scale <= 0:
+        return None
+    pts = [(x / scale, y / scale) for x, y in pts]
+
+    xs = [x for x, _ in pts]
+    ys = [y for _, y in pts]
+    lods = []
+    for tol in LOD_TOLERANCES:
+        simplified = simplify_polygon(pts, tol)
+        if lods and len(simplified) == len(lods[-1]["vertices"]):
+            continue  # no further reduction at this tolerance
+        lods.append({"tolerance": tol, "vertices": [{"x": _r(x), "y": _r(y)} for x, y in simplified]})
+    return {
+        "version": GEOMETRY_VERSION,
+        "bbox": {"minX": _r(min(xs)), "minY": _r(min(ys)), "maxX": _r(max(xs)), "maxY": _r(max(ys))},
+        "perimeter": _r(perimeter(pts)),
+        "area": _r(abs(signed_area(pts))),
+        "samples": {str(step): [[_r(x), _r(y)] for x, y in densify(pts, step)] for step in DENSIFY_STEPS},
+        "lods": lods,
+    }
+
+
+def geometry_from_entity(entity, loads):
+    """Return the compiled geometry for a Templates row, compiling legacy rows on the fly.
+
+    loads: JSON decoder (codec.loads). Results for legacy rows are memoized per raw string.
+    """
+    stored = entity.get("geometry")
+    if stored:
+        try:
+            geo = loads(stored) if isinstance(stored, str) else stored
+            if isinstance(geo, dict) and geo.get("version") == GEOMETRY_VERSION:
+                return geo
+        except Exception:
+            pass
+    raw = entity.get("baseVertices")
+    if not raw:
+        return None
+    key = raw if isinstance(raw, str) else None
+    if key is not None and key in _legacy_cache:
+        return _legacy_cache[key]
+    try:
+        geo = compile_template(loads(raw) if isinstance(raw, str) else raw)
+    except Exception:
+        geo = None
+    if key is not None:
+        if len(_legacy_cache) >= 256:
+            _legacy_cache.clear()
+        _legacy_cache[key] = geo
+    return geo
+
+
+_legacy_cache = {}
+
+
+def meters_per_pixel(zoom, lat=0.0):
+    """Web Mercator ground resolution at a zoom level (256 px tiles)."""
+    return 156543.03392 * math.cos(math.radians(lat or 0.0)) / (2 ** float(zoom))
+
+
+def select_lod(geometry, radius_meters=None, zoom=None, lat=None):
+    """Pick the coarsest LOD whose error is invisible at the requested scale.
+
+    - zoom (+ radius): error budget is half a pixel of the rendered template
+    - radius only: error budget is LOD_METERS_BUDGET meters on the ground
+    Returns (index, lod dict).
+    """
+    lods = (geometry or {}).get("lods") or []
+    if not lods:
+        return None, None
+    try:
+        radius = float(radius_meters) if radius_meters is not None else None
+    except Exception:
+        radius = None
+    if radius is None or radius <= 0:
+        if zoom is None:
+            return 0, lods[0]
+        radius = DEFAULT_RADIUS_METERS
+    if zoom is not None:
+        try:
+            budget_m = 0.5 * meters_per_pixel(float(zoom), lat)
+        except Exception:
+            budget_m = LOD_METERS_BUDGET
+    else:
+        budget_m = LOD_METERS_BUDGET
+    max_tol = budget_m / radius
+    chosen = 0
+    for i, lod in enumerate(lods):
+        if lod["tolerance"] <= max_tol:
+            chosen = i
+    return chosen, lods[chosen]
+
+
+def scale_to_latlng(vertices, center_lat, center_lng, radius):
+    """Scale unit vertices [{x, y}] to [{lat, lng}] around a center (same math as JoinSession/ScoreCalculator)."""
+    d_lat = radius / METERS_PER_DEG
+    try:
+        d_lng = radius / (METERS_PER_DEG * math.cos(math.radians(center_lat)))
+    except Exception:
+        d_lng = radius / METERS_PER_DEG
+    return [{"lat": center_lat + p.get("y", 0) * d_lat, "lng": center_lng + p.get("x", 0) * d_lng} for p in vertices]
+
+
+def serialize(geometry, dumps, max_chars=30000):
+    """JSON for the `geometry` table property, shedding the finest samples to fit Table Storage limits."""
+    geo = dict(geometry)
+    geo["samples"] = dict(geo.get("samples") or {})
+    text = dumps(geo)
+    for step in sorted(geo["samples"], key=float):
+        if len(text) <= max_chars:
+            break
+        geo["samples"].pop(step)
+        text = dumps(geo)
+    return text if len(text) <= max_chars else None
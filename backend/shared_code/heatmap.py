@@ -0,0 +1,185 @@
+"""Per-template density heatmap of where players actually walked.
+
+Every Scores row's drawing trails are mapped into the template's unit frame, the same
+frame as Templates.baseVertices: x = Δlng / (radius in degrees of longitude),
+y = Δlat / (radius in degrees of latitude), so the template outline lies within
+[-1, 1]. Points are binned with numpy.histogram2d over [-EXTENT, EXTENT]² (EXTENT > 1 so
+deviations outside the shape show up) one chunk of rows at a time, so memory stays
+bounded by the chunk size rather than by the number of games.
+
+The accumulated raster is cached in the TemplateHeatmaps table (PK "heatmap", RK
+templateId) as zlib-compressed uint32 counts, plus a timeCompleted watermark. update()
+only scans Scores rows completed after the watermark, so the cache grows incrementally
+as games arrive; rebuild=True starts from an empty grid.
+"""
+
+import math
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from shared_code import codec, storage
+
+TABLE = "TemplateHeatmaps"
+PARTITION = "heatmap"
+BINS = 64
+EXTENT = 1.5
+CHUNK_ROWS = 250
+METERS_PER_DEG = 111320.0
+FIELDS = ["RowKey", "drawing", "templateCenter", "templateRadiusMeters", "timeCompleted"]
+
+
+def empty_grid(bins=BINS):
+    return np.zeros((bins, bins), dtype=np.uint32)
+
+
+def unit_points(drawing, center, radius_meters):
+    """Stored drawing JSON + template snapshot -> (x, y) float arrays in the unit frame."""
+    trails = (codec.loads_or(drawing, None) or {}).get("trails")
+    center = codec.loads_or(center, None)
+    if not isinstance(trails, dict) or not isinstance(center, dict):
+        return None
+    try:
+        c_lat = float(center.get("latitude", center.get("lat")))
+        c_lng = float(center.get("longitude", center.get("lng")))
+        radius = float(radius_meters or 0)
+    except (TypeError, ValueError):
+        return None
+    if radius <= 0:
+        return None
+    lat, lng = [], []
+    for pts in trails.values():
+        for p in pts or []:
+            if isinstance(p, dict) and p.get("latitude") is not None and p.get("longitude") is not None:
+                lat.append(p["latitude"])
+                lng.append(p["longitude"])
+    if not lat:
+        return None
+    d_lat = radius / METERS_PER_DEG
+    d_lng = radius / (METERS_PER_DEG * abs(math.cos(math.radians(c_lat))) or 1.0)
+    x = (np.asarray(lng, dtype=np.float64) - c_lng) / d_lng
+    y = (np.asarray(lat, dtype=np.float64) - c_lat) / d_lat
+    return x, y
+
+
+def accumulate(grid, rows, bins=BINS, extent=EXTENT):
+    """Add one chunk of Scores rows to grid. Returns (games, points) added."""
+    xs, ys = [], []
+    for row in rows:
+        pts = unit_points(row.get("drawing"), row.get("templateCenter"), row.get("templateRadiusMeters"))
+        if pts is not None:
+            xs.append(pts[0])
+            ys.append(pts[1])
+    if not xs:
+        return 0, 0
+    x = np.concatenate(xs)
+    y = np.concatenate(ys)
+    # Rows follow y ascending (south first); to_json flips them north-up
+    counts, _, _ = np.histogram2d(y, x, bins=bins, range=[[-extent, extent], [-extent, extent]])
+    grid += counts.astype(np.uint32)
+    return len(xs), int(counts.sum())
+
+
+def decode_grid(entity):
+    raw = entity.get("grid")
+    bins = int(entity.get("bins") or BINS)
+    if raw is None:
+        return empty_grid(bins)
+    data = zlib.decompress(bytes(raw.value if hasattr(raw, "value") else raw))
+    return np.frombuffer(data, dtype=np.uint32).reshape(bins, bins).copy()
+
+
+def load(conn, template_id):
+    try:
+        return storage.table(TABLE, conn, create=True).get_entity(partition_key=PARTITION, row_key=template_id)
+    except Exception:
+        return None
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z"
+
+
+def update(conn, template_id, rebuild=False, max_rows=None, chunk_rows=CHUNK_ROWS):
+    """Fold Scores rows completed since the cached raster into it and save. Returns the cache entity.
+
+    An update pass covers games completed in (watermark, passUntil]; rows stream in RowKey
+    order, so a pass cut short by max_rows stores cursorRowKey and the next call resumes
+    it. When a pass finishes, the watermark moves to passUntil.
+    """
+    cached = None if rebuild else load(conn, template_id)
+    grid = decode_grid(cached) if cached else empty_grid()
+    games = int(cached.get("games") or 0) if cached else 0
+    points = int(cached.get("points") or 0) if cached else 0
+    watermark = (cached.get("watermark") if cached else None) or ""
+    cursor = (cached.get("cursorRowKey") if cached else None) or ""
+    pass_until = (cached.get("passUntil") if cached and cursor else None) or _now_iso()
+
+    filt = "PartitionKey eq 'score' and templateId eq @tid and hasDrawing eq true and timeCompleted le @until"
+    params = {"tid": template_id, "until": pass_until}
+    if watermark:
+        filt += " and timeCompleted gt @since"
+        params["since"] = watermark
+    if cursor:
+        filt += " and RowKey gt @cursor"
+        params["cursor"] = cursor
+    rows = storage.table("Scores", conn).query_entities(filt, parameters=params, select=FIELDS, results_per_page=chunk_rows)
+
+    scanned = 0
+    complete = True
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            g, p = accumulate(grid, chunk)
+            games, points, scanned = games + g, points + p, scanned + len(chunk)
+            cursor = chunk[-1]["RowKey"]
+            chunk = []
+            if max_rows and scanned >= max_rows:
+                complete = False
+                break
+    if chunk:
+        g, p = accumulate(grid, chunk)
+        games, points, scanned = games + g, points + p, scanned + len(chunk)
+    if complete:
+        watermark, cursor = pass_until, ""
+
+    entity = {
+        "PartitionKey": PARTITION,
+        "RowKey": template_id,
+        "bins": grid.shape[0],
+        "extent": EXTENT,
+        "games": games,
+        "points": points,
+        "watermark": watermark,
+        "passUntil": pass_until,
+        "cursorRowKey": cursor,
+        "complete": complete,
+        "updatedAt": _now_iso(),
+        "grid": zlib.compress(grid.tobytes(), 6),
+    }
+    storage.table(TABLE, conn, create=True).upsert_entity(entity)
+    return entity
+
+
+def to_json(entity, normalize=True):
+    """Cache entity -> response dict; grid rows run north (top) to south."""
+    grid = decode_grid(entity)
+    peak = int(grid.max()) if grid.size else 0
+    rows = grid[::-1]
+    if normalize:
+        values = np.round(rows / peak, 4).tolist() if peak else rows.astype(float).tolist()
+    else:
+        values = rows.tolist()
+    return {
+        "bins": int(entity.get("bins") or BINS),
+        "extent": float(entity.get("extent") or EXTENT),
+        "games": int(entity.get("games") or 0),
+        "points": int(entity.get("points") or 0),
+        "max": peak,
+        "normalized": bool(normalize),
+        "updatedAt": entity.get("updatedAt"),
+        "complete": bool(entity.get("complete", True)),
+        "grid": values,
+    }
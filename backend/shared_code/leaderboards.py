@@ -0,0 +1,193 @@
+"""Time-windowed leaderboards: top K games per day/week/month bucket (Leaderboards table).
+
+- PartitionKey: "<window>:<bucket>:<templateId or *>", e.g. "week:2026-W42:star";
+  "*" ranks all templates together
+- RowKey: "<9999999999 - finalScore, 10 digits>_<gameId>" (best score first)
+- gameId, timeCompleted, timePlayedSec, templateId, templateName, finalScore,
+  totalAccuracy, shape metrics, players (JSON), hasDrawing
+
+Buckets are UTC: day "2026-10-19", ISO week "2026-W42", month "2026-10". StartGame calls
+record() for every scored game; each of the six partitions it lands in (3 windows x
+template/all) is trimmed back to LEADERBOARD_TOP_K (default 100) rows, and a game that
+is recorded again (second endGame, re-scoring) replaces its previous row. Reading a
+leaderboard is one partition query of at most K rows, whatever the size of Scores.
+
+Every bucket partition is also listed in the registry partition ("buckets", RK =
+partition key) with expiresAt = bucket end + RETAIN_DAYS[window]; Janitor calls
+expire() to delete expired partitions. rebuild() refills buckets from Scores after a
+backfill or re-scoring run.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from shared_code import storage
+
+TABLE = "Leaderboards"
+REGISTRY = "buckets"
+WINDOWS = ("day", "week", "month")
+ALL_TEMPLATES = "*"
+RETAIN_DAYS = {"day": 7, "week": 35, "month": 400}
+BATCH_SIZE = 100
+_MAX_SCORE = 10 ** 10 - 1
+FIELDS = [
+    "gameId", "timeCompleted", "timePlayedSec", "templateId", "templateName", "finalScore",
+    "totalAccuracy", "hausdorffMeters", "frechetMeters", "turningDistance", "players", "hasDrawing",
+]
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except Exception:
+        return int(default)
+
+TOP_K = _env_int("LEADERBOARD_TOP_K", 100)
+
+
+def parse_time(ts):
+    try:
+        return datetime.fromisoformat(str(ts).rstrip("Z")) if ts else None
+    except Exception:
+        return None
+
+
+def bucket_for(window, when):
+    """Bucket id of a UTC datetime."""
+    if window == "day":
+        return when.strftime("%Y-%m-%d")
+    if window == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if window == "month":
+        return when.strftime("%Y-%m")
+    raise ValueError(f"window must be one of {WINDOWS}")
+
+
+def bucket_end(window, bucket):
+    """First instant after the bucket."""
+    if window == "day":
+        return datetime.strptime(bucket, "%Y-%m-%d") + timedelta(days=1)
+    if window == "week":
+        return datetime.strptime(bucket + "-1", "%G-W%V-%u") + timedelta(days=7)
+    start = datetime.strptime(bucket, "%Y-%m")
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_key(window, bucket, template_id=None):
+    return f"{window}:{bucket}:{template_id or ALL_TEMPLATES}"
+
+
+def row_key(score, game_id):
+    return f"{_MAX_SCORE - max(0, min(int(score), _MAX_SCORE)):010d}_{game_id}"
+
+
+def _table(conn):
+    return storage.table(TABLE, conn, create=True)
+
+
+def _entry(score_row):
+    entry = {k: score_row.get(k) for k in FIELDS if score_row.get(k) is not None}
+    entry["gameId"] = str(score_row.get("gameId") or score_row.get("RowKey"))
+    entry["hasDrawing"] = bool(score_row.get("drawing") or score_row.get("hasDrawing"))
+    return entry
+
+
+def _insert(table, pk, rk, entry, k):
+    """Put one row into a bucket partition and trim it to the top k. Returns (was_empty, kept)."""
+    rows = list(table.query_entities("PartitionKey eq @pk", parameters={"pk": pk}, select=["RowKey", "gameId"]))
+    stale = [r["RowKey"] for r in rows if r.get("gameId") == entry["gameId"] and r["RowKey"] != rk]
+    ranked = sorted({r["RowKey"] for r in rows if r["RowKey"] not in stale} | {rk})
+    overflow = ranked[k:]
+    if rk not in overflow:
+        table.upsert_entity({"PartitionKey": pk, "RowKey": rk, **entry}, mode="replace")
+    doomed = [key for key in stale + overflow if key != rk]
+    for i in range(0, len(doomed), BATCH_SIZE):
+        table.submit_transaction([("delete", {"PartitionKey": pk, "RowKey": key}) for key in doomed[i:i + BATCH_SIZE]])
+    return not rows, rk not in overflow
+
+
+def _register(table, pk, window, bucket):
+    expires = bucket_end(window, bucket) + timedelta(days=RETAIN_DAYS[window])
+    table.upsert_entity({"PartitionKey": REGISTRY, "RowKey": pk, "expiresAt": expires.isoformat() + "Z"})
+
+
+def record(conn, score_row, k=None):
+    """Add a scored game to its day/week/month buckets (per template and all templates)."""
+    if score_row.get("finalScore") is None:
+        return 0
+    when = parse_time(score_row.get("timeCompleted"))
+    if when is None:
+        return 0
+    k = k or TOP_K
+    entry = _entry(score_row)
+    rk = row_key(score_row["finalScore"], entry["gameId"])
+    table = _table(conn)
+    kept = 0
+    for window in WINDOWS:
+        bucket = bucket_for(window, when)
+        for scope in (score_row.get("templateId"), ALL_TEMPLATES):
+            if not scope:
+                continue
+            pk = partition_key(window, bucket, scope)
+            try:
+                was_empty, in_top = _insert(table, pk, rk, entry, k)
+                if was_empty:
+                    _register(table, pk, window, bucket)
+                kept += 1 if in_top else 0
+            except Exception:
+                logging.exception("Leaderboard update failed for %s", pk)
+    return kept
+
+
+def top(conn, window, template_id=None, bucket=None, now=None):
+    """Ranked rows of one bucket (current bucket by default), best first."""
+    bucket = bucket or bucket_for(window, now or datetime.utcnow())
+    try:
+        rows = list(_table(conn).query_entities(
+            "PartitionKey eq @pk", parameters={"pk": partition_key(window, bucket, template_id)}
+        ))
+    except Exception:
+        rows = []
+    rows.sort(key=lambda r: r["RowKey"])
+    return bucket, rows[:TOP_K]
+
+
+def expire(conn, now=None):
+    """Delete every bucket partition past its expiresAt. Returns (partitions, rows) deleted."""
+    now = now or datetime.utcnow()
+    table = _table(conn)
+    expired = list(table.query_entities(
+        "PartitionKey eq @pk and expiresAt lt @now",
+        parameters={"pk": REGISTRY, "now": now.isoformat() + "Z"},
+        select=["RowKey"],
+    ))
+    rows_deleted = 0
+    for reg in expired:
+        pk = reg["RowKey"]
+        keys = [r["RowKey"] for r in table.query_entities("PartitionKey eq @pk", parameters={"pk": pk}, select=["RowKey"])]
+        for i in range(0, len(keys), BATCH_SIZE):
+            table.submit_transaction([("delete", {"PartitionKey": pk, "RowKey": key}) for key in keys[i:i + BATCH_SIZE]])
+        rows_deleted += len(keys)
+        table.delete_entity(partition_key=REGISTRY, row_key=pk)
+    return len(expired), rows_deleted
+
+
+def rebuild(conn, since, k=None, progress=None):
+    """Re-record every scored game completed at or after `since` (ISO 8601). Returns games recorded."""
+    rows = storage.table("Scores", conn).query_entities(
+        "PartitionKey eq 'score' and timeCompleted ge @since",
+        parameters={"since": since},
+        select=["RowKey"] + FIELDS,
+        results_per_page=1000,
+    )
+    count = 0
+    for row in rows:
+        if row.get("finalScore") is None:
+            continue
+        record(conn, row, k)
+        count += 1
+        if progress and count % 500 == 0:
+            progress(count)
+    return count
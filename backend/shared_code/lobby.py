@@ -0,0 +1,71 @@
+"""OpenSessions index: one small row per open, not-started lobby.
+
+- PartitionKey: "open"
+- RowKey: lobbyKey = <inverted creation ms, 13 digits>_<sessionId> (newest first)
+- sessionId, creator, userCount, createdAt
+
+Maintained by CreateSession, JoinSession (join/leave/delete) and StartGame (start
+removes the row, end re-adds it) so ListSessions reads only the page it returns.
+Index writes are best-effort: a failure is logged and never fails the caller. Sessions
+placed in the SessionGeo index get the same open/userCount updates there.
+"""
+
+import logging
+import time
+from datetime import datetime
+
+from shared_code import geo_index, storage
+
+TABLE = "OpenSessions"
+PARTITION = "open"
+_MAX_MS = 10 ** 13 - 1
+
+
+def make_lobby_key(session_id, created_ms=None):
+    created_ms = int(created_ms if created_ms is not None else time.time() * 1000)
+    return f"{_MAX_MS - created_ms:013d}_{session_id}"
+
+
+def lobby_key_for(session):
+    """Stored lobbyKey, or a deterministic key (sorted last) for sessions created before the index."""
+    return session.get("lobbyKey") or f"{_MAX_MS:013d}_{session['RowKey']}"
+
+
+def open_lobby(connection_string, session, user_count):
+    """Upsert the index row for a session that is (again) joinable."""
+    try:
+        storage.table(TABLE, connection_string, create=True).upsert_entity({
+            "PartitionKey": PARTITION,
+            "RowKey": lobby_key_for(session),
+            "sessionId": session["RowKey"],
+            "creator": session.get("creator", ""),
+            "userCount": int(user_count),
+            "createdAt": session.get("createdAt") or datetime.utcnow().isoformat() + "Z",
+        })
+    except Exception:
+        logging.exception("OpenSessions upsert failed")
+    geo_index.sync(connection_string, session, open=True, userCount=int(user_count))
+
+
+def update_count(connection_string, session, user_count):
+    try:
+        storage.table(TABLE, connection_string).update_entity({
+            "PartitionKey": PARTITION,
+            "RowKey": lobby_key_for(session),
+            "userCount": int(user_count),
+        }, mode="merge")
+    except Exception:
+        # Row missing (e.g. legacy session): recreate it
+        open_lobby(connection_string, session, user_count)
+        return
+    geo_index.sync(connection_string, session, userCount=int(user_count))
+
+
+def close_lobby(connection_string, session):
+    try:
+        storage.table(TABLE, connection_string).delete_entity(
+            partition_key=PARTITION, row_key=lobby_key_for(session)
+        )
+    except Exception:
+        logging.exception("OpenSessions delete failed")
+    geo_index.sync(connection_string, session, open=False)
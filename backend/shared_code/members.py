@@ -0,0 +1,114 @@
+"""Session membership and ready state, one row per member (SessionMembers table).
+
+- PartitionKey: sessionId
+- RowKey: username
+- ready: bool, joinedAt: ISO 8601 string
+
+Joining, leaving and ready toggles each touch only the caller's own row, so concurrent
+players never overwrite each other (the old users/readyStatus JSON on the Sessions
+entity was read-modify-merged without an ETag and lost updates under contention).
+The member list is one partition query, ordered by join time.
+
+Sessions created before this table keep their members in the users/readyStatus JSON;
+load() falls back to it while the partition is empty and migrate() copies it over on
+the first membership write.
+"""
+
+import logging
+from datetime import datetime
+
+from shared_code import codec, storage
+
+TABLE = "SessionMembers"
+BATCH_SIZE = 100
+
+
+def _table(conn):
+    return storage.table(TABLE, conn, create=True)
+
+
+def _rows(conn, session_id):
+    return list(_table(conn).query_entities(
+        "PartitionKey eq @sid", parameters={"sid": session_id}, select=["RowKey", "ready", "joinedAt"]
+    ))
+
+
+def load(conn, session):
+    """(users ordered by join time, {username: ready}) for a Sessions entity."""
+    rows = _rows(conn, session["RowKey"])
+    if not rows:
+        users = codec.loads_or(session.get("users"), []) or []
+        ready = codec.loads_or(session.get("readyStatus"), {}) or {}
+        return list(users), {u: bool(ready.get(u, False)) for u in users}
+    rows.sort(key=lambda r: (r.get("joinedAt") or "", r["RowKey"]))
+    return [r["RowKey"] for r in rows], {r["RowKey"]: bool(r.get("ready")) for r in rows}
+
+
+def migrate(conn, session):
+    """Copy legacy users/readyStatus JSON into member rows, then blank the JSON properties."""
+    users = codec.loads_or(session.get("users"), None)
+    if not users:
+        return
+    if _rows(conn, session["RowKey"]):
+        users = []  # already migrated by a concurrent request
+    ready = codec.loads_or(session.get("readyStatus"), {}) or {}
+    base = session.get("createdAt") or datetime.utcnow().isoformat() + "Z"
+    ops = [("upsert", {
+        "PartitionKey": session["RowKey"],
+        "RowKey": u,
+        "ready": bool(ready.get(u, False)),
+        "joinedAt": f"{base}#{i:04d}",  # keep the legacy order
+    }) for i, u in enumerate(users)]
+    for i in range(0, len(ops), BATCH_SIZE):
+        _table(conn).submit_transaction(ops[i:i + BATCH_SIZE])
+    storage.table("Sessions", conn).update_entity(
+        {"PartitionKey": session["PartitionKey"], "RowKey": session["RowKey"], "users": "", "readyStatus": ""}, mode="merge"
+    )
+    session["users"] = session["readyStatus"] = ""
+
+
+def join(conn, session_id, username, ready=False):
+    """Insert the member row. Returns True if the user was not a member yet."""
+    from azure.core.exceptions import ResourceExistsError
+    try:
+        _table(conn).create_entity({
+            "PartitionKey": session_id,
+            "RowKey": username,
+            "ready": bool(ready),
+            "joinedAt": datetime.utcnow().isoformat() + "Z",
+        })
+        return True
+    except ResourceExistsError:
+        return False
+
+
+def set_ready(conn, session_id, username, ready):
+    _table(conn).upsert_entity({"PartitionKey": session_id, "RowKey": username, "ready": bool(ready)}, mode="merge")
+
+
+def active_since(conn, session_id, cutoff):
+    """True if any member row was written (join or ready toggle) at or after cutoff (a datetime)."""
+    rows = _table(conn).query_entities(
+        "PartitionKey eq @sid and Timestamp ge @cutoff",
+        parameters={"sid": session_id, "cutoff": cutoff},
+        select=["RowKey"],
+        results_per_page=1,
+    )
+    return next(iter(rows), None) is not None
+
+
+def leave(conn, session_id, username):
+    _table(conn).delete_entity(partition_key=session_id, row_key=username)
+
+
+def remove_all(conn, session_id):
+    """Delete every member row of a session (session deleted)."""
+    try:
+        rows = list(_table(conn).query_entities(
+            "PartitionKey eq @sid", parameters={"sid": session_id}, select=["PartitionKey", "RowKey"]
+        ))
+        ops = [("delete", {"PartitionKey": r["PartitionKey"], "RowKey": r["RowKey"]}) for r in rows]
+        for i in range(0, len(ops), BATCH_SIZE):
+            _table(conn).submit_transaction(ops[i:i + BATCH_SIZE])
+    except Exception:
+        logging.exception("SessionMembers cleanup failed for %s", session_id)
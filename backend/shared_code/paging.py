@@ -0,0 +1,32 @@
+"""Opaque continuation tokens for Table Storage paging.
+
+The SDK's continuation token is a small dict (next PartitionKey/RowKey); clients get it
+as URL-safe base64 JSON and pass it back unchanged.
+"""
+
+import base64
+
+from shared_code import codec
+
+
+def encode_token(token):
+    if not token:
+        return None
+    return base64.urlsafe_b64encode(codec.dumps(token).encode()).decode()
+
+
+def decode_token(raw):
+    """Raises ValueError on a malformed token."""
+    if not raw:
+        return None
+    try:
+        return codec.loads(base64.urlsafe_b64decode(raw.encode()).decode())
+    except Exception as e:
+        raise ValueError(f"Invalid continuation token: {e}")
+
+
+def first_page(pager, continuation_token=None):
+    """Fetch one page from an ItemPaged query. Returns (entities, next_token_encoded)."""
+    pages = pager.by_page(continuation_token=continuation_token)
+    items = list(next(pages, []))
+    return items, encode_token(pages.continuation_token)
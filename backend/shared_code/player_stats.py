@@ -0,0 +1,219 @@
+"""Career statistics per player, maintained incrementally (PlayerStats table).
+
+One row per username (PK "player"): running counts, sums and min/max, so a profile is a
+single point read instead of a scan of Scores and Distances. A game is counted once its
+Scores row has a finalScore (StartGame endGame with results). recentGames keeps the
+last RECENT_GAMES games with the delta each one added and the row's min/max fields
+before it, so a repeated endGame call (the painter's results after the admin's) replaces
+that game's contribution instead of being counted twice or skipped.
+
+apply() folds one game into a row with an optimistic-concurrency loop: read the row and
+its ETag, merge, then replace with If-Match (or create if absent) and retry on conflict,
+so concurrent games of the same player never lose an update.
+"""
+
+import logging
+
+from shared_code import archive, codec, storage
+
+TABLE = "PlayerStats"
+PARTITION = "player"
+RECENT_GAMES = 20
+MAX_RETRIES = 8
+
+SUM_FIELDS = ("games", "painterGames", "brushGames", "scoreSum", "accuracySum", "accuracyCount", "totalDistance", "playSeconds")
+MAX_FIELDS = ("bestScore", "bestAccuracy", "longestDistance", "lastGameAt")
+MIN_FIELDS = ("worstScore", "worstAccuracy", "firstGameAt")
+
+
+def distances_for(conn, game_id):
+    """{username: meters walked} from the game's GameArchives row."""
+    try:
+        row = storage.table(archive.TABLE, conn).get_entity(archive.PARTITION, str(game_id), select=["users"])
+    except Exception:
+        return {}
+    return {u: float(info.get("totalDistance") or 0.0) for u, info in (codec.loads_or(row.get("users"), {}) or {}).items()}
+
+
+def contributions(score_row, distances=None):
+    """Scores row -> {username: per-game delta} for every player of the game."""
+    if score_row.get("finalScore") is None:
+        return {}
+    score = score_row["finalScore"]
+    when = score_row.get("timeCompleted")
+    out = {}
+    for p in codec.loads_or(score_row.get("players"), None) or []:
+        user = p.get("username") if isinstance(p, dict) else None
+        if not user:
+            continue
+        role = p.get("role")
+        acc = p.get("accuracy") if role == "Brush" else None
+        dist = float((distances or {}).get(user) or 0.0)
+        d = {
+            "games": 1,
+            "painterGames": 1 if role == "Painter" else 0,
+            "brushGames": 1 if role == "Brush" else 0,
+            "scoreSum": float(score),
+            "accuracySum": float(acc) if acc is not None else 0.0,
+            "accuracyCount": 1 if acc is not None else 0,
+            "totalDistance": dist,
+            "playSeconds": float(score_row.get("timePlayedSec") or 0),
+            "bestScore": score,
+            "worstScore": score,
+            "longestDistance": dist,
+            "lastGameAt": when,
+            "firstGameAt": when,
+        }
+        if acc is not None:
+            d["bestAccuracy"] = d["worstAccuracy"] = float(acc)
+        out[user] = d
+    return out
+
+
+def _recent(row):
+    """recentGames entries [[gameId, delta, extremes before the game], ...], oldest first."""
+    recent = codec.loads_or(row.get("recentGames"), None)
+    if recent is None:
+        # rows written before deltas were kept: ids only, which cannot be corrected
+        recent = [[gid, None, None] for gid in codec.loads_or(row.get("recentGameIds"), None) or []]
+    return recent
+
+
+def _extremes(row):
+    return {k: row.get(k) for k in MAX_FIELDS + MIN_FIELDS}
+
+
+def _fold_extremes(row, delta):
+    for k in MAX_FIELDS:
+        if delta.get(k) is not None and (row.get(k) is None or delta[k] > row[k]):
+            row[k] = delta[k]
+    for k in MIN_FIELDS:
+        if delta.get(k) is not None and (row.get(k) is None or delta[k] < row[k]):
+            row[k] = delta[k]
+
+
+def fold(row, delta, game_id, replace_only=False):
+    """Merge one game's delta into a stats row (dict). Returns the new row, or None if unchanged.
+
+    A game already in recentGames is re-recorded: its old delta is subtracted, the new
+    one added, and the min/max fields are refolded from the extremes stored before it.
+    With replace_only, a game that is not in recentGames is left alone (None).
+    """
+    recent = _recent(row)
+    new = dict(row)
+    new.pop("recentGameIds", None)
+    pos = next((i for i, entry in enumerate(recent) if entry[0] == game_id), None)
+    if pos is None:
+        if replace_only:
+            return None
+        for k in SUM_FIELDS:
+            new[k] = (new.get(k) or 0) + delta.get(k, 0)
+        recent.append([game_id, delta, _extremes(new)])
+        _fold_extremes(new, delta)
+    else:
+        old = recent[pos][1]
+        if old is None or old == delta:
+            return None
+        for k in SUM_FIELDS:
+            new[k] = (new.get(k) or 0) - old.get(k, 0) + delta.get(k, 0)
+        recent[pos][1] = delta
+        new.update(recent[pos][2])
+        for entry in recent[pos:]:
+            entry[2] = _extremes(new)
+            _fold_extremes(new, entry[1] or {})
+    new["recentGames"] = codec.dumps(recent[-RECENT_GAMES:])
+    return new
+
+
+def apply(conn, username, delta, game_id, replace_only=False):
+    """Fold delta into username's row with ETag-guarded replace/create. Returns True if written."""
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+    table = storage.table(TABLE, conn, create=True)
+    for _ in range(MAX_RETRIES):
+        try:
+            current = table.get_entity(PARTITION, username)
+        except ResourceNotFoundError:
+            current = None
+        base = dict(current) if current is not None else {"PartitionKey": PARTITION, "RowKey": username}
+        new = fold(base, delta, game_id, replace_only)
+        if new is None:
+            return False
+        try:
+            if current is None:
+                table.create_entity(new)
+            else:
+                table.update_entity(new, mode="replace", etag=current.metadata["etag"], match_condition=MatchConditions.IfNotModified)
+            return True
+        except (ResourceExistsError, ResourceModifiedError):
+            continue  # someone else wrote first: re-read and re-merge
+    logging.warning("PlayerStats update for %s gave up after %d conflicts", username, MAX_RETRIES)
+    return False
+
+
+def record_game(conn, score_row, replace_only=False):
+    """Count a finished game for all of its players. Returns (rows updated, players).
+
+    replace_only (re-scoring) only corrects players whose recentGames still hold the
+    game; older games cannot be corrected in place (tools/backfill_player_stats can).
+    """
+    game_id = score_row.get("RowKey") or score_row.get("gameId")
+    deltas = contributions(score_row, distances_for(conn, game_id))
+    updated = sum(1 for user, delta in deltas.items() if apply(conn, user, delta, game_id, replace_only))
+    return updated, len(deltas)
+
+
+def profile(row):
+    """PlayerStats row -> response dict with derived averages."""
+    games = int(row.get("games") or 0)
+    acc_n = int(row.get("accuracyCount") or 0)
+    return {
+        "username": row.get("RowKey"),
+        "games": games,
+        "painterGames": int(row.get("painterGames") or 0),
+        "brushGames": int(row.get("brushGames") or 0),
+        "averageScore": round(float(row.get("scoreSum") or 0) / games, 1) if games else None,
+        "bestScore": row.get("bestScore"),
+        "worstScore": row.get("worstScore"),
+        "averageAccuracy": round(float(row.get("accuracySum") or 0) / acc_n, 1) if acc_n else None,
+        "bestAccuracy": row.get("bestAccuracy"),
+        "worstAccuracy": row.get("worstAccuracy"),
+        "totalDistanceMeters": round(float(row.get("totalDistance") or 0), 1),
+        "longestDistanceMeters": row.get("longestDistance"),
+        "totalPlaySeconds": row.get("playSeconds"),
+        "firstGameAt": row.get("firstGameAt"),
+        "lastGameAt": row.get("lastGameAt"),
+    }
+
+
+def backfill(conn, with_distance=True, page_size=1000, progress=None):
+    """Rebuild every PlayerStats row from Scores in one streaming pass. Returns (games, players).
+
+    Only the per-player accumulators are held in memory; rows are replaced in batches.
+    """
+    scores = storage.table("Scores", conn).query_entities(
+        "PartitionKey eq 'score'",
+        select=["RowKey", "timeCompleted", "timePlayedSec", "finalScore", "players"],
+        results_per_page=page_size,
+    )
+    stats = {}
+    games = 0
+    for row in scores:
+        deltas = contributions(row)
+        if not deltas:
+            continue
+        distances = distances_for(conn, row["RowKey"]) if with_distance else {}
+        for user, delta in deltas.items():
+            delta["totalDistance"] = delta["longestDistance"] = float(distances.get(user) or 0.0)
+            base = stats.get(user) or {"PartitionKey": PARTITION, "RowKey": user}
+            stats[user] = fold(base, delta, row["RowKey"]) or base
+        games += 1
+        if progress and games % 500 == 0:
+            progress(games, len(stats))
+
+    table = storage.table(TABLE, conn, create=True)
+    rows = list(stats.values())
+    for i in range(0, len(rows), 100):
+        table.submit_transaction([("upsert", r, {"mode": "replace"}) for r in rows[i:i + 100]])
+    return games, len(rows)
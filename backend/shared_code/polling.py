@@ -0,0 +1,114 @@
+"""Server-suggested poll intervals for the read endpoints clients poll in a loop.
+
+getLocations, GetGameState and JoinSession (GET) return X-Poll-After-Ms: how long the
+client should wait before its next poll. The suggestion starts at the endpoint's
+minimum and doubles for every POLL_IDLE_DOUBLING_SEC (default 5) that the polled state
+has not changed, up to the endpoint's maximum, so a lobby waiting for a player or a
+standing brush is polled slowly and any change snaps back to the fast rate. "Changed" is
+judged per worker from a fingerprint the caller supplies (body hash, version/asOf).
+
+Phase: urgent=True (e.g. the lobby's game just started) always gets the minimum.
+Load: once more than LOAD_THRESHOLD of the worker's request capacity is busy
+(ratelimit.load()), the interval is stretched linearly up to LOAD_STRETCH times at full
+load (capped at twice the maximum).
+
+Per-endpoint bounds are POLL_<ENDPOINT>="<min_ms>/<max_ms>" (e.g. POLL_GETLOCATIONS=
+"300/3000"); "off" omits the hint. Defaults are in DEFAULT_BOUNDS.
+"""
+
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from shared_code import ratelimit
+
+HEADER = "X-Poll-After-Ms"
+DEFAULT_BOUNDS = {
+    "getLocations": (300, 3000),
+    "GetGameState": (300, 3000),
+    "JoinSession": (1000, 8000),
+}
+MAX_TRACKED = 5000
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+IDLE_DOUBLING_SEC = _env_float("POLL_IDLE_DOUBLING_SEC", 5)
+LOAD_THRESHOLD = _env_float("POLL_LOAD_THRESHOLD", 0.5)
+LOAD_STRETCH = _env_float("POLL_LOAD_STRETCH", 3)
+
+_lock = threading.Lock()
+_bounds = {}
+_seen = OrderedDict()  # (endpoint, key) -> (fingerprint, monotonic time it last changed)
+
+
+def bounds_for(endpoint):
+    """(min_ms, max_ms) for endpoint, or None when hints are disabled."""
+    if endpoint in _bounds:
+        return _bounds[endpoint]
+    raw = os.environ.get(f"POLL_{endpoint.upper()}")
+    bounds = DEFAULT_BOUNDS.get(endpoint)
+    if raw:
+        if raw.strip().lower() == "off":
+            bounds = None
+        else:
+            try:
+                lo, _, hi = raw.partition("/")
+                lo = float(lo)
+                bounds = (lo, max(lo, float(hi) if hi else lo * 10))
+            except Exception:
+                pass
+    _bounds[endpoint] = bounds
+    return bounds
+
+
+def fingerprint(body):
+    data = body.encode() if isinstance(body, str) else (body or b"")
+    return zlib.crc32(data)
+
+
+def idle_seconds(endpoint, key, fp, now=None):
+    """Seconds since fp last changed for (endpoint, key) on this worker (0 on first sight)."""
+    now = time.monotonic() if now is None else now
+    k = (endpoint, key)
+    with _lock:
+        prev = _seen.get(k)
+        if prev is None or prev[0] != fp:
+            _seen[k] = (fp, now)
+            _seen.move_to_end(k)
+            if len(_seen) > MAX_TRACKED:
+                _seen.popitem(last=False)
+            return 0.0
+        _seen.move_to_end(k)
+        return now - prev[1]
+
+
+def suggest(endpoint, idle_sec, load=None, urgent=False):
+    """Recommended delay (ms) before the next poll, or None when hints are disabled."""
+    bounds = bounds_for(endpoint)
+    if not bounds:
+        return None
+    lo, hi = bounds
+    if urgent:
+        return int(lo)
+    steps = idle_sec / IDLE_DOUBLING_SEC if IDLE_DOUBLING_SEC > 0 else 0
+    ms = min(hi, lo * 2 ** min(steps, 16))
+    load = ratelimit.load() if load is None else load
+    if load > LOAD_THRESHOLD and LOAD_THRESHOLD < 1:
+        ms *= 1 + (LOAD_STRETCH - 1) * (load - LOAD_THRESHOLD) / (1 - LOAD_THRESHOLD)
+        ms = min(ms, hi * 2)
+    return int(ms)
+
+
+def hint(endpoint, key, fp, headers, urgent=False):
+    """headers plus X-Poll-After-Ms for this poll; returns (headers, ms or None)."""
+    ms = suggest(endpoint, idle_seconds(endpoint, key, fp), urgent=urgent)
+    if ms is None:
+        return headers, None
+    return {**headers, HEADER: str(ms)}, ms
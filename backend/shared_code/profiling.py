@@ -0,0 +1,244 @@
+"""Opt-in per-request profiling (cProfile + tracemalloc) for the HTTP handlers.
+
+A request is profiled when either
+- it carries `x-profile: 1` together with a valid x-admin-key (admin.is_admin), or
+- it is sampled: PROFILE_SAMPLE_RATE (default 0, i.e. off) is the probability per
+  request, limited to the handlers listed in PROFILE_ENDPOINTS (comma separated;
+  empty means all).
+
+The handler then runs under cProfile with tracemalloc tracing. The capture keeps the
+PROFILE_TOP_N (default 25) functions by cumulative time and the top allocation sites
+(by bytes still allocated when the handler returned), plus wall time and peak traced
+memory. It is stored under a profile id (newest first) that is returned in the
+X-Profile-Id response header. PROFILE_SINK selects where captures go: "table" (default,
+Profiles table) or "local" (the last PROFILE_LOCAL_MAX captures in this worker's
+memory). GetProfiles lists and fetches them.
+
+Only one request per worker is profiled at a time; others that would be profiled run
+normally. Unprofiled requests pay for one header lookup and one random draw.
+
+cProfile sees only the profiled request's thread, but tracemalloc traces the whole
+process. Allocation sites are therefore kept only when their traceback (TRACE_FRAMES
+deep) passes through the handler's module, which drops requests of other endpoints
+running at the same time. Concurrent requests of the same handler on other threads
+still count, and peakKb is process-wide. Each capture says so in allocationScope:
+"handler" when the filter applied, "process" when tracemalloc was already running
+with too shallow tracebacks to filter.
+"""
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+TABLE = "Profiles"
+PARTITION = "profile"
+HEADER = "x-profile"
+ID_HEADER = "X-Profile-Id"
+EXCLUDED = ("GetProfiles",)
+_MAX_MS = 10 ** 13 - 1
+TRACE_FRAMES = 32
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0)
+ENDPOINTS = {e.strip() for e in os.environ.get("PROFILE_ENDPOINTS", "").split(",") if e.strip()}
+TOP_N = int(_env_float("PROFILE_TOP_N", 25))
+SINK = (os.environ.get("PROFILE_SINK") or "table").strip().lower()
+LOCAL_MAX = int(_env_float("PROFILE_LOCAL_MAX", 20))
+
+_busy = threading.Lock()
+_local = deque(maxlen=max(1, LOCAL_MAX))
+
+
+def trigger_for(name, req):
+    """"header", "sample" or None."""
+    if name in EXCLUDED:
+        return None
+    headers = getattr(req, "headers", None)
+    if headers is None:
+        return None  # timer invocations
+    if headers.get(HEADER) in ("1", "true"):
+        from shared_code import admin
+        return "header" if admin.is_admin(req) else None
+    if SAMPLE_RATE > 0 and (not ENDPOINTS or name in ENDPOINTS) and random.random() < SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def run(name, main, req):
+    """Call main(req), profiling it when trigger_for() says so."""
+    trigger = trigger_for(name, req)
+    if trigger is None or not _busy.acquire(blocking=False):
+        return main(req)
+    try:
+        return _profiled(name, main, req, trigger)
+    finally:
+        _busy.release()
+
+
+def _where(filename, lineno, func=None):
+    short = filename
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        if marker in filename:
+            short = filename.split(marker, 1)[1]
+            break
+    return f"{short}:{lineno}" + (f"({func})" if func else "")
+
+
+def _top_functions(profiler):
+    import pstats
+    stats = pstats.Stats(profiler).stats  # (file, line, func) -> (cc, nc, tt, ct, callers)
+    rows = sorted(stats.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_N]
+    return [{
+        "function": _where(*key),
+        "calls": nc,
+        "primitiveCalls": cc,
+        "totalMs": round(tt * 1000, 3),
+        "cumulativeMs": round(ct * 1000, 3),
+    } for key, (cc, nc, tt, ct, _) in rows]
+
+
+def _top_allocations(snapshot, handler_file=None):
+    """Top allocation sites; limited to tracebacks through handler_file when given."""
+    import tracemalloc
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, __file__),
+    ]
+    if handler_file:
+        filters.append(tracemalloc.Filter(True, handler_file, all_frames=True))
+    snapshot = snapshot.filter_traces(filters)
+    return [{
+        "site": _where(s.traceback[0].filename, s.traceback[0].lineno),
+        "sizeKb": round(s.size / 1024, 2),
+        "count": s.count,
+    } for s in snapshot.statistics("lineno")[:TOP_N]]
+
+
+def _profiled(name, main, req, trigger):
+    import cProfile
+    import tracemalloc
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACE_FRAMES)
+    handler_file = getattr(sys.modules.get(getattr(main, "__module__", None)), "__file__", None)
+    if tracemalloc.get_traceback_limit() < 2:
+        handler_file = None  # tracing started elsewhere with one frame: cannot attribute
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    status = None
+    t0 = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            resp = main(req)
+        finally:
+            profiler.disable()
+        status = getattr(resp, "status_code", None)
+    finally:
+        duration_ms = (time.perf_counter() - t0) * 1000
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        capture = {
+            "endpoint": name,
+            "method": getattr(req, "method", None),
+            "query": dict(getattr(req, "params", {}) or {}),
+            "statusCode": status,
+            "trigger": trigger,
+            "durationMs": round(duration_ms, 2),
+            "peakKb": round(peak / 1024, 1),
+            "allocationScope": "handler" if handler_file else "process",
+            "createdAt": datetime.utcnow().isoformat() + "Z",
+        }
+        try:
+            capture["functions"] = _top_functions(profiler)
+            capture["allocations"] = _top_allocations(snapshot, handler_file)
+            profile_id = save(capture)
+        except Exception:
+            logging.exception("Profile capture failed for %s", name)
+            profile_id = None
+    if profile_id and hasattr(resp, "headers"):
+        try:
+            resp.headers[ID_HEADER] = profile_id
+        except Exception:
+            pass
+    return resp
+
+
+def new_id():
+    return f"{_MAX_MS - int(time.time() * 1000):013d}_{uuid.uuid4().hex[:12]}"
+
+
+def save(capture, conn=None):
+    """Store a capture in the configured sink. Returns its profile id."""
+    from shared_code import codec
+    profile_id = new_id()
+    capture = {"profileId": profile_id, **capture}
+    if SINK == "local":
+        _local.appendleft(capture)
+        return profile_id
+    from shared_code import storage
+    conn = conn or os.getenv("AzureWebJobsStorage")
+    storage.table(TABLE, conn, create=True).upsert_entity({
+        "PartitionKey": PARTITION,
+        "RowKey": profile_id,
+        **{k: v for k, v in capture.items() if k not in ("profileId", "query", "functions", "allocations") and v is not None},
+        "query": codec.dumps(capture["query"])[:4000],
+        "functions": codec.dumps(capture["functions"]),
+        "allocations": codec.dumps(capture["allocations"]),
+    })
+    return profile_id
+
+
+SUMMARY_FIELDS = ["RowKey", "endpoint", "method", "statusCode", "trigger", "durationMs", "peakKb", "allocationScope", "createdAt"]
+
+
+def _from_row(row, full):
+    from shared_code import codec
+    out = {"profileId": row["RowKey"], **{k: row.get(k) for k in SUMMARY_FIELDS[1:]}}
+    if full:
+        out["query"] = codec.loads_or(row.get("query"), {})
+        out["functions"] = codec.loads_or(row.get("functions"), [])
+        out["allocations"] = codec.loads_or(row.get("allocations"), [])
+    return out
+
+
+def list_profiles(conn, limit=20, endpoint=None):
+    """Newest captures first (summaries only)."""
+    if SINK == "local":
+        items = [c for c in _local if not endpoint or c["endpoint"] == endpoint]
+        return [{k: c.get(k) for k in ["profileId"] + SUMMARY_FIELDS[1:]} for c in items[:limit]]
+    from shared_code import paging, storage
+    filt = "PartitionKey eq @pk" + (" and endpoint eq @ep" if endpoint else "")
+    params = {"pk": PARTITION, **({"ep": endpoint} if endpoint else {})}
+    rows, _ = paging.first_page(
+        storage.table(TABLE, conn, create=True).query_entities(filt, parameters=params, select=SUMMARY_FIELDS, results_per_page=limit),
+        None,
+    )
+    return [_from_row(r, full=False) for r in rows]
+
+
+def get_profile(conn, profile_id):
+    if SINK == "local":
+        return next((c for c in _local if c["profileId"] == profile_id), None)
+    from shared_code import storage
+    try:
+        row = storage.table(TABLE, conn, create=True).get_entity(PARTITION, profile_id)
+    except Exception:
+        return None
+    return _from_row(row, full=True)
@@ -0,0 +1,192 @@
+"""In-process rate limiting and load shedding for the HTTP functions.
+
+Token buckets: check(endpoint, key, headers) spends one token from the bucket of
+(endpoint, key) and returns a 429 HttpResponse with Retry-After when it is empty, else
+None. Rates are per endpoint and configurable as RATE_LIMIT_<ENDPOINT>="<per_sec>/<burst>"
+(e.g. RATE_LIMIT_SENDLOCATION="8/16"); "off" disables the endpoint's limiter.
+
+Session polls without x-username (check_poll) are keyed by sessionId plus caller
+address under "<endpoint>Poll": a lobby of players behind one NAT or carrier IP shares
+a bucket sized for a whole lobby rather than one sized for one player.
+
+Load shedding: @shed(priority) caps the worker's in-flight requests at
+MAX_CONCURRENT_REQUESTS (default 32). "low" requests (high scores, player history) are
+refused with 503 once LOW_PRIORITY_SHARE (default 0.5) of that capacity is busy, so
+gameplay ("high") traffic keeps the remainder.
+
+State is per worker process: limits are approximate across scaled-out instances.
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import azure.functions as func
+
+DEFAULT_RATES = {
+    "sendLocation": (8.0, 16.0),
+    "getLocations": (6.0, 12.0),
+    "JoinSession": (4.0, 10.0),
+    "GetGameState": (6.0, 12.0),
+    # anonymous polls, per session and address: ~10 players polling about once a second
+    "JoinSessionPoll": (16.0, 40.0),
+    "GetGameStatePoll": (24.0, 60.0),
+}
+MAX_BUCKETS = 10000
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except Exception:
+        return int(default)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+
+MAX_CONCURRENT = _env_int("MAX_CONCURRENT_REQUESTS", 32)
+LOW_PRIORITY_SHARE = _env_float("LOW_PRIORITY_SHARE", 0.5)
+
+_lock = threading.Lock()
+_buckets = OrderedDict()  # (endpoint, key) -> [tokens, last_refill]
+_rates = {}
+_in_flight = 0
+stats = {"limited": 0, "shed": 0}
+
+
+def rate_for(endpoint):
+    """(per_sec, burst) for endpoint, or None when disabled."""
+    if endpoint in _rates:
+        return _rates[endpoint]
+    raw = os.environ.get(f"RATE_LIMIT_{endpoint.upper()}")
+    rate = DEFAULT_RATES.get(endpoint)
+    if raw:
+        if raw.strip().lower() == "off":
+            rate = None
+        else:
+            try:
+                per_sec, _, burst = raw.partition("/")
+                per_sec = float(per_sec)
+                rate = (per_sec, float(burst) if burst else per_sec * 2)
+            except Exception:
+                pass
+    _rates[endpoint] = rate
+    return rate
+
+
+def take(endpoint, key, now=None):
+    """Spend a token. Returns 0 if allowed, else seconds until a token is available."""
+    rate = rate_for(endpoint)
+    if not rate or not key:
+        return 0
+    per_sec, burst = rate
+    now = time.monotonic() if now is None else now
+    bucket_key = (endpoint, key)
+    with _lock:
+        bucket = _buckets.get(bucket_key)
+        if bucket is None:
+            bucket = [burst, now]
+            _buckets[bucket_key] = bucket
+            if len(_buckets) > MAX_BUCKETS:
+                _buckets.popitem(last=False)
+        else:
+            _buckets.move_to_end(bucket_key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_sec)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0
+        stats["limited"] += 1
+        return (1.0 - bucket[0]) / per_sec if per_sec > 0 else 60
+
+
+def client_address(req):
+    """Best-effort caller address from the front end's X-Forwarded-For (port stripped)."""
+    forwarded = (req.headers.get("X-Forwarded-For") or "").split(",")[0].strip()
+    if forwarded.count(":") == 1:
+        forwarded = forwarded.split(":")[0]
+    return forwarded or None
+
+
+def check(endpoint, key, headers):
+    """429 response if (endpoint, key) is over its rate, else None."""
+    wait = take(endpoint, key)
+    if not wait:
+        return None
+    return func.HttpResponse(
+        "Too many requests",
+        status_code=429,
+        headers={**headers, "Retry-After": str(max(1, math.ceil(wait)))},
+    )
+
+
+def poll_key(req, session_id):
+    return f"{session_id}@{client_address(req) or '-'}"
+
+
+def check_poll(endpoint, req, session_id, headers):
+    """check() for a session poll: per x-username when sent, else per (sessionId, address)."""
+    username = req.headers.get("x-username")
+    if username:
+        return check(endpoint, username, headers)
+    if session_id:
+        return check(endpoint + "Poll", poll_key(req, session_id), headers)
+    return check(endpoint, client_address(req), headers)
+
+
+def _admit(priority):
+    global _in_flight
+    limit = MAX_CONCURRENT if priority != "low" else max(1, int(MAX_CONCURRENT * LOW_PRIORITY_SHARE))
+    with _lock:
+        if MAX_CONCURRENT > 0 and _in_flight >= limit:
+            stats["shed"] += 1
+            return False
+        _in_flight += 1
+        return True
+
+
+def _release():
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def load():
+    """Share of this worker's request capacity in use (0..1); 0 when shedding is disabled."""
+    if MAX_CONCURRENT <= 0:
+        return 0.0
+    return min(1.0, _in_flight / MAX_CONCURRENT)
+
+
+def shed(priority="high"):
+    """Decorator for main(req): refuse with 503 when the worker is saturated for this priority."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(req, *args, **kwargs):
+            if req.method == "OPTIONS":
+                return handler(req, *args, **kwargs)
+            if not _admit(priority):
+                return func.HttpResponse(
+                    "Server busy",
+                    status_code=503,
+                    headers={
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Expose-Headers": "Retry-After",
+                        "Retry-After": "1" if priority != "low" else "5",
+                        "Cache-Control": "no-store",
+                    },
+                )
+            try:
+                return handler(req, *args, **kwargs)
+            finally:
+                _release()
+        return wrapper
+    return decorator
@@ -0,0 +1,245 @@
+"""Bulk re-scoring of stored Scores rows after a template multiplier change.
+
+Scores rows of one template are streamed page by page (RowKey order) and their
+finalScore recomputed with shared_code.scoring:
+
+- quick (default): from the stored team accuracy (totalAccuracy = adjustedPct), which is
+  exactly what the client multiplied, so only the multiplier changes;
+- full: coverage/precision recomputed from the stored drawing against the template
+  boundary, then points from that (also rewrites totalAccuracy and the
+  shape_metrics columns, which backfills them on games stored before they existed).
+
+Computation fans out over a process pool (workers > 1), writes go back as merge
+transactions of <= 100 rows, and after every chunk the last RowKey is checkpointed in
+the RescoreJobs table (PK "rescore", RK templateId) so an interrupted run resumes where
+it stopped. Every row whose finalScore changed is re-recorded into its Leaderboards
+buckets (leaderboards.record replaces the game's previous entry), so day/week/month
+boards never mix old and new scores. It is also re-applied to its players' PlayerStats
+rows where the game is still in their recentGames; games older than that are counted
+in playerStatsStale, and the summary then asks for tools/backfill_player_stats. Used by
+tools/rescore.py (CLI) and the admin RescoreTemplate endpoint.
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from shared_code import codec, leaderboards, player_stats, response_cache, scoring, storage
+
+JOBS_TABLE = "RescoreJobs"
+JOBS_PARTITION = "rescore"
+BATCH_SIZE = 100
+CHUNK_ROWS = 500
+
+QUICK_FIELDS = ["PartitionKey", "RowKey", "templateId", "totalAccuracy", "finalScore",
+                "templateRadiusMeters", "timePlayedSec", "players", "drawing",
+                # leaderboard entry fields (leaderboards.FIELDS)
+                "timeCompleted", "templateName", "hausdorffMeters", "frechetMeters", "turningDistance"]
+FULL_FIELDS = QUICK_FIELDS + ["templateCenter", "templateVertices", "shapeMetricsVersion"]
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "Z"
+
+
+def team_size(row, trails=None):
+    """Brushes that drew, as the client counts them (trail keys), else Brush players."""
+    if trails is None:
+        trails = (codec.loads_or(row.get("drawing"), None) or {}).get("trails")
+    if isinstance(trails, dict) and trails:
+        return len(trails)
+    players = codec.loads_or(row.get("players"), None) or []
+    return max(1, sum(1 for p in players if isinstance(p, dict) and p.get("role") == "Brush"))
+
+
+def rescore_row(row, multiplier, full=False, base_vertices=None):
+    """Merge entity with the recomputed score, or None if the row is unchanged/unscorable.
+
+    Module-level and free of I/O so it can run in a worker process.
+    """
+    radius = row.get("templateRadiusMeters")
+    trails = None
+    accuracy = row.get("totalAccuracy")
+    update = {}
+    if full:
+        trails = (codec.loads_or(row.get("drawing"), None) or {}).get("trails")
+        if not isinstance(trails, dict) or not trails:
+            return None
+        center = codec.loads_or(row.get("templateCenter"), None)
+        boundary = scoring.template_boundary(
+            row.get("templateId"), center, radius,
+            base_vertices=base_vertices,
+            vertices=codec.loads_or(row.get("templateVertices"), None),
+        )
+        res = scoring.score_trails(trails, boundary, center, radius, row.get("templateId"))
+        if res is None:
+            return None
+        accuracy = res["adjustedPct"]
+        if accuracy != row.get("totalAccuracy"):
+            update["totalAccuracy"] = float(accuracy)
+        from shared_code import shape_metrics
+        metrics = shape_metrics.compute(trails, boundary, center, row.get("templateId"))
+        if metrics and any(row.get(k) != v for k, v in metrics.items()):
+            update.update(metrics)
+    if accuracy is None:
+        return None
+    points = scoring.points(accuracy, multiplier, radius, team_size(row, trails))
+    if points != row.get("finalScore"):
+        update["finalScore"] = points
+    if not update:
+        return None
+    return {"PartitionKey": row["PartitionKey"], "RowKey": row["RowKey"], "scoreMultiplier": float(multiplier), **update}
+
+
+def _rescore_args(args):
+    return rescore_row(*args)
+
+
+def load_checkpoint(conn, template_id):
+    try:
+        return storage.table(JOBS_TABLE, conn, create=True).get_entity(partition_key=JOBS_PARTITION, row_key=template_id)
+    except Exception:
+        return None
+
+
+def save_checkpoint(conn, template_id, **fields):
+    storage.table(JOBS_TABLE, conn, create=True).upsert_entity(
+        {"PartitionKey": JOBS_PARTITION, "RowKey": template_id, "updatedAt": _now_iso(), **fields}
+    )
+
+
+def reset_checkpoint(conn, template_id):
+    try:
+        storage.table(JOBS_TABLE, conn, create=True).delete_entity(partition_key=JOBS_PARTITION, row_key=template_id)
+    except Exception:
+        pass
+
+
+def template_multiplier(conn, template_id):
+    """(multiplier, baseVertices) from the Templates row; falls back to the default multiplier."""
+    try:
+        ent = storage.table("Templates", conn).get_entity(partition_key="template", row_key=template_id)
+    except Exception:
+        ent = {}
+    return scoring.difficulty_for(template_id, ent.get("multiplier")), codec.loads_or(ent.get("baseVertices"), None)
+
+
+def iter_chunks(conn, template_id, after_row_key=None, chunk_rows=CHUNK_ROWS, full=False):
+    """Scores rows of a template after `after_row_key`, in lists of <= chunk_rows."""
+    filt = "PartitionKey eq 'score' and templateId eq @tid"
+    params = {"tid": template_id}
+    if after_row_key:
+        filt += " and RowKey gt @after"
+        params["after"] = after_row_key
+    rows = storage.table("Scores", conn).query_entities(
+        filt, parameters=params, select=FULL_FIELDS if full else QUICK_FIELDS, results_per_page=min(chunk_rows, 1000)
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(dict(row))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_updates(conn, updates):
+    """Merge updates in <= BATCH_SIZE transactions (all rows share PartitionKey 'score')."""
+    table = storage.table("Scores", conn)
+    written = 0
+    for i in range(0, len(updates), BATCH_SIZE):
+        chunk = updates[i:i + BATCH_SIZE]
+        table.submit_transaction([("upsert", u, {"mode": "merge"}) for u in chunk])
+        written += len(chunk)
+    return written
+
+
+def run(conn, template_id, multiplier=None, full=False, workers=1, resume=True,
+        max_rows=None, time_budget_sec=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """Re-score one template's Scores rows. Returns a summary dict (done=False if stopped early).
+
+    max_rows/time_budget_sec bound one call (the HTTP endpoint); the checkpoint lets the
+    next call continue. progress(summary) is called after every chunk.
+    """
+    stored_mult, base_vertices = template_multiplier(conn, template_id)
+    multiplier = float(multiplier) if multiplier is not None else stored_mult
+    checkpoint = load_checkpoint(conn, template_id) if resume else None
+    if checkpoint is not None and (checkpoint.get("multiplier") != multiplier or bool(checkpoint.get("full")) != bool(full)):
+        checkpoint = None  # different job parameters: start over
+    after = checkpoint.get("lastRowKey") if checkpoint else None
+    summary = {
+        "templateId": template_id,
+        "multiplier": multiplier,
+        "full": bool(full),
+        "resumedFrom": after,
+        "scanned": 0,
+        "updated": 0,
+        "lastRowKey": after,
+        "playerStatsStale": 0,
+        "done": False,
+    }
+    prior_scanned = int(checkpoint.get("scanned") or 0) if checkpoint else 0
+    prior_updated = int(checkpoint.get("updated") or 0) if checkpoint else 0
+    prior_stale = int(checkpoint.get("playerStatsStale") or 0) if checkpoint else 0
+    t0 = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        stopped = False
+        for chunk in iter_chunks(conn, template_id, after, chunk_rows, full):
+            args = [(row, multiplier, full, base_vertices) for row in chunk]
+            if pool is not None:
+                results = list(pool.map(_rescore_args, args, chunksize=max(1, len(args) // (workers * 4))))
+            else:
+                results = [_rescore_args(a) for a in args]
+            updates = [u for u in results if u]
+            written = write_updates(conn, updates)
+            if written:
+                response_cache.bump("scores", conn)
+                rows_by_key = {row["RowKey"]: row for row in chunk}
+                for u in updates:
+                    if "finalScore" in u:
+                        merged = {**rows_by_key[u["RowKey"]], **u}
+                        leaderboards.record(conn, merged)
+                        stats_updated, stats_players = player_stats.record_game(conn, merged, replace_only=True)
+                        if stats_updated < stats_players:
+                            summary["playerStatsStale"] += 1
+            summary["updated"] += written
+            summary["scanned"] += len(chunk)
+            summary["lastRowKey"] = chunk[-1]["RowKey"]
+            save_checkpoint(
+                conn, template_id,
+                lastRowKey=summary["lastRowKey"], multiplier=multiplier, full=bool(full),
+                scanned=prior_scanned + summary["scanned"], updated=prior_updated + summary["updated"],
+                playerStatsStale=prior_stale + summary["playerStatsStale"], done=False,
+            )
+            elapsed = time.perf_counter() - t0
+            summary["elapsedSec"] = round(elapsed, 3)
+            summary["rowsPerSec"] = round(summary["scanned"] / elapsed, 1) if elapsed > 0 else None
+            if progress:
+                progress(summary)
+            if (max_rows and summary["scanned"] >= max_rows) or (time_budget_sec and elapsed >= time_budget_sec):
+                stopped = True
+                break
+        if not stopped:
+            summary["done"] = True
+            save_checkpoint(
+                conn, template_id,
+                lastRowKey=summary["lastRowKey"] or "", multiplier=multiplier, full=bool(full),
+                scanned=prior_scanned + summary["scanned"], updated=prior_updated + summary["updated"],
+                playerStatsStale=prior_stale + summary["playerStatsStale"], done=True, finishedAt=_now_iso(),
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - t0
+    summary["elapsedSec"] = round(elapsed, 3)
+    summary["rowsPerSec"] = round(summary["scanned"] / elapsed, 1) if elapsed > 0 else None
+    if prior_stale + summary["playerStatsStale"]:
+        summary["playerStatsHint"] = (
+            f"{prior_stale + summary['playerStatsStale']} re-scored games were too old to correct in PlayerStats; "
+            "run python -m tools.backfill_player_stats when the job is done"
+        )
+    logging.info("Rescore run: %s", codec.dumps(summary))
+    return summary
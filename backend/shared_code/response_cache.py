@@ -0,0 +1,144 @@
+"""In-process cache of rendered list responses, invalidated by data version counters.
+
+GetHighScores and GetPlayerGames pages only change when a Scores row is written, so the
+JSON body of each page is kept in a per-worker LRU keyed by (endpoint, normalized query)
+and tagged with the "scores" version it was built from. Writers of Scores (StartGame
+endGame, the re-scoring job) call bump("scores"), which increments a counter row in the
+Counters table (PK "version", RK name) under an ETag guard. Readers refresh their view of
+the counter at most every RESPONSE_CACHE_VERSION_TTL_SEC (default 5), so popular pages
+are answered from memory without touching storage; other workers see a bump within
+that TTL, the bumping worker immediately.
+
+Eviction is least-recently-used once the cached bodies exceed RESPONSE_CACHE_MAX_BYTES
+(default 8 MiB). Counters are in `stats` and returned by snapshot().
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from shared_code import storage
+
+TABLE = "Counters"
+PARTITION = "version"
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except Exception:
+        return float(default)
+
+MAX_BYTES = int(_env_float("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+MAX_ENTRY_BYTES = MAX_BYTES // 8
+VERSION_TTL_SEC = _env_float("RESPONSE_CACHE_VERSION_TTL_SEC", 5)
+MAX_RETRIES = 8
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (version, body)
+_bytes = 0
+_versions = {}  # name -> (value, fetched_at)
+stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "stores": 0, "bumps": 0}
+
+
+def _size(body):
+    return len(body) if body is not None else 0
+
+
+def current_version(name="scores", conn=None):
+    """Latest known value of a version counter (refreshed from storage at most every VERSION_TTL_SEC)."""
+    now = time.monotonic()
+    cached = _versions.get(name)
+    if cached is not None and now - cached[1] < VERSION_TTL_SEC:
+        return cached[0]
+    try:
+        row = storage.table(TABLE, conn, create=True).get_entity(PARTITION, name)
+        value = int(row.get("value") or 0)
+    except Exception:
+        value = cached[0] if cached is not None else 0
+    _versions[name] = (value, now)
+    return value
+
+
+def bump(name="scores", conn=None):
+    """Increment a version counter (ETag-guarded). Returns the new value, or None on failure."""
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+    table = storage.table(TABLE, conn, create=True)
+    for _ in range(MAX_RETRIES):
+        try:
+            try:
+                row = table.get_entity(PARTITION, name)
+            except ResourceNotFoundError:
+                row = None
+            value = int(row.get("value") or 0) + 1 if row is not None else 1
+            entity = {"PartitionKey": PARTITION, "RowKey": name, "value": value}
+            if row is None:
+                table.create_entity(entity)
+            else:
+                table.update_entity(entity, mode="replace", etag=row.metadata["etag"], match_condition=MatchConditions.IfNotModified)
+        except (ResourceExistsError, ResourceModifiedError):
+            continue
+        except Exception:
+            logging.exception("Could not bump %s version", name)
+            break
+        _versions[name] = (value, time.monotonic())
+        stats["bumps"] += 1
+        return value
+    # Still drop this worker's entries so at least it never serves the stale pages
+    _versions.pop(name, None)
+    clear()
+    return None
+
+
+def get(key, version):
+    """Cached body for key if it was built from `version`, else None."""
+    global _bytes
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            stats["misses"] += 1
+            return None
+        if entry[0] != version:
+            del _entries[key]
+            _bytes -= _size(entry[1])
+            stats["stale"] += 1
+            stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        stats["hits"] += 1
+        return entry[1]
+
+
+def put(key, version, body):
+    global _bytes
+    size = _size(body)
+    if size > MAX_ENTRY_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _bytes -= _size(old[1])
+        _entries[key] = (version, body)
+        _bytes += size
+        stats["stores"] += 1
+        while _bytes > MAX_BYTES and _entries:
+            _, (_, evicted) = _entries.popitem(last=False)
+            _bytes -= _size(evicted)
+            stats["evictions"] += 1
+
+
+def clear():
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
+
+
+def snapshot():
+    with _lock:
+        return {**stats, "entries": len(_entries), "bytes": _bytes, "maxBytes": MAX_BYTES,
+                "versions": {k: v[0] for k, v in _versions.items()}}
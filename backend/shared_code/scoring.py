@@ -0,0 +1,192 @@
+"""Server-side port of frontend/ScoreCalculator.js (accuracy and points).
+
+Used by batch jobs that re-score stored games. Keep in step with the client formula:
+points = round(12 * adjustedPct * difficulty * radiusFactor * teamFactor * timeFactor).
+"""
+
+import math
+
+DEFAULT_MULTIPLIERS = {
+    'star': 1.6,
+    'square': 1.3,
+    'triangle': 1.15,
+    'circle': 1.05,
+    'polygon': 1.0,
+}
+METERS_PER_DEG = 111320.0
+STEP_METERS = 2.0
+
+
+def difficulty_for(template_id, multiplier=None):
+    try:
+        if multiplier is not None and float(multiplier) > 0:
+            return float(multiplier)
+    except Exception:
+        pass
+    return DEFAULT_MULTIPLIERS.get(template_id, 1.0)
+
+
+def points(adjusted_pct, multiplier, radius_meters, team_size, time_seconds=None):
+    """Team points exactly as ScoreCalculator.scorePerUserAndTeam computes them."""
+    radius = float(radius_meters or 50)
+    radius_factor = max(0.8, min(1.5, radius / 100.0))
+    team_factor = 1 + math.log10(max(1, int(team_size or 1)))
+    # The client never sets template.timeSeconds, so it always scores with 60 s
+    time_sec = float(time_seconds or 60)
+    time_factor = max(0.8, min(1.2, 90.0 / max(30.0, time_sec)))
+    base = float(adjusted_pct or 0) * 12
+    return int(round(base * float(multiplier) * radius_factor * team_factor * time_factor))
+
+
+def tolerance(radius_meters):
+    return max(3.0, min(0.06 * float(radius_meters or 50), 10.0))
+
+
+def center_of(center):
+    """{lat,lng} or {latitude,longitude} -> (lat, lng) or None."""
+    if not isinstance(center, dict):
+        return None
+    lat = center.get('lat', center.get('latitude'))
+    lng = center.get('lng', center.get('longitude'))
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+def to_xy(lat, lng, origin):
+    m_lng = METERS_PER_DEG * abs(math.cos(math.radians(origin[0])))
+    return ((lng - origin[1]) * m_lng, (lat - origin[0]) * METERS_PER_DEG)
+
+
+def resample(points_xy, step=STEP_METERS):
+    """Uniform-step resampling of an open polyline (ScoreCalculator.resamplePolyline)."""
+    if not points_xy:
+        return []
+    out = [points_xy[0]]
+    acc = 0.0
+    for (ax, ay), (bx, by) in zip(points_xy, points_xy[1:]):
+        seg = math.hypot(bx - ax, by - ay)
+        if seg == 0:
+            continue
+        ux, uy = (bx - ax) / seg, (by - ay) / seg
+        while acc + seg >= step:
+            remain = step - acc
+            px, py = out[-1]
+            out.append((px + ux * remain, py + uy * remain))
+            seg -= remain
+            acc = 0.0
+        acc += seg
+    return out
+
+
+def densify(points_xy, step=STEP_METERS, closed=True):
+    """ScoreCalculator.densifyPath."""
+    n = len(points_xy)
+    if n < 2:
+        return list(points_xy)
+    out = []
+    for i in range(n if closed else n - 1):
+        ax, ay = points_xy[i]
+        bx, by = points_xy[(i + 1) % n]
+        out.append((ax, ay))
+        seg = math.hypot(bx - ax, by - ay)
+        if seg > step:
+            k = int(seg // step)
+            for s in range(1, k):
+                t = s / k
+                out.append((ax + (bx - ax) * t, ay + (by - ay) * t))
+    if not closed:
+        out.append(points_xy[-1])
+    return out
+
+
+def _dist_to_polyline(p, poly):
+    best = float('inf')
+    px, py = p
+    for (ax, ay), (bx, by) in zip(poly, poly[1:]):
+        vx, vy = bx - ax, by - ay
+        wx, wy = px - ax, py - ay
+        c1 = vx * wx + vy * wy
+        if c1 <= 0:
+            d = math.hypot(wx, wy)
+        else:
+            c2 = vx * vx + vy * vy
+            if c2 <= c1:
+                d = math.hypot(px - bx, py - by)
+            else:
+                t = c1 / c2
+                d = math.hypot(px - (ax + t * vx), py - (ay + t * vy))
+        if d < best:
+            best = d
+    return best
+
+
+def template_boundary(template_id, center, radius_meters, base_vertices=None, vertices=None):
+    """Boundary lat/lng list as ScoreCalculator.buildTemplateBoundary builds it."""
+    c = center_of(center)
+    if c is None:
+        return []
+    lat, lng = c
+    radius = float(radius_meters or 0)
+    d_lat = radius / METERS_PER_DEG
+    d_lng = radius / (METERS_PER_DEG * abs(math.cos(math.radians(lat))) or 1.0)
+    if template_id == 'polygon' and isinstance(vertices, list) and len(vertices) >= 2:
+        out = []
+        for v in vertices:
+            try:
+                out.append((float(v.get('lat', v.get('latitude'))), float(v.get('lng', v.get('longitude')))))
+            except Exception:
+                continue
+        return out
+    if isinstance(base_vertices, list) and base_vertices:
+        return [(lat + float(p.get('y') or 0) * d_lat, lng + float(p.get('x') or 0) * d_lng) for p in base_vertices]
+    if template_id == 'square':
+        return [(lat + d_lat, lng - d_lng), (lat + d_lat, lng + d_lng), (lat - d_lat, lng + d_lng), (lat - d_lat, lng - d_lng)]
+    if template_id == 'triangle':
+        return [(lat + d_lat, lng), (lat - d_lat, lng + d_lng), (lat - d_lat, lng - d_lng)]
+    if template_id == 'star':
+        pts = []
+        for i in range(10):
+            r = 1.0 if i % 2 == 0 else 0.5
+            ang = -math.pi / 2 + i * math.pi / 5
+            pts.append((lat + r * d_lat * math.sin(ang), lng + r * d_lng * math.cos(ang)))
+        return pts
+    return [(lat + d_lat * math.sin(2 * math.pi * i / 64), lng + d_lng * math.cos(2 * math.pi * i / 64)) for i in range(64)]
+
+
+def trail_xy(trails, origin):
+    """All brush trails resampled at 2 m and flattened into one polyline (as the client does)."""
+    flat = []
+    for line in (trails or {}).values():
+        xy = []
+        for p in line or []:
+            try:
+                xy.append(to_xy(float(p.get('latitude', p.get('lat'))), float(p.get('longitude', p.get('lng'))), origin))
+            except Exception:
+                continue
+        flat.extend(resample(xy))
+    return flat
+
+
+def score_trails(trails, boundary, center, radius_meters, template_id):
+    """Team coverage/precision/F1/adjusted of stored trails vs a template_boundary() list."""
+    if not boundary or len(boundary) < 3:
+        return None
+    origin = center_of(center) or boundary[0]
+    boundary_pts = densify([to_xy(lat, lng, origin) for lat, lng in boundary], STEP_METERS, closed=template_id != 'polygon')
+    trail = trail_xy(trails, origin)
+    if not trail:
+        return {'coverage': 0.0, 'precision': 0.0, 'f1': 0.0, 'accuracyPct': 0, 'adjustedPct': 0}
+    tol = tolerance(radius_meters)
+    covered = sum(1 for p in boundary_pts if _dist_to_polyline(p, trail) <= tol)
+    on_shape = sum(1 for p in trail if _dist_to_polyline(p, boundary_pts) <= tol)
+    coverage = covered / len(boundary_pts)
+    precision = on_shape / len(trail)
+    f1 = (2 * coverage * precision) / (coverage + precision) if (coverage + precision) > 0 else 0.0
+    return {
+        'coverage': coverage,
+        'precision': precision,
+        'f1': f1,
+        'accuracyPct': int(round(f1 * 100)),
+        'adjustedPct': int(round(coverage * precision * 100)),
+    }
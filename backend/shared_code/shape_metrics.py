@@ -0,0 +1,167 @@
+"""Shape-similarity metrics between a game's combined trail and its template boundary.
+
+Complements the tolerance-based coverage/precision score with metrics that grade how
+well-shaped a drawing is:
+
+- hausdorffMeters: symmetric Hausdorff distance between the two point sets. Uses the
+  early-abandon scan (random order, distance blocks vectorized with numpy; a point stops
+  as soon as it is closer than the current maximum), typically far below |A|·|B|.
+- frechetMeters: discrete Fréchet distance on both curves resampled to SAMPLES points by
+  arc length, with the DP restricted to a Sakoe-Chiba band of ±BAND_FRACTION·SAMPLES.
+  For closed templates the boundary is started at the point nearest the trail start, in
+  the better of both directions.
+- turningDistance: L2 distance (radians) between turning functions (tangent angle vs
+  normalized arc length), minimized over rotation in closed form and over the
+  template's start point (all cyclic shifts at once with numpy).
+
+The combined trail is the brush trails concatenated in stored order, as ScoreCalculator
+flattens them; Fréchet/turning are therefore most meaningful for single-Brush games,
+while Hausdorff does not depend on order.
+"""
+
+import math
+
+import numpy as np
+
+from shared_code import scoring
+
+VERSION = 1
+SAMPLES = 128
+BAND_FRACTION = 0.15
+HAUSDORFF_BLOCK = 64
+_rng = np.random.default_rng(12345)
+
+
+def to_xy(latlng, origin):
+    """(n, 2) lat/lng array -> (n, 2) meters around origin (same projection as scoring)."""
+    pts = np.asarray(latlng, dtype=np.float64)
+    m_lng = scoring.METERS_PER_DEG * abs(math.cos(math.radians(origin[0])))
+    return np.column_stack(((pts[:, 1] - origin[1]) * m_lng, (pts[:, 0] - origin[0]) * scoring.METERS_PER_DEG))
+
+
+def resample(xy, n, closed=False):
+    """n points evenly spaced by arc length along the polyline (closing it if asked)."""
+    if closed:
+        xy = np.vstack((xy, xy[:1]))
+    seg = np.hypot(*np.diff(xy, axis=0).T)
+    cum = np.concatenate(([0.0], np.cumsum(seg)))
+    if cum[-1] == 0:
+        return np.repeat(xy[:1], n, axis=0)
+    t = np.linspace(0.0, cum[-1], n, endpoint=not closed)
+    return np.column_stack((np.interp(t, cum, xy[:, 0]), np.interp(t, cum, xy[:, 1])))
+
+
+def _directed_hausdorff(a, b):
+    cmax = 0.0
+    for p in a[_rng.permutation(len(a))]:
+        cmin = math.inf
+        for i in range(0, len(b), HAUSDORFF_BLOCK):
+            d = float(np.min(np.sum((b[i:i + HAUSDORFF_BLOCK] - p) ** 2, axis=1)))
+            if d < cmin:
+                cmin = d
+                if cmin < cmax:
+                    break  # early abandon: p cannot raise the maximum
+        if cmin > cmax:
+            cmax = cmin
+    return math.sqrt(cmax)
+
+
+def hausdorff(a, b):
+    return max(_directed_hausdorff(a, b), _directed_hausdorff(b, a))
+
+
+def frechet(p, q, band):
+    """Discrete Fréchet distance of equal-length curves within |i - j| <= band."""
+    n = len(p)
+    ca = np.full((n, n), np.inf)
+    for i in range(n):
+        lo, hi = max(0, i - band), min(n, i + band + 1)
+        d = np.hypot(*(q[lo:hi] - p[i]).T)
+        prev = ca[i - 1] if i else None
+        row = ca[i]
+        for k, j in enumerate(range(lo, hi)):
+            if i == 0 and j == 0:
+                best = 0.0
+            else:
+                best = math.inf
+                if i:
+                    best = min(prev[j], prev[j - 1] if j else math.inf)
+                if j:
+                    best = min(best, row[j - 1])
+            row[j] = max(d[k], best)
+    return float(ca[-1, -1])
+
+
+def turning(xy, n, closed=False):
+    """Tangent angle (unwrapped) sampled at n uniform arc-length positions, and the total
+    turning of one lap for closed curves (≈ ±2π)."""
+    if closed:
+        xy = np.vstack((xy, xy[:1]))
+    seg = np.diff(xy, axis=0)
+    length = np.hypot(seg[:, 0], seg[:, 1])
+    keep = length > 0
+    seg, length = seg[keep], length[keep]
+    raw = np.arctan2(seg[:, 1], seg[:, 0])
+    angles = np.unwrap(np.concatenate((raw, raw[:1])) if closed else raw)
+    lap = float(angles[-1] - angles[0]) if closed else 0.0
+    angles = angles[:len(raw)]
+    cum = np.cumsum(length) / length.sum()
+    s = (np.arange(n) + 0.5) / n
+    return angles[np.minimum(np.searchsorted(cum, s), len(angles) - 1)], lap
+
+
+def turning_distance(trail, template, closed, n=SAMPLES):
+    """Min L2 turning-function distance over rotation (closed form) and, for closed
+    templates, over every start point of the template (all cyclic shifts at once)."""
+    f, _ = turning(trail, n)
+    best = math.inf
+    for ring in (template, template[::-1]):
+        g, lap = turning(ring, n, closed)
+        if closed:
+            idx = np.arange(n)[:, None] + np.arange(n)[None, :]
+            shifted = g[idx % n] + np.where(idx >= n, lap, 0.0)  # row k: template started at sample k
+        else:
+            shifted = g[None, :]
+        diff = f[None, :] - shifted
+        diff -= diff.mean(axis=1, keepdims=True)  # optimal rotation per shift
+        best = min(best, float(np.sqrt((diff ** 2).mean(axis=1)).min()))
+    return best
+
+
+def compute(trails, boundary_latlng, center, template_id):
+    """{hausdorffMeters, frechetMeters, turningDistance, shapeMetricsVersion} or None."""
+    if not boundary_latlng or len(boundary_latlng) < 3 or not isinstance(trails, dict):
+        return None
+    pts = []
+    for line in trails.values():
+        for p in line or []:
+            try:
+                pts.append((float(p.get("latitude", p.get("lat"))), float(p.get("longitude", p.get("lng")))))
+            except Exception:
+                continue
+    if len(pts) < 2:
+        return None
+    origin = scoring.center_of(center) or boundary_latlng[0]
+    closed = template_id != "polygon"
+    trail_xy = to_xy(pts, origin)
+    tpl_xy = to_xy(boundary_latlng, origin)
+    trail = resample(trail_xy, SAMPLES)
+    tpl = resample(tpl_xy, SAMPLES, closed=closed)
+
+    if closed:
+        start = int(np.argmin(np.hypot(*(tpl - trail[0]).T)))
+        candidates = [np.roll(tpl, -start, axis=0), np.roll(tpl[::-1], -(SAMPLES - 1 - start), axis=0)]
+        candidates = [np.vstack((c, c[:1])) for c in candidates]  # a full lap ends where it started
+        trail_f = resample(trail_xy, SAMPLES + 1)
+    else:
+        candidates = [tpl, tpl[::-1]]
+        trail_f = trail
+    band = max(1, int(BAND_FRACTION * len(trail_f)))
+    fre = min(frechet(trail_f, c, band) for c in candidates)
+
+    return {
+        "hausdorffMeters": round(hausdorff(trail_xy, resample(tpl_xy, 4 * SAMPLES, closed=closed)), 2),
+        "frechetMeters": round(fre, 2),
+        "turningDistance": round(turning_distance(trail, tpl, closed), 4),
+        "shapeMetricsVersion": VERSION,
+    }
@@ -0,0 +1,50 @@
+"""Process-wide Table Storage clients.
+
+Every handler used to build a new TableClient (and with it a new HTTP pipeline and TLS
+connection) per request. table() returns one cached client per (connection string,
+table name), created on first use, so warm requests reuse pooled connections. The SDK
+import itself is deferred until a client is first needed.
+"""
+
+import logging
+import os
+import threading
+
+_lock = threading.Lock()
+_clients = {}
+_ensured = set()
+
+
+def connection_string():
+    return os.getenv("AzureWebJobsStorage")
+
+
+def table(name, conn=None, create=False):
+    """Cached TableClient for `name`. create=True issues create_table once per process."""
+    conn = conn or connection_string()
+    key = (conn, name)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                from azure.data.tables import TableClient
+                client = TableClient.from_connection_string(conn, table_name=name)
+                _clients[key] = client
+    if create and key not in _ensured:
+        try:
+            client.create_table()
+        except Exception:
+            pass  # already exists
+        _ensured.add(key)
+    return client
+
+
+def warm(names, conn=None):
+    """Open clients (and their connections) for `names` ahead of the first real request."""
+    for name in names:
+        try:
+            client = table(name, conn, create=True)
+            next(iter(client.query_entities("PartitionKey eq '__warmup__'", results_per_page=1)), None)
+        except Exception:
+            logging.exception("Warm-up of table %s failed", name)
@@ -0,0 +1,161 @@
+"""Compact SVG thumbnails of templates and saved game drawings.
+
+Geometry is fitted into a size x size pixel box (with a small margin), simplified with
+Douglas-Peucker at half a pixel and written with integer-ish coordinates, so a preview
+is a few hundred bytes instead of the full baseVertices or trail arrays.
+
+- template_svg(): the template outline from its compiled geometry (unit frame, y up).
+- drawing_svg(): a Scores row's template outline plus every stored brush trail, in the
+  local meter frame around the template center.
+
+source_key() hashes the inputs of a render (plus RENDER_VERSION and the size); the
+endpoint uses it as the ETag, so revalidation never renders, and rendered SVGs are kept
+in a per-worker LRU under the same key.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from shared_code import codec, geometry, scoring
+
+RENDER_VERSION = 1
+MIN_SIZE = 16
+MAX_SIZE = 512
+DEFAULT_SIZE = 96
+MARGIN = 0.06  # fraction of size left blank on each side
+OUTLINE_COLOR = "#1f2937"
+TRAIL_COLORS = ("#2563eb", "#dc2626", "#16a34a", "#d97706", "#7c3aed", "#0891b2")
+CACHE_MAX_ENTRIES = 512
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # source key -> svg
+
+
+def source_key(*parts):
+    h = hashlib.sha1(f"v{RENDER_VERSION}".encode())
+    for p in parts:
+        h.update(b"\x00")
+        h.update(p.encode() if isinstance(p, str) else str(p).encode())
+    return h.hexdigest()
+
+
+def cached(key, render):
+    """Return the SVG for key, calling render() on a miss."""
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    svg = render()
+    with _lock:
+        _cache[key] = svg
+        if len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return svg
+
+
+def _fmt(v):
+    s = f"{v:.1f}"
+    return s[:-2] if s.endswith(".0") else s
+
+
+def _frame(point_sets, size):
+    """Uniform scale + offset mapping (x, y) (y up) into the pixel box (y down)."""
+    xs = [x for pts in point_sets for x, _ in pts]
+    ys = [y for pts in point_sets for _, y in pts]
+    if not xs:
+        return None
+    min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+    span = max(max_x - min_x, max_y - min_y) or 1.0
+    inner = size * (1 - 2 * MARGIN)
+    scale = inner / span
+    ox = (size - (max_x - min_x) * scale) / 2
+    oy = (size - (max_y - min_y) * scale) / 2
+    return lambda p: (ox + (p[0] - min_x) * scale, oy + (max_y - p[1]) * scale)
+
+
+def _path(pts, closed):
+    """Pixel points -> SVG path data; consecutive duplicates (after rounding) are dropped."""
+    out = []
+    last = None
+    for x, y in pts:
+        cur = (_fmt(x), _fmt(y))
+        if cur == last:
+            continue
+        out.append(("M" if last is None else "L") + cur[0] + " " + cur[1])
+        last = cur
+    if len(out) < 2:
+        return ""
+    return "".join(out) + ("Z" if closed else "")
+
+
+def _svg(size, elements):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" width="{size}" height="{size}">'
+        + "".join(elements) + "</svg>"
+    )
+
+
+def _outline_element(px, size):
+    d = _path(px, closed=True)
+    width = _fmt(max(1.0, size / 48))
+    return f'<path d="{d}" fill="none" stroke="{OUTLINE_COLOR}" stroke-width="{width}" stroke-linejoin="round"/>' if d else ""
+
+
+def template_svg(geo, size=DEFAULT_SIZE):
+    """Compiled template geometry (geometry.compile_template) -> SVG string."""
+    pts = [(float(v["x"]), float(v["y"])) for v in geo["lods"][0]["vertices"]]
+    to_px = _frame([pts], size)
+    if to_px is None:
+        return _svg(size, [])
+    px = [to_px(p) for p in pts]
+    px = geometry.simplify_polygon(px, 0.5)
+    return _svg(size, [_outline_element(px, size)])
+
+
+def drawing_svg(score_row, size=DEFAULT_SIZE, base_vertices=None):
+    """Scores row (drawing + template snapshot) -> SVG of the outline and the brush trails."""
+    center = codec.loads_or(score_row.get("templateCenter"), None)
+    boundary = scoring.template_boundary(
+        score_row.get("templateId"), center, score_row.get("templateRadiusMeters"),
+        base_vertices=base_vertices,
+        vertices=codec.loads_or(score_row.get("templateVertices"), None),
+    )
+    trails = (codec.loads_or(score_row.get("drawing"), None) or {}).get("trails") or {}
+    origin = scoring.center_of(center) or (boundary[0] if boundary else None)
+    if origin is None:
+        first = next((line[0] for line in trails.values() if line), None)
+        if first is None:
+            return _svg(size, [])
+        origin = (float(first["latitude"]), float(first["longitude"]))
+
+    outline = [scoring.to_xy(lat, lng, origin) for lat, lng in boundary]
+    lines = []
+    for user in sorted(trails):
+        xy = []
+        for p in trails[user] or []:
+            try:
+                xy.append(scoring.to_xy(float(p["latitude"]), float(p["longitude"]), origin))
+            except Exception:
+                continue
+        if len(xy) >= 2:
+            lines.append(xy)
+
+    to_px = _frame([outline] + lines, size)
+    if to_px is None:
+        return _svg(size, [])
+    elements = []
+    if len(outline) >= 3:
+        px = geometry.simplify_polygon([to_px(p) for p in outline], 0.5)
+        elements.append(_outline_element(px, size))
+    width = _fmt(max(1.0, size / 40))
+    for i, line in enumerate(lines):
+        px = [to_px(p) for p in line]
+        d = _path(geometry.simplify_polyline(px, 0.5), closed=False)
+        if d:
+            color = TRAIL_COLORS[i % len(TRAIL_COLORS)]
+            elements.append(
+                f'<path d="{d}" fill="none" stroke="{color}" stroke-width="{width}" stroke-linecap="round" stroke-linejoin="round" stroke-opacity="0.85"/>'
+            )
+    return _svg(size, elements)
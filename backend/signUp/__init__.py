@@ -5,7 +5,7 @@ Returns 201 on success; 409 if username already exists.
 """
 
 import azure.functions as func
-from azure.data.tables import TableClient
+from shared_code import storage
 import hashlib
 import os
 import json
@@ -27,19 +27,19 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             return func.HttpResponse("Missing username or password", status_code=400, headers=cors_headers)
         
         connection_string = os.getenv('AzureWebJobsStorage')
-        with TableClient.from_connection_string(connection_string, table_name="Users") as table:
-            try:
-                # Check if user exists
-                table.get_entity(partition_key="user", row_key=username)
-                return func.HttpResponse("Username already exists", status_code=409, headers=cors_headers)
-            except:
-                hashed_password = hashlib.sha256(password.encode()).hexdigest()
-                table.create_entity({
-                    "PartitionKey": "user",
-                    "RowKey": username,
-                    "Password": hashed_password
-                })
-                return func.HttpResponse("Signup successful", status_code=201, headers=cors_headers)
+        table = storage.table("Users", connection_string)
+        try:
+            # Check if user exists
+            table.get_entity(partition_key="user", row_key=username)
+            return func.HttpResponse("Username already exists", status_code=409, headers=cors_headers)
+        except:
+            hashed_password = hashlib.sha256(password.encode()).hexdigest()
+            table.create_entity({
+                "PartitionKey": "user",
+                "RowKey": username,
+                "Password": hashed_password
+            })
+            return func.HttpResponse("Signup successful", status_code=201, headers=cors_headers)
 
     except Exception as e:
         logging.exception("signup failed")
@@ -0,0 +1,40 @@
+"""Rebuild the PlayerStats table from all existing Scores rows.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.backfill_player_stats
+  python -m tools.backfill_player_stats --no-distance   # skip GameArchives reads
+
+One streaming pass over Scores; per-game distances come from each game's GameArchives
+row. Rows are replaced, so run it when no games are finishing (or re-run afterwards).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from shared_code import player_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--no-distance", action="store_true", help="do not read distances from GameArchives")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+
+    t0 = time.perf_counter()
+
+    def progress(games, players):
+        print(f"{games} games, {players} players, {games / (time.perf_counter() - t0):.0f} games/s", flush=True)
+
+    games, players = player_stats.backfill(
+        args.connection_string, with_distance=not args.no_distance, page_size=args.page_size, progress=progress
+    )
+    print(f"PlayerStats rebuilt: {games} games, {players} players in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Propose (and optionally apply) template multipliers that equalize expected points.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.calibrate                          # dry run: print the report
+  python -m tools.calibrate --skill --since 2025-01-01T00:00:00Z
+  python -m tools.calibrate --statistic mean --min-games 50 --json > report.json
+  python -m tools.calibrate --skill --apply          # write the proposals to Templates
+
+Scores rows are streamed once with a narrow projection; the statistics are vectorized,
+so the compute step takes about a second even for hundreds of thousands of games.
+Existing scores keep their points until re-scored with tools/rescore.py.
+"""
+
+import argparse
+import os
+import sys
+
+from shared_code import calibration, codec
+
+
+def print_report(report):
+    print(f"{report['games']} games, {report['players']} players, statistic={report['statistic']}, "
+          f"skillAdjusted={report['skillAdjusted']}, scan {report['scanSec']}s, compute {report['computeSec']}s")
+    print(f"{'template':<16}{'games':>8}{'p25':>8}{'p50':>8}{'p75':>8}{'typical':>9}{'current':>9}{'proposed':>10}")
+    for t in report["templates"]:
+        dist = t["accuracy"] or {}
+        note = "  (insufficient data)" if t["insufficientData"] else ""
+        print(f"{t['templateId']:<16}{t['games']:>8}{dist.get('p25', ''):>8}{dist.get('p50', ''):>8}{dist.get('p75', ''):>8}"
+              f"{t['typicalAccuracy'] if t['typicalAccuracy'] is not None else '':>9}{t['currentMultiplier']:>9}{t['proposedMultiplier']:>10}{note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", help="only games completed at or after this ISO 8601 time")
+    parser.add_argument("--statistic", choices=calibration.STATISTICS, default="median")
+    parser.add_argument("--skill", action="store_true", help="control for player skill (per-user averages)")
+    parser.add_argument("--min-games", type=int, default=calibration.MIN_GAMES)
+    parser.add_argument("--apply", action="store_true", help="write proposed multipliers to Templates")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+
+    report = calibration.run(
+        args.connection_string, since=args.since, statistic=args.statistic, skill=args.skill,
+        min_games=args.min_games, progress=lambda n: print(f"scanned {n} games", file=sys.stderr, flush=True),
+    )
+    if args.apply:
+        report["applied"] = calibration.apply(args.connection_string, report)
+    if args.json:
+        print(codec.dumps(report))
+    else:
+        print_report(report)
+        if args.apply:
+            print(f"updated: {', '.join(report['applied']) or 'nothing'}")
+        else:
+            print("dry run: nothing written (use --apply)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Export every Scores row (optionally joined with Games) to NDJSON or CSV.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.export --format csv --games -o scores.csv
+  python -m tools.export --since 2026-01-01T00:00:00Z >> scores.ndjson
+
+Pages through storage with continuation tokens and writes each page as soon as it is
+read, so memory stays constant. The largest timeCompleted written is printed to stderr;
+pass it as --since next time for an incremental export.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from shared_code import export
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--games", action="store_true", help="join timeStarted/status/roles from Games")
+    parser.add_argument("--since", help="only games with timeCompleted >= this ISO 8601 time")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("-o", "--output", help="file to write (default stdout)")
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    t0 = time.perf_counter()
+    count = 0
+    newest = args.since or ""
+    try:
+        for i, rows in enumerate(export.iter_pages(args.connection_string, args.since, args.page_size)):
+            recs = list(export.records(args.connection_string, rows, args.games))
+            if args.format == "csv":
+                out.write(export.csv_text(recs, header=(i == 0)))
+            else:
+                out.write(export.ndjson(recs))
+            count += len(recs)
+            newest = max([newest] + [r["timeCompleted"] or "" for r in recs])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"exported {count} games in {elapsed:.1f}s; next --since {newest or '(none)'}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Build or refresh the cached trail heatmap of one or more templates.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.heatmap --template star --template circle
+  python -m tools.heatmap --template star --rebuild --show   # from scratch, print as ASCII
+
+Folds every Scores row completed since the cached watermark into the raster, in chunks
+of --chunk-rows games, so memory stays bounded however many games exist.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from shared_code import heatmap
+
+SHADES = " .:-=+*#%@"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--template", action="append", required=True)
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--chunk-rows", type=int, default=heatmap.CHUNK_ROWS)
+    parser.add_argument("--show", action="store_true", help="print the normalized grid as ASCII")
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+
+    for template_id in args.template:
+        t0 = time.perf_counter()
+        entity = heatmap.update(args.connection_string, template_id, rebuild=args.rebuild, chunk_rows=args.chunk_rows)
+        out = heatmap.to_json(entity)
+        print(f"{template_id}: games={out['games']} points={out['points']} max={out['max']} "
+              f"in {time.perf_counter() - t0:.2f}s")
+        if args.show:
+            for row in out["grid"]:
+                print("".join(SHADES[min(len(SHADES) - 1, int(v * len(SHADES)))] for v in row))
+
+
+if __name__ == "__main__":
+    main()
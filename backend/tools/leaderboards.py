@@ -0,0 +1,44 @@
+"""Refill the windowed leaderboard buckets from Scores, or expire old buckets now.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.leaderboards --since 2026-09-01T00:00:00Z   # backfill (re-scoring updates buckets itself)
+  python -m tools.leaderboards --expire                       # what Janitor does hourly
+
+Every scored game completed at or after --since is recorded again into its day, week and
+month buckets (a game's previous row is replaced, each bucket stays trimmed to the top
+LEADERBOARD_TOP_K). Buckets older than their retention are not worth rebuilding: use a
+--since within the last month.
+"""
+
+import argparse
+import os
+import sys
+
+from shared_code import codec, leaderboards
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", help="ISO 8601 timeCompleted lower bound for the rebuild")
+    parser.add_argument("--top-k", type=int, default=leaderboards.TOP_K)
+    parser.add_argument("--expire", action="store_true", help="delete expired buckets")
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+    if not (args.since or args.expire):
+        parser.error("pass --since and/or --expire")
+
+    summary = {}
+    if args.since:
+        summary["gamesRecorded"] = leaderboards.rebuild(
+            args.connection_string, args.since, k=args.top_k,
+            progress=lambda n: print(f"recorded {n} games", file=sys.stderr, flush=True),
+        )
+    if args.expire:
+        summary["bucketsExpired"], summary["rowsDeleted"] = leaderboards.expire(args.connection_string)
+    print(codec.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Re-score all stored games of a template after its multiplier changed.
+
+Run from backend/ with AzureWebJobsStorage set (or --connection-string):
+  python -m tools.rescore --template star                  # Templates.multiplier, quick
+  python -m tools.rescore --template star --multiplier 1.8 --workers 8
+  python -m tools.rescore --template polygon --full --workers 8   # recompute accuracy from drawings
+  python -m tools.rescore --template star --reset          # ignore the checkpoint
+
+Progress (rows scanned/updated, rows/s) is printed after each chunk; an interrupted
+run resumes from the checkpointed RowKey on the next invocation.
+"""
+
+import argparse
+import os
+import sys
+
+from shared_code import codec, rescore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--template", required=True)
+    parser.add_argument("--multiplier", type=float)
+    parser.add_argument("--full", action="store_true", help="recompute accuracy from stored drawings")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=rescore.CHUNK_ROWS)
+    parser.add_argument("--reset", action="store_true", help="start over instead of resuming")
+    parser.add_argument("--connection-string", default=os.getenv("AzureWebJobsStorage"))
+    args = parser.parse_args()
+    if not args.connection_string:
+        sys.exit("AzureWebJobsStorage is not set")
+
+    if args.reset:
+        rescore.reset_checkpoint(args.connection_string, args.template)
+
+    def progress(s):
+        print(f"scanned={s['scanned']} updated={s['updated']} last={s['lastRowKey']} {s['rowsPerSec']} rows/s", flush=True)
+
+    summary = rescore.run(
+        args.connection_string, args.template,
+        multiplier=args.multiplier, full=args.full, workers=args.workers,
+        resume=not args.reset, chunk_rows=args.chunk_rows, progress=progress,
+    )
+    print(codec.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
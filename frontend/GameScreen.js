@@ -12,6 +12,17 @@ const colorPalette = [
   '#e6194B', '#3cb44b', '#ffe119', '#4363d8', '#f58231', '#911eb4', '#46f0f0', '#f032e6', '#bcf60c', '#fabebe',
   '#008080', '#e6beff', '#9A6324', '#fffac8', '#800000', '#aaffc3', '#808000', '#ffd8b1', '#000075', '#808080'
 ];
+// Milliseconds to wait after a 429/503, from its Retry-After header (default 1 s)
+const retryAfterMs = (res) => {
+  const seconds = parseFloat(res.headers.get('Retry-After'));
+  return (Number.isFinite(seconds) ? seconds : 1) * 1000;
+};
+// Delay before the next poll: the server's X-Poll-After-Ms hint, else the fixed fallback
+const pollAfterMs = (res, fallbackMs) => {
+  const ms = parseFloat(res && res.headers.get('X-Poll-After-Ms'));
+  return Number.isFinite(ms) && ms > 0 ? ms : fallbackMs;
+};
+
 const hashColor = (str) => {
   let hash = 0;
   for (let i = 0; i < str.length; i++) hash = str.charCodeAt(i) + ((hash << 5) - hash);
@@ -153,10 +164,15 @@ const GameScreen = ({ route, navigation }) => {
   // Painter polls locations from Distances and builds local trails
   useEffect(() => {
     if (!isPainter) return;
-    let interval;
+    let timeout;
+    let cancelled = false;
+    // setTimeout chain so each poll waits for the previous one and follows X-Poll-After-Ms
     const poll = async () => {
+      let delay = 300; // fallback when the server sends no hint
       try {
         const res = await fetch(`${FUNCTION_APP_ENDPOINT}/api/getLocations?gameId=${gameId}`);
+        if (res.status === 429 || res.status === 503) { delay = retryAfterMs(res); return; }
+        delay = pollAfterMs(res, 300);
         if (!res.ok) return;
         const data = await res.json();
         const latest = {};
@@ -175,19 +191,25 @@ const GameScreen = ({ route, navigation }) => {
           });
           return next;
         });
-      } catch {}
+      } catch {} finally {
+        if (!cancelled) timeout = setTimeout(poll, delay);
+      }
     };
     poll();
-    interval = setInterval(poll, 300); // was 1000ms, then 500ms; now 300ms for smoother updates
-    return () => clearInterval(interval);
+    return () => { cancelled = true; clearTimeout(timeout); };
   }, [isPainter, gameId, users, roles]);
 
   // Poll session end; if game ended externally (e.g., by admin), painter uploads results
   useEffect(() => {
     if (ending) return;
-    const interval = setInterval(async () => {
+    let timeout;
+    let cancelled = false;
+    const poll = async () => {
+      let delay = 1000;
       try {
         const response = await fetch(`${FUNCTION_APP_ENDPOINT}/api/JoinSession?sessionId=${sessionId}&t=${Date.now()}`, { cache: 'no-store' });
+        if (response.status === 429 || response.status === 503) { delay = retryAfterMs(response); return; }
+        delay = pollAfterMs(response, 1000);
         if (response.ok) {
           const data = await response.json();
           if (!data.isStarted) {
@@ -208,9 +230,12 @@ const GameScreen = ({ route, navigation }) => {
             navigation.replace('WaitingRoom', { sessionId, username, isAdmin, template: data.template || template || null });
           }
         }
-      } catch {}
-    }, 1000);
-    return () => clearInterval(interval);
+      } catch {} finally {
+        if (!cancelled) timeout = setTimeout(poll, delay);
+      }
+    };
+    timeout = setTimeout(poll, 1000);
+    return () => { cancelled = true; clearTimeout(timeout); };
   }, [ending, sessionId, username, isAdmin, navigation, template]);
 
   const handleEndGame = async () => {
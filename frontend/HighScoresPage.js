@@ -5,7 +5,7 @@ import styles from './styles';
 const FUNCTION_APP_ENDPOINT = 'https://draw-n-go.azurewebsites.net';
 
 const HighScoresPage = ({ route, navigation }) => {
-  // username param unused; drawing feature removed
+  // username param unused; drawings are shown as GetThumbnail previews
   const [templateOptions, setTemplateOptions] = useState([{ id: 'all', name: 'All Templates' }]);
   const [selectedTemplate, setSelectedTemplate] = useState('all');
   const [rows, setRows] = useState([]);
@@ -13,13 +13,13 @@ const HighScoresPage = ({ route, navigation }) => {
   const [page, setPage] = useState(1);
   const [total, setTotal] = useState(0);
   const pageSize = 10;
-  // No drawing UI
+  // No drawing modal: games with a stored drawing show a server-rendered thumbnail
 
   useEffect(() => {
     // Load template options from Templates table via GetTemplates
     (async () => {
       try {
-        const res = await fetch(`${FUNCTION_APP_ENDPOINT}/api/GetTemplates`);
+        const res = await fetch(`${FUNCTION_APP_ENDPOINT}/api/GetTemplates?vertices=0`);
         if (res.ok) {
           const data = await res.json();
           const arr = Array.isArray(data) ? data : (Array.isArray(data.templates) ? data.templates : []);
@@ -108,6 +108,10 @@ const HighScoresPage = ({ route, navigation }) => {
                   keyExtractor={(item, idx) => item.gameId || String(idx)}
                   renderItem={({ item }) => (
                     <View style={{ backgroundColor: '#fff', borderRadius: 10, padding: 12, marginBottom: 10, borderWidth: 1, borderColor: '#eee', elevation: 2 }}>
+                      {item.hasDrawing && (
+                        <img src={`${FUNCTION_APP_ENDPOINT}/api/GetThumbnail?gameId=${encodeURIComponent(item.gameId)}&size=96`}
+                          width={96} height={96} alt="Drawing" loading="lazy" style={{ float: 'right', marginLeft: 8 }} />
+                      )}
                       <View style={{ flexDirection: 'row', justifyContent: 'space-between', alignItems: 'center' }}>
                         <Text style={{ fontWeight: 'bold', color: '#21a4d6', marginRight: 8 }} numberOfLines={1}>
                           {item.templateName || item.templateId || 'Template'}
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { SafeAreaView, View, Text, FlatList, TouchableOpacity, ActivityIndicator, Platform } from 'react-native';
 import styles from './styles';
 import SharedHeader from './SharedHeader';
-// Drawing feature removed
+// Drawings are shown as GetThumbnail previews (no modal)
 
 const FUNCTION_APP_ENDPOINT = 'https://draw-n-go.azurewebsites.net';
 
@@ -14,7 +14,6 @@ const PlayerPage = ({ route, navigation }) => {
   const [page, setPage] = useState(1);
   const [total, setTotal] = useState(0);
   const pageSize = 10;
-  // No drawing modal/state
 
   // Fetch latest games for the player
   useEffect(() => {
@@ -86,6 +85,10 @@ const PlayerPage = ({ route, navigation }) => {
                         borderWidth: 1,
                         borderColor: '#eee'
                       }}>
+                        {item.hasDrawing && (
+                          <img src={`${FUNCTION_APP_ENDPOINT}/api/GetThumbnail?gameId=${encodeURIComponent(item.gameId)}&size=96`}
+                            width={96} height={96} alt="Drawing" loading="lazy" style={{ float: 'right', marginLeft: 8 }} />
+                        )}
                         <View style={{ flexDirection: 'row', justifyContent: 'space-between', alignItems: 'center' }}>
                           <Text style={{ fontWeight: 'bold', color: '#21a4d6', marginRight: 8 }} numberOfLines={1}>
                             {item.templateName || item.templateId || 'Template'}
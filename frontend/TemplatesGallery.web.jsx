@@ -1,42 +1,24 @@
-import React, { useState, useMemo, useCallback } from 'react';
+import React, { useState, useCallback } from 'react';
 import { View, Text, TouchableOpacity } from 'react-native';
-// Removed Google Maps preview; using lightweight SVG polygons instead
+// Removed Google Maps preview; previews are server-rendered SVG thumbnails (GetThumbnail)
 import SharedHeader from './SharedHeader';
 import { useFocusEffect } from '@react-navigation/native';
 
 /*
 TemplatesGallery
 Shows cards for every template from GetTemplates.
-Each card renders a lightweight SVG polygon derived from normalized baseVertices (no map for performance).
+Each card shows the template's GetThumbnail SVG (a few hundred bytes, revalidated by ETag), so the
+catalog is loaded without baseVertices (GetTemplates?vertices=0).
 Admins also see a button to create a new template (navigates to CreateTemplate screen).
 */
 
-const CARD_SIZE = 140; // px square for preview polygon
+const FUNCTION_APP_ENDPOINT = 'https://draw-n-go.azurewebsites.net';
+const CARD_SIZE = 140; // px square for preview thumbnail
 const NAME_BAR_HEIGHT = 48; // taller footer to hold name + multiplier on separate lines
-const PADDING = 10;
 
 function TemplatePreview({ template, isAdmin, onDelete, onUpdated }) {
-  const pointsAttr = useMemo(() => {
-    if (!template?.baseVertices || !Array.isArray(template.baseVertices) || template.baseVertices.length < 3) return '';
-    // Determine bounds (though normalization should already be around -1..1)
-    let minX = Infinity, maxX = -Infinity, minY = Infinity, maxY = -Infinity;
-    template.baseVertices.forEach(p => {
-      const x = p.x || 0; const y = p.y || 0;
-      if (x < minX) minX = x; if (x > maxX) maxX = x;
-      if (y < minY) minY = y; if (y > maxY) maxY = y;
-    });
-    if (!isFinite(minX) || !isFinite(maxX) || !isFinite(minY) || !isFinite(maxY)) return '';
-    const rangeX = maxX - minX || 1;
-    const rangeY = maxY - minY || 1;
-    const scale = (CARD_SIZE - 2 * PADDING) / Math.max(rangeX, rangeY);
-    const midX = (minX + maxX) / 2;
-    const midY = (minY + maxY) / 2;
-    return template.baseVertices.map(p => {
-      const x = ((p.x || 0) - midX) * scale + CARD_SIZE / 2;
-      const y = CARD_SIZE / 2 - ((p.y || 0) - midY) * scale; // invert y for visual consistency
-      return `${x.toFixed(1)},${y.toFixed(1)}`;
-    }).join(' ');
-  }, [template]);
+  const [thumbFailed, setThumbFailed] = React.useState(false);
+  const thumbUrl = `${FUNCTION_APP_ENDPOINT}/api/GetThumbnail?templateId=${encodeURIComponent(template.templateId)}&size=${CARD_SIZE}`;
 
   const [hover, setHover] = React.useState(false);
   const deletable = isAdmin && template.isCustom;
@@ -67,10 +49,9 @@ function TemplatePreview({ template, isAdmin, onDelete, onUpdated }) {
       onMouseLeave={() => setHover(false)}
     >
       <View style={{ width: CARD_SIZE, height: CARD_SIZE, alignItems:'center', justifyContent:'center', position:'relative' }}>
-        {pointsAttr ? (
-          <svg width={CARD_SIZE} height={CARD_SIZE} style={{ position:'absolute', top:0, left:0 }}>
-            <polygon points={pointsAttr} fill="none" stroke="#21a4d6" strokeWidth={2} />
-          </svg>
+        {!thumbFailed ? (
+          <img src={thumbUrl} width={CARD_SIZE} height={CARD_SIZE} alt={template.displayName || template.templateId}
+            loading="lazy" onError={() => setThumbFailed(true)} style={{ position:'absolute', top:0, left:0 }} />
         ) : (
           <Text style={{ fontSize:12, color:'#666' }}>No shape</Text>
         )}
@@ -116,7 +97,7 @@ export default function TemplatesGallery({ navigation, route }) {
   const fetchTemplates = useCallback(async () => {
     setLoading(true);
     try {
-      const res = await fetch('https://draw-n-go.azurewebsites.net/api/GetTemplates?t=' + Date.now(), { cache:'no-store' });
+      const res = await fetch(`${FUNCTION_APP_ENDPOINT}/api/GetTemplates?vertices=0&t=${Date.now()}`, { cache:'no-store' });
       if (!res.ok) throw new Error(await res.text());
       const data = await res.json();
       setTemplates(Array.isArray(data.templates) ? data.templates : []);
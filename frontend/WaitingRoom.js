@@ -35,6 +35,8 @@ const WaitingRoom = ({ route, navigation }) => {
   const [selectedPainter, setSelectedPainter] = useState('random');
   const [showModal, setShowModal] = useState(false);
   const [creatingTemplate, setCreatingTemplate] = useState(false);
+  const pollPausedUntil = useRef(0); // set from Retry-After on 429/503
+  const nextPollMs = useRef(1000); // from X-Poll-After-Ms, 1 s when absent
 
   const fetchGameEntity = async (gameId) => {
     try {
@@ -85,11 +87,20 @@ const WaitingRoom = ({ route, navigation }) => {
       setLoading(false);
       return;
     }
+    if (Date.now() < pollPausedUntil.current) return;
     try {
       const response = await fetch(
         `https://draw-n-go.azurewebsites.net/api/JoinSession?sessionId=${sessionId}&t=${Date.now()}`,
         { cache: 'no-store' }
       );
+      if (response.status === 429 || response.status === 503) {
+        // Throttled or busy: skip polls until Retry-After has passed, keep the last state
+        const retryAfter = parseFloat(response.headers.get('Retry-After'));
+        pollPausedUntil.current = Date.now() + (Number.isFinite(retryAfter) ? retryAfter : 1) * 1000;
+        return;
+      }
+      const pollAfter = parseFloat(response.headers.get('X-Poll-After-Ms'));
+      nextPollMs.current = Number.isFinite(pollAfter) && pollAfter > 0 ? pollAfter : 1000;
       if (!response.ok) {
         let errorMsg = 'Unknown error';
         let shouldKick = false;
@@ -162,9 +173,17 @@ const WaitingRoom = ({ route, navigation }) => {
   };
 
   useEffect(() => {
-    fetchSession();
-    const interval = setInterval(fetchSession, 1000); // poll every 1 second
-    return () => clearInterval(interval);
+    // setTimeout chain: wait for each poll, then follow X-Poll-After-Ms (or any Retry-After pause)
+    let timeout;
+    let cancelled = false;
+    const poll = async () => {
+      await fetchSession();
+      if (cancelled) return;
+      const delay = Math.max(nextPollMs.current, pollPausedUntil.current - Date.now());
+      timeout = setTimeout(poll, delay);
+    };
+    poll();
+    return () => { cancelled = true; clearTimeout(timeout); };
   }, []);
 
   const handleToggleReady = async () => {